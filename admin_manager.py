@@ -3,6 +3,8 @@ from functools import wraps
 import hashlib
 import secrets
 import datetime
+from services.extraction_cache import get_extraction_cache
+from services.ocr_pool import get_ocr_cache
 
 class AdminManager:
     def __init__(self, app, db_manager):
@@ -149,7 +151,7 @@ class AdminManager:
     
     def get_system_stats(self):
         """Get system statistics"""
-        if not self.db.connection:
+        if not self.db.pool:
             return {
                 'total_customers': 0,
                 'total_processing': 0,
@@ -159,43 +161,42 @@ class AdminManager:
             }
         
         try:
-            cursor = self.db.connection.cursor()
-            
-            # Total processing count
-            cursor.execute("SELECT COUNT(*) FROM processing_history")
-            total_processing = cursor.fetchone()[0]
-            
-            # Today's processing
-            cursor.execute("""
-                SELECT COUNT(*) FROM processing_history 
-                WHERE DATE(created_at) = CURRENT_DATE
-            """)
-            today_processing = cursor.fetchone()[0]
-            
-            # Success rate
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as success
-                FROM processing_history
-            """)
-            result = cursor.fetchone()
-            success_rate = (result[1] / result[0] * 100) if result[0] > 0 else 0
-            
-            # Customer count (if tenants table exists)
-            try:
-                cursor.execute("SELECT COUNT(*) FROM tenants")
-                total_customers = cursor.fetchone()[0]
-            except:
-                total_customers = 0
-            
-            return {
-                'total_customers': total_customers,
-                'total_processing': total_processing,
-                'today_processing': today_processing,
-                'success_rate': round(success_rate, 1),
-                'database_status': 'connected'
-            }
+            with self.db.pool.cursor() as cursor:
+                # Total processing count
+                cursor.execute("SELECT COUNT(*) FROM processing_history")
+                total_processing = cursor.fetchone()[0]
+            
+                # Today's processing (a range on created_at, so the index and partitions apply)
+                cursor.execute("""
+                    SELECT COUNT(*) FROM processing_history 
+                    WHERE created_at >= CURRENT_DATE AND created_at < CURRENT_DATE + INTERVAL '1 day'
+                """)
+                today_processing = cursor.fetchone()[0]
+            
+                # Success rate
+                cursor.execute("""
+                    SELECT 
+                        COUNT(*) as total,
+                        SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) as success
+                    FROM processing_history
+                """)
+                result = cursor.fetchone()
+                success_rate = (result[1] / result[0] * 100) if result[0] > 0 else 0
+            
+                # Customer count (if tenants table exists)
+                try:
+                    cursor.execute("SELECT COUNT(*) FROM tenants")
+                    total_customers = cursor.fetchone()[0]
+                except:
+                    total_customers = 0
+            
+                return {
+                    'total_customers': total_customers,
+                    'total_processing': total_processing,
+                    'today_processing': today_processing,
+                    'success_rate': round(success_rate, 1),
+                    'database_status': 'connected'
+                }
             
         except Exception as e:
             return {
@@ -208,60 +209,60 @@ class AdminManager:
     
     def get_all_customers(self):
         """Get all customers"""
-        if not self.db.connection:
+        if not self.db.pool:
             return []
         
         try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                SELECT tenant_id, display_name, contact_email, subscription_type, 
-                       created_at, subscription_expires
-                FROM tenants 
-                ORDER BY created_at DESC
-            """)
-            customers = []
-            for row in cursor.fetchall():
-                customers.append({
-                    'tenant_id': row[0],
-                    'display_name': row[1],
-                    'contact_email': row[2],
-                    'subscription_type': row[3],
-                    'created_at': row[4].isoformat() if row[4] else None,
-                    'subscription_expires': row[5].isoformat() if row[5] else None
-                })
-            return customers
+            with self.db.pool.cursor() as cursor:
+                cursor.execute("""
+                    SELECT tenant_id, display_name, contact_email, subscription_type, 
+                           created_at, subscription_expires
+                    FROM tenants 
+                    ORDER BY created_at DESC
+                """)
+                customers = []
+                for row in cursor.fetchall():
+                    customers.append({
+                        'tenant_id': row[0],
+                        'display_name': row[1],
+                        'contact_email': row[2],
+                        'subscription_type': row[3],
+                        'created_at': row[4].isoformat() if row[4] else None,
+                        'subscription_expires': row[5].isoformat() if row[5] else None
+                    })
+                return customers
         except Exception as e:
             print(f"Error getting customers: {e}")
             return []
     
     def get_processing_logs(self, limit=100):
         """Get processing logs"""
-        if not self.db.connection:
+        if not self.db.pool:
             return []
         
         try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                SELECT id, session_id, original_filename, processing_method, 
-                       status, created_at, processing_time_seconds, file_size_bytes
-                FROM processing_history 
-                ORDER BY created_at DESC 
-                LIMIT %s
-            """, (limit,))
-            
-            logs = []
-            for row in cursor.fetchall():
-                logs.append({
-                    'id': row[0],
-                    'session_id': row[1],
-                    'filename': row[2],
-                    'method': row[3],
-                    'status': row[4],
-                    'created_at': row[5].isoformat() if row[5] else None,
-                    'processing_time': row[6],
-                    'file_size': row[7]
-                })
-            return logs
+            with self.db.pool.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, session_id, original_filename, processing_method, 
+                           status, created_at, processing_time_seconds, file_size_bytes
+                    FROM processing_history 
+                    ORDER BY created_at DESC 
+                    LIMIT %s
+                """, (limit,))
+            
+                logs = []
+                for row in cursor.fetchall():
+                    logs.append({
+                        'id': row[0],
+                        'session_id': row[1],
+                        'filename': row[2],
+                        'method': row[3],
+                        'status': row[4],
+                        'created_at': row[5].isoformat() if row[5] else None,
+                        'processing_time': row[6],
+                        'file_size': row[7]
+                    })
+                return logs
         except Exception as e:
             print(f"Error getting logs: {e}")
             return []
@@ -270,9 +271,15 @@ class AdminManager:
         """Get system configuration"""
         return {
             'pdf_processing_available': True,  # This would be dynamic
-            'database_available': self.db.connection is not None,
+            'database_available': self.db.pool is not None,
+            # Internal metrics; only shown behind the admin login, never on /api/status
+            'database_pool': self.db.pool.stats() if self.db.pool else None,
+            'history_writer': self.db.history.stats(),
+            'blob_store': self.db.blobs.stats() if self.db.blobs else None,
+            'extraction_cache': get_extraction_cache().stats(),
+            'ocr_cache': get_ocr_cache().stats() if get_ocr_cache() else None,
             'max_file_size': '16MB',
-            'allowed_methods': ['auto', 'pypdf2', 'pdfplumber', 'ocr'],
+            'allowed_methods': ['auto', 'pypdf2', 'pdfplumber', 'ocr', 'hybrid'],
             'session_timeout': '30 minutes',
             'log_retention': '90 days'
         }
@@ -295,35 +302,35 @@ class AdminManager:
     
     def get_all_users(self):
         """Get all users from the database"""
-        if not self.db.connection:
+        if not self.db.pool:
             return []
         
         try:
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                SELECT id, username, email, role, created_at, last_login, is_active
-                FROM users 
-                ORDER BY created_at DESC
-            """)
-            users = []
-            for row in cursor.fetchall():
-                users.append({
-                    'id': row[0],
-                    'username': row[1],
-                    'email': row[2],
-                    'role': row[3],
-                    'created_at': row[4].isoformat() if row[4] else None,
-                    'last_login': row[5].isoformat() if row[5] else None,
-                    'is_active': row[6]
-                })
-            return users
+            with self.db.pool.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, username, email, role, created_at, last_login, is_active
+                    FROM users 
+                    ORDER BY created_at DESC
+                """)
+                users = []
+                for row in cursor.fetchall():
+                    users.append({
+                        'id': row[0],
+                        'username': row[1],
+                        'email': row[2],
+                        'role': row[3],
+                        'created_at': row[4].isoformat() if row[4] else None,
+                        'last_login': row[5].isoformat() if row[5] else None,
+                        'is_active': row[6]
+                    })
+                return users
         except Exception as e:
             print(f"Error getting users: {e}")
             return []
     
     def create_user(self, data):
         """Create a new user"""
-        if not self.db.connection:
+        if not self.db.pool:
             return {'success': False, 'message': 'Database not available'}
         
         try:
@@ -342,112 +349,110 @@ class AdminManager:
                 return {'success': False, 'message': 'Password must be at least 6 characters'}
             
             # Check if user already exists
-            cursor = self.db.connection.cursor()
-            cursor.execute("""
-                SELECT id FROM users WHERE username = %s OR email = %s
-            """, (username, email))
-            
-            if cursor.fetchone():
-                return {'success': False, 'message': 'Username or email already exists'}
-            
-            # Create user
-            password_hash = generate_password_hash(password)
-            cursor.execute("""
-                INSERT INTO users (username, email, password_hash, role, is_active)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            """, (username, email, password_hash, role, True))
-            
-            user_id = cursor.fetchone()[0]
-            self.db.connection.commit()
-            
-            return {
-                'success': True,
-                'message': f'User "{username}" created successfully',
-                'user_id': user_id
-            }
+            with self.db.pool.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id FROM users WHERE username = %s OR email = %s
+                """, (username, email))
+            
+                if cursor.fetchone():
+                    return {'success': False, 'message': 'Username or email already exists'}
+            
+                # Create user
+                password_hash = generate_password_hash(password)
+                cursor.execute("""
+                    INSERT INTO users (username, email, password_hash, role, is_active)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING id
+                """, (username, email, password_hash, role, True))
+            
+                user_id = cursor.fetchone()[0]
+                cursor.connection.commit()
+            
+                return {
+                    'success': True,
+                    'message': f'User "{username}" created successfully',
+                    'user_id': user_id
+                }
             
         except Exception as e:
             return {'success': False, 'message': f'Error creating user: {str(e)}'}
     
     def edit_user(self, user_id, data):
         """Edit an existing user"""
-        if not self.db.connection:
+        if not self.db.pool:
             return {'success': False, 'message': 'Database not available'}
         
         try:
-            cursor = self.db.connection.cursor()
-            
-            # Check if user exists
-            cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
-            if not cursor.fetchone():
-                return {'success': False, 'message': 'User not found'}
+            with self.db.pool.cursor() as cursor:
+                # Check if user exists
+                cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
+                if not cursor.fetchone():
+                    return {'success': False, 'message': 'User not found'}
             
-            # Build update query dynamically
-            updates = []
-            params = []
+                # Build update query dynamically
+                updates = []
+                params = []
             
-            if 'username' in data and data['username'].strip():
-                updates.append("username = %s")
-                params.append(data['username'].strip())
+                if 'username' in data and data['username'].strip():
+                    updates.append("username = %s")
+                    params.append(data['username'].strip())
             
-            if 'email' in data and data['email'].strip():
-                updates.append("email = %s")
-                params.append(data['email'].strip())
+                if 'email' in data and data['email'].strip():
+                    updates.append("email = %s")
+                    params.append(data['email'].strip())
             
-            if 'role' in data:
-                updates.append("role = %s")
-                params.append(data['role'])
+                if 'role' in data:
+                    updates.append("role = %s")
+                    params.append(data['role'])
             
-            if 'is_active' in data:
-                updates.append("is_active = %s")
-                params.append(data['is_active'])
+                if 'is_active' in data:
+                    updates.append("is_active = %s")
+                    params.append(data['is_active'])
             
-            if 'password' in data and data['password']:
-                from werkzeug.security import generate_password_hash
-                updates.append("password_hash = %s")
-                params.append(generate_password_hash(data['password']))
+                if 'password' in data and data['password']:
+                    from werkzeug.security import generate_password_hash
+                    updates.append("password_hash = %s")
+                    params.append(generate_password_hash(data['password']))
             
-            if not updates:
-                return {'success': False, 'message': 'No fields to update'}
+                if not updates:
+                    return {'success': False, 'message': 'No fields to update'}
             
-            # Execute update
-            params.append(user_id)
-            query = f"UPDATE users SET {', '.join(updates)} WHERE id = %s"
-            cursor.execute(query, params)
-            self.db.connection.commit()
+                # Execute update
+                params.append(user_id)
+                query = f"UPDATE users SET {', '.join(updates)} WHERE id = %s"
+                cursor.execute(query, params)
+                cursor.connection.commit()
             
-            return {'success': True, 'message': 'User updated successfully'}
+                return {'success': True, 'message': 'User updated successfully'}
             
         except Exception as e:
             return {'success': False, 'message': f'Error updating user: {str(e)}'}
     
     def delete_user(self, user_id):
         """Delete a user (soft delete by setting is_active = False)"""
-        if not self.db.connection:
+        if not self.db.pool:
             return {'success': False, 'message': 'Database not available'}
         
         try:
-            cursor = self.db.connection.cursor()
+            with self.db.pool.cursor() as cursor:
+                # Check if user exists and get info
+                cursor.execute("SELECT username FROM users WHERE id = %s", (user_id,))
+                user = cursor.fetchone()
             
-            # Check if user exists and get info
-            cursor.execute("SELECT username FROM users WHERE id = %s", (user_id,))
-            user = cursor.fetchone()
+                if not user:
+                    return {'success': False, 'message': 'User not found'}
             
-            if not user:
-                return {'success': False, 'message': 'User not found'}
+                # Soft delete by setting is_active = False
+                cursor.execute("""
+                    UPDATE users SET is_active = FALSE WHERE id = %s
+                """, (user_id,))
             
-            # Soft delete by setting is_active = False
-            cursor.execute("""
-                UPDATE users SET is_active = FALSE WHERE id = %s
-            """, (user_id,))
+                cursor.connection.commit()
             
-            self.db.connection.commit()
-            
-            return {
-                'success': True, 
-                'message': f'User "{user[0]}" deactivated successfully'
-            }
+                return {
+                    'success': True, 
+                    'message': f'User "{user[0]}" deactivated successfully'
+                }
             
         except Exception as e:
             return {'success': False, 'message': f'Error deleting user: {str(e)}'}
@@ -1,7 +1,9 @@
 import os
+import json
+import atexit
 import datetime
 import logging
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
@@ -21,180 +23,313 @@ except ImportError:
 
 # PDF processing imports (optional - graceful degradation)
 try:
-    from pdf_processing import PDFProcessor
+    from pdf_processing import PDFProcessor, EXTRACTOR_VERSION
     PDF_PROCESSING_AVAILABLE = True
 except ImportError:
     PDF_PROCESSING_AVAILABLE = False
     print("PDF processing libraries not available - running in demo mode")
 
+from services.extraction_cache import get_extraction_cache, make_cache_key
+from services.job_queue import JobQueue, InMemoryJobBackend, QueueFullError, DONE
+from services.drug_dictionary import ReloadingDrugDictionary
+from services.medication_scanner import medication_scanner
+from services.deadline import deadline_for_tenant
+from services.db_pool import ConnectionPool
+from services.history_writer import HistoryWriter
+from services.blob_store import make_blob_store
+from services.history_partitions import HistoryPartitions
+
 class DatabaseManager:
+    # Bulky row fields kept in the blob store; processing_history holds only their reference
+    BLOB_FIELDS = {'extracted_text': 'text_blob', 'result': 'result_blob'}
+    
+    # Result fields that differ between runs of the same document (the CareTend
+    # output is timestamped); kept inline in converted_data so the result blob
+    # is shared by identical results
+    VOLATILE_RESULT_FIELDS = ('caretend_output', 'filename', 'processing_time', 'cached')
+    
     def __init__(self, app=None):
         self.app = app
-        self.connection = None
+        self.pool = None
+        self.blobs = None
+        self.history_partitions = HistoryPartitions()
+        # processing_history rows are written in batches off the request path
+        self.history = HistoryWriter(self.write_history_rows)
         
     def init_app(self, app):
         self.app = app
         if DATABASE_AVAILABLE:
             self.connect()
             self.create_tables()
+            atexit.register(self.history.close)
     
     def connect(self):
-        """Connect to PostgreSQL database"""
+        """Open the PostgreSQL connection pool"""
         try:
-            database_url = os.getenv('DATABASE_URL')
-            if database_url:
-                self.connection = psycopg2.connect(database_url)
-            else:
-                # Fallback to individual environment variables
-                self.connection = psycopg2.connect(
-                    host=os.getenv('DATABASE_HOST', 'localhost'),
-                    database=os.getenv('DATABASE_NAME', 'pharmassist_db'),
-                    user=os.getenv('DATABASE_USER', 'pharmadmin'),
-                    password=os.getenv('DATABASE_PASSWORD', '')
-                )
-            self.connection.autocommit = True
+            self.pool = ConnectionPool(self._open_connection)
+            self.blobs = make_blob_store(self.pool)
             print("✓ Database connected successfully")
         except Exception as e:
             print(f"Database connection failed: {e}")
-            self.connection = None
+            self.pool = None
+    
+    def _open_connection(self):
+        """Open one PostgreSQL connection for the pool"""
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            connection = psycopg2.connect(database_url)
+        else:
+            # Fallback to individual environment variables
+            connection = psycopg2.connect(
+                host=os.getenv('DATABASE_HOST', 'localhost'),
+                database=os.getenv('DATABASE_NAME', 'pharmassist_db'),
+                user=os.getenv('DATABASE_USER', 'pharmadmin'),
+                password=os.getenv('DATABASE_PASSWORD', '')
+            )
+        connection.autocommit = True
+        return connection
     
     def create_tables(self):
         """Create necessary database tables"""
-        if not self.connection:
+        if not self.pool:
             return
             
         try:
-            cursor = self.connection.cursor()
+            with self.pool.cursor() as cursor:
+                # processing_history: monthly partitions on created_at, indexed for its queries
+                self.history_partitions.migrate(cursor)
             
-            # Create processing history table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS processing_history (
-                    id SERIAL PRIMARY KEY,
-                    session_id VARCHAR(255),
-                    filename VARCHAR(255),
-                    original_filename VARCHAR(255),
-                    processing_method VARCHAR(50),
-                    status VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    processing_time_seconds FLOAT,
-                    file_size_bytes INTEGER,
-                    extracted_text TEXT,
-                    converted_data JSONB
-                )
-            """)
+                # Create medication database table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS medications (
+                        id SERIAL PRIMARY KEY,
+                        name VARCHAR(255) UNIQUE,
+                        generic_name VARCHAR(255),
+                        drug_class VARCHAR(255),
+                        common_dosages TEXT[],
+                        caretend_code VARCHAR(50),
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
             
-            # Create medication database table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS medications (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(255) UNIQUE,
-                    generic_name VARCHAR(255),
-                    drug_class VARCHAR(255),
-                    common_dosages TEXT[],
-                    caretend_code VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+                # Create users table for authentication
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS users (
+                        id SERIAL PRIMARY KEY,
+                        username VARCHAR(255) UNIQUE NOT NULL,
+                        email VARCHAR(255) UNIQUE NOT NULL,
+                        password_hash VARCHAR(255) NOT NULL,
+                        role VARCHAR(50) DEFAULT 'user',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_login TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                """)
             
-            # Create users table for authentication
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(255) UNIQUE NOT NULL,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    password_hash VARCHAR(255) NOT NULL,
-                    role VARCHAR(50) DEFAULT 'user',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            """)
+                # Users belong to a pharmacy tenant (same column as user_management's schema)
+                cursor.execute("""
+                    ALTER TABLE users ADD COLUMN IF NOT EXISTS tenant_id INTEGER
+                """)
             
-            # Insert default admin user if no users exist
-            cursor.execute("SELECT COUNT(*) FROM users")
-            user_count = cursor.fetchone()[0]
+                # Insert default admin user if no users exist
+                cursor.execute("SELECT COUNT(*) FROM users")
+                user_count = cursor.fetchone()[0]
             
-            if user_count == 0:
-                admin_password = generate_password_hash('admin123')
-                cursor.execute("""
-                    INSERT INTO users (username, email, password_hash, role)
-                    VALUES (%s, %s, %s, %s)
-                """, ('admin', 'admin@pharmassist.com', admin_password, 'admin'))
-                print("✓ Default admin user created (username: admin, password: admin123)")
+                if user_count == 0:
+                    admin_password = generate_password_hash('admin123')
+                    cursor.execute("""
+                        INSERT INTO users (username, email, password_hash, role)
+                        VALUES (%s, %s, %s, %s)
+                    """, ('admin', 'admin@pharmassist.com', admin_password, 'admin'))
+                    print("✓ Default admin user created (username: admin, password: admin123)")
             
-            # Insert some sample medications
-            cursor.execute("""
-                INSERT INTO medications (name, generic_name, drug_class, common_dosages, caretend_code)
-                VALUES 
-                    ('Lisinopril', 'lisinopril', 'ACE Inhibitor', ARRAY['5mg', '10mg', '20mg'], 'ACE001'),
-                    ('Metformin', 'metformin', 'Diabetes', ARRAY['500mg', '850mg', '1000mg'], 'DIA001'),
-                    ('Atorvastatin', 'atorvastatin', 'Statin', ARRAY['10mg', '20mg', '40mg', '80mg'], 'STA001')
-                ON CONFLICT (name) DO NOTHING
-            """)
+                # Insert some sample medications
+                cursor.execute("""
+                    INSERT INTO medications (name, generic_name, drug_class, common_dosages, caretend_code)
+                    VALUES 
+                        ('Lisinopril', 'lisinopril', 'ACE Inhibitor', ARRAY['5mg', '10mg', '20mg'], 'ACE001'),
+                        ('Metformin', 'metformin', 'Diabetes', ARRAY['500mg', '850mg', '1000mg'], 'DIA001'),
+                        ('Atorvastatin', 'atorvastatin', 'Statin', ARRAY['10mg', '20mg', '40mg', '80mg'], 'STA001')
+                    ON CONFLICT (name) DO NOTHING
+                """)
             
-            print("✓ Database tables created successfully")
+                print("✓ Database tables created successfully")
             
         except Exception as e:
             print(f"Error creating tables: {e}")
     
     def log_processing(self, session_id, filename, original_filename, method, status, 
                       processing_time=None, file_size=None, extracted_text=None, converted_data=None):
-        """Log processing activity to database"""
-        if not self.connection:
+        """Queue processing activity for the background history writer"""
+        if not self.pool:
+            return
+            
+        self.history.log({
+            'session_id': session_id,
+            'filename': filename,
+            'original_filename': original_filename,
+            'processing_method': method,
+            'status': status,
+            'created_at': datetime.datetime.now(),
+            'processing_time_seconds': processing_time,
+            'file_size_bytes': file_size,
+            'extracted_text': extracted_text,
+            'result': converted_data
+        })
+    
+    def write_history_rows(self, rows):
+        """Insert queued processing_history rows (all with the same columns) in one statement"""
+        rows = [self._store_blobs(dict(row)) for row in rows]
+        columns = list(rows[0])
+        with self.pool.cursor() as cursor:
+            self.history_partitions.ensure(cursor, [row['created_at'] for row in rows])
+            psycopg2.extras.execute_values(
+                cursor,
+                f"INSERT INTO processing_history ({', '.join(columns)}) VALUES %s",
+                [tuple(row[column] for column in columns) for row in rows],
+                page_size=len(rows)
+            )
+    
+    def _store_blobs(self, row):
+        """Replace a row's bulky fields with references into the blob store"""
+        for field, column in self.BLOB_FIELDS.items():
+            if field not in row:
+                continue
+            if field == 'result':
+                row[column], row['converted_data'] = self._store_result(row.pop(field))
+            else:
+                row[column] = self.blobs.put(row.pop(field))
+        return row
+    
+    def _store_result(self, result):
+        """Blob reference for a result's stable fields, and its per-run fields for converted_data"""
+        if not isinstance(result, dict):
+            return self.blobs.put(result), None
+        volatile = {key: result[key] for key in self.VOLATILE_RESULT_FIELDS if key in result}
+        stable = {key: value for key, value in result.items() if key not in volatile}
+        return self.blobs.put(stable), psycopg2.extras.Json(volatile) if volatile else None
+    
+    def create_job_entry(self, job_id, session_id, filename, original_filename, method, file_size):
+        """Record a queued background job in processing_history"""
+        if not self.pool:
             return
             
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                INSERT INTO processing_history 
-                (session_id, filename, original_filename, processing_method, status, 
-                 processing_time_seconds, file_size_bytes, extracted_text, converted_data)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (session_id, filename, original_filename, method, status, 
-                  processing_time, file_size, extracted_text, converted_data))
+            with self.pool.cursor() as cursor:
+                self.history_partitions.ensure(cursor, [datetime.datetime.now()])
+                cursor.execute("""
+                    INSERT INTO processing_history 
+                    (job_id, session_id, filename, original_filename, processing_method, status, file_size_bytes)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (job_id, session_id, filename, original_filename, method, 'queued', file_size))
         except Exception as e:
-            print(f"Error logging processing: {e}")
+            print(f"Error logging job: {e}")
+    
+    def finish_job_entry(self, job_id, status, processing_time=None, extracted_text=None, converted_data=None):
+        """Update a background job's processing_history row with its outcome"""
+        if not self.pool:
+            return
+            
+        try:
+            result_blob, volatile = self._store_result(converted_data)
+            with self.pool.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE processing_history 
+                    SET status = %s, processing_time_seconds = %s, text_blob = %s, result_blob = %s, 
+                        converted_data = %s
+                    WHERE job_id = %s
+                """, (status, processing_time, self.blobs.put(extracted_text), result_blob, volatile, job_id))
+        except Exception as e:
+            print(f"Error updating job: {e}")
+    
+    def get_medication_dictionary(self):
+        """Rows of the medications table for the drug-name dictionary"""
+        if not self.pool:
+            return []
+            
+        with self.pool.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT name, generic_name, drug_class, caretend_code 
+                FROM medications 
+                ORDER BY id
+            """)
+            return cursor.fetchall()
+    
+    def get_medications_fingerprint(self):
+        """Cheap value that changes whenever the medications table does"""
+        if not self.pool:
+            return None
+            
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*), md5(COALESCE(string_agg(
+                    concat_ws('|', id, name, generic_name, drug_class, caretend_code), ',' ORDER BY id), ''))
+                FROM medications
+            """)
+            return tuple(cursor.fetchone())
     
     def get_processing_history(self, session_id, limit=50):
         """Get processing history for a session"""
-        if not self.connection:
+        if not self.pool:
             return []
             
         try:
-            cursor = self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute("""
-                SELECT * FROM processing_history 
-                WHERE session_id = %s 
-                ORDER BY created_at DESC 
-                LIMIT %s
-            """, (session_id, limit))
-            return cursor.fetchall()
+            with self.pool.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT id, job_id, session_id, filename, original_filename, processing_method, status, 
+                           created_at, processing_time_seconds, file_size_bytes, text_blob, result_blob
+                    FROM processing_history 
+                    WHERE session_id = %s 
+                    ORDER BY created_at DESC 
+                    LIMIT %s
+                """, (session_id, limit))
+                return cursor.fetchall()
         except Exception as e:
             print(f"Error getting history: {e}")
             return []
 
-def log_processing(connection, session, filename, method, status, processing_time, file_size, result_data):
-    """Log processing activity to database"""
-    try:
-        cursor = connection.cursor()
-        cursor.execute("""
-            INSERT INTO processing_history 
-            (session_id, original_filename, processing_method, status, 
-             created_at, processing_time_seconds, file_size_bytes, result_data)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            session.get('session_id', 'unknown'),
-            filename,
-            method,
-            status,
-            datetime.datetime.now(),
-            processing_time,
-            file_size,
-            str(result_data)
-        ))
-        connection.commit()
-    except Exception as e:
-        print(f"Error logging processing: {e}")
+    def get_processing_details(self, history_id, session_id):
+        """Extracted text and result of one history row, loaded from the blob store on demand"""
+        if not self.pool:
+            return None
+        
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                SELECT text_blob, result_blob, extracted_text, converted_data 
+                FROM processing_history 
+                WHERE id = %s AND session_id = %s
+            """, (history_id, session_id))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        
+        text_blob, result_blob, extracted_text, converted_data = row
+        # Rows logged before the blob store keep their content inline; later rows
+        # keep only the result's per-run fields there
+        result = converted_data
+        if result_blob:
+            result = self.blobs.get_json(result_blob)
+            if isinstance(result, dict) and converted_data:
+                result = {**result, **converted_data}
+        return {
+            'extracted_text': self.blobs.get_text(text_blob) if text_blob else extracted_text,
+            'result': result
+        }
+
+def log_processing(history, session, filename, method, status, processing_time, file_size, result_data):
+    """Queue processing activity for the background history writer"""
+    result = {key: value for key, value in result_data.items() if key != 'extracted_text'}
+    history.log({
+        'session_id': session.get('session_id', 'unknown'),
+        'original_filename': filename,
+        'processing_method': method,
+        'status': status,
+        'created_at': datetime.datetime.now(),
+        'processing_time_seconds': processing_time,
+        'file_size_bytes': file_size,
+        'extracted_text': result_data.get('extracted_text'),
+        'result': result
+    })
 
 # Authentication helper functions
 def login_required(f):
@@ -208,31 +343,32 @@ def login_required(f):
 
 def get_user_by_credentials(username, password):
     """Verify user credentials and return user info"""
-    if not db.connection:
+    if not db.pool:
         return None
     
     try:
-        cursor = db.connection.cursor()
-        cursor.execute("""
-            SELECT id, username, email, password_hash, role, is_active 
-            FROM users 
-            WHERE (username = %s OR email = %s) AND is_active = TRUE
-        """, (username, username))
-        
-        user = cursor.fetchone()
-        if user and check_password_hash(user[3], password):
-            # Update last login
+        with db.pool.cursor() as cursor:
             cursor.execute("""
-                UPDATE users SET last_login = %s WHERE id = %s
-            """, (datetime.datetime.now(), user[0]))
-            db.connection.commit()
+                SELECT id, username, email, password_hash, role, is_active, tenant_id 
+                FROM users 
+                WHERE (username = %s OR email = %s) AND is_active = TRUE
+            """, (username, username))
+        
+            user = cursor.fetchone()
+            if user and check_password_hash(user[3], password):
+                # Update last login
+                cursor.execute("""
+                    UPDATE users SET last_login = %s WHERE id = %s
+                """, (datetime.datetime.now(), user[0]))
+                cursor.connection.commit()
             
-            return {
-                'id': user[0],
-                'username': user[1],
-                'email': user[2],
-                'role': user[4]
-            }
+                return {
+                    'id': user[0],
+                    'username': user[1],
+                    'email': user[2],
+                    'role': user[4],
+                    'tenant_id': user[6]
+                }
     except Exception as e:
         print(f"Error checking credentials: {e}")
     
@@ -262,6 +398,76 @@ else:
 # Initialize admin manager
 admin_manager = AdminManager(app, db)
 
+# Known drug names from the medications table, reloaded when the table changes
+drug_dictionary = ReloadingDrugDictionary(db.get_medication_dictionary,
+                                          fingerprint=db.get_medications_fingerprint,
+                                          refresh_interval=int(os.getenv('DRUG_DICTIONARY_REFRESH', '300')))
+medication_scanner.dictionary = drug_dictionary
+
+# Extraction results keyed by PDF hash and dictionary version, so re-uploads skip processing
+extraction_cache = get_extraction_cache()
+
+def run_processing_job(payload, report_progress):
+    """Background job handler: process one uploaded PDF, reporting page progress"""
+    file_content = payload['file_content']
+    method = payload['method']
+    original_filename = payload['original_filename']
+    deadline = deadline_for_tenant(payload.get('tenant_id'))
+    
+    cache_key = make_cache_key(file_content, method, EXTRACTOR_VERSION, drug_dictionary.version)
+    cached = extraction_cache.get(cache_key)
+    processor = PDFProcessor()
+    if cached:
+        pages = cached.get('pages_processed', 0)
+        report_progress(pages, pages)
+        return {**cached, 'filename': original_filename, 'cached': True,
+                'caretend_output': processor._convert_to_caretend(
+                    cached.get('medications_found', []), original_filename)}
+    
+    page_texts = []
+    summary = None
+    for record in processor.iter_pages(file_content, method, original_filename, deadline=deadline):
+        if record['type'] == 'page':
+            page_texts.append(f"\n--- Page {record['page']} ---\n{record['text']}\n")
+            report_progress(record['page'], record['pages_total'])
+        else:
+            summary = record
+    
+    if not summary or not summary.get('success'):
+        raise RuntimeError(summary.get('error') if summary else 'PDF processing failed')
+    
+    result = {key: value for key, value in summary.items() if key != 'type'}
+    result['extracted_text'] = ''.join(page_texts)
+    if not result.get('truncated'):
+        extraction_cache.put(cache_key, result)
+    return result
+
+def start_processing_job(job):
+    """Create the processing_history row for a job before it is queued"""
+    payload = job['payload']
+    db.create_job_entry(job['id'], job['owner'], payload['filename'], payload['original_filename'],
+                        payload['method'], len(payload['file_content']))
+
+def finish_processing_job(job):
+    """Write a finished job's outcome to its processing_history row"""
+    if not db.pool:
+        return
+    result = job.get('result') or {}
+    converted = {'medications': result.get('medications_found', []),
+                 'caretend_output': result.get('caretend_output', ''),
+                 'error': job.get('error')}
+    db.finish_job_entry(job['id'], 'success' if job['status'] == DONE else 'error',
+                        job.get('processing_time'), result.get('extracted_text'), converted)
+
+# Background processing jobs (POST /api/jobs, poll GET /api/jobs/<id>)
+job_queue = JobQueue(run_processing_job,
+                     backend=InMemoryJobBackend(max_pending=int(os.getenv('JOB_QUEUE_SIZE', '50'))),
+                     workers=int(os.getenv('JOB_WORKERS', '2')),
+                     on_submit=start_processing_job,
+                     on_finish=finish_processing_job)
+if PDF_PROCESSING_AVAILABLE:
+    job_queue.start()
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """User login page"""
@@ -282,6 +488,8 @@ def login():
             session['username'] = user['username']
             session['role'] = user['role']
             session['session_id'] = str(uuid.uuid4())
+            # Tenant from the user's own record (not the login link), for per-tenant limits
+            session['tenant_id'] = user['tenant_id']
             
             flash(f'Welcome back, {user["username"]}!', 'success')
             return redirect(url_for('index'))
@@ -300,7 +508,7 @@ def index():
     
     # Get processing history if database is available
     history = []
-    if DATABASE_AVAILABLE and db.connection:
+    if DATABASE_AVAILABLE and db.pool:
         history = db.get_processing_history(session['session_id'])
     
     return render_template('index.html', 
@@ -323,8 +531,8 @@ def api_status():
     return jsonify({
         'status': 'operational',
         'pdf_processing_available': PDF_PROCESSING_AVAILABLE,
-        'database_available': DATABASE_AVAILABLE and db.connection is not None,
-        'methods_available': ['auto', 'pypdf2', 'pdfplumber', 'ocr'] if PDF_PROCESSING_AVAILABLE else ['demo'],
+        'database_available': DATABASE_AVAILABLE and db.pool is not None,
+        'methods_available': ['auto', 'pypdf2', 'pdfplumber', 'ocr', 'hybrid'] if PDF_PROCESSING_AVAILABLE else ['demo'],
         'version': '1.0.0',
         'timestamp': datetime.datetime.now().isoformat()
     })
@@ -365,9 +573,22 @@ def api_process():
                 with open(filepath, 'rb') as f:
                     file_content = f.read()
                 
-                # Process with PDFProcessor
+                # Process with PDFProcessor, reusing cached results for repeat uploads
                 processor = PDFProcessor()
-                result = processor.process_pdf(file_content, method, original_filename)
+                cache_key = make_cache_key(file_content, method, EXTRACTOR_VERSION, drug_dictionary.version)
+                cached = extraction_cache.get(cache_key)
+                
+                if cached:
+                    result = dict(cached)
+                    result['filename'] = original_filename
+                    result['caretend_output'] = processor._convert_to_caretend(
+                        result.get('medications_found', []), original_filename)
+                else:
+                    result = processor.process_pdf(file_content, method, original_filename,
+                                                   deadline=deadline_for_tenant(session.get('tenant_id')))
+                    # Partial results from a deadline are not cached, so a retry can finish the document
+                    if result['success'] and not result.get('truncated'):
+                        extraction_cache.put(cache_key, result)
                 
                 # Clean up uploaded file
                 os.remove(filepath)
@@ -376,8 +597,8 @@ def api_process():
                 
                 if result['success']:
                     # Log processing
-                    if db.connection:
-                        log_processing(db.connection, session, original_filename, method, 
+                    if db.pool:
+                        log_processing(db.history, session, original_filename, method, 
                                      'success', processing_time, file_size, result)
                     
                     return jsonify({
@@ -390,12 +611,16 @@ def api_process():
                         'processing_time': processing_time,
                         'file_size': file_size,
                         'medications': result.get('medications_found', []),
-                        'raw_text': result.get('extracted_text', '')
+                        'page_methods': result.get('page_methods', []),
+                        'raw_text': result.get('extracted_text', ''),
+                        'truncated': result.get('truncated', False),
+                        'pages_total': result.get('pages_total', result.get('pages_processed', 0)),
+                        'cached': cached is not None
                     })
                 else:
                     # Processing failed, log error
-                    if db.connection:
-                        log_processing(db.connection, session, original_filename, method, 
+                    if db.pool:
+                        log_processing(db.history, session, original_filename, method, 
                                      'error', processing_time, file_size, {'error': result.get('error')})
                     
                     return jsonify({
@@ -412,8 +637,8 @@ def api_process():
                 processing_time = (datetime.datetime.now() - start_time).total_seconds()
                 
                 # Log error
-                if db.connection:
-                    log_processing(db.connection, session, original_filename, method, 
+                if db.pool:
+                    log_processing(db.history, session, original_filename, method, 
                                  'error', processing_time, file_size, {'error': str(e)})
                 
                 return jsonify({
@@ -450,7 +675,7 @@ Converted by PharmAssist Enterprise
         }
         
         # Log demo processing
-        if DATABASE_AVAILABLE and db.connection:
+        if DATABASE_AVAILABLE and db.pool:
             db.log_processing(
                 session['session_id'], filename, original_filename, 
                 'demo', 'success', processing_time, file_size,
@@ -471,13 +696,116 @@ Converted by PharmAssist Enterprise
             'error': f'Upload failed: {str(e)}'
         }), 500
 
+@app.route('/api/process/stream', methods=['POST'])
+@login_required
+def api_process_stream():
+    """Streaming PDF processing - one NDJSON record per page, then a summary record"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded', 'success': False}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected', 'success': False}), 400
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Only PDF files are allowed', 'success': False}), 400
+    
+    if not PDF_PROCESSING_AVAILABLE:
+        return jsonify({'error': 'PDF processing not available', 'success': False}), 503
+    
+    original_filename = file.filename
+    method = request.form.get('method', 'auto')
+    file_content = file.read()
+    file_size = len(file_content)
+    start_time = datetime.datetime.now()
+    deadline = deadline_for_tenant(session.get('tenant_id'))
+    
+    def generate():
+        processor = PDFProcessor()
+        for record in processor.iter_pages(file_content, method, original_filename, deadline=deadline):
+            if record['type'] != 'page':
+                record['processing_time'] = (datetime.datetime.now() - start_time).total_seconds()
+                record['file_size'] = file_size
+                
+                if db.pool:
+                    status = 'success' if record.get('success') else 'error'
+                    log_processing(db.history, session, original_filename, method,
+                                   status, record['processing_time'], file_size, record)
+            
+            yield json.dumps(record) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/jobs', methods=['POST'])
+@login_required
+def api_submit_job():
+    """Queue a PDF for background processing and return its job id immediately"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded', 'success': False}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected', 'success': False}), 400
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Only PDF files are allowed', 'success': False}), 400
+    
+    if not PDF_PROCESSING_AVAILABLE:
+        return jsonify({'error': 'PDF processing not available', 'success': False}), 503
+    
+    original_filename = file.filename
+    method = request.form.get('method', 'auto')
+    file_content = file.read()
+    
+    try:
+        job = job_queue.submit({
+            'file_content': file_content,
+            'method': method,
+            'filename': secure_filename(original_filename),
+            'original_filename': original_filename,
+            'tenant_id': session.get('tenant_id')
+        }, owner=session.get('session_id'))
+    except QueueFullError as e:
+        return jsonify({'error': str(e), 'success': False}), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('api_job_status', job_id=job['id'])
+    }), 202
+
+# Job fields returned to the client; the owner (the submitter's session id) stays server-side
+JOB_STATUS_FIELDS = ('id', 'status', 'filename', 'pages_done', 'pages_total', 'progress', 'result', 'error',
+                     'processing_time', 'created_at', 'updated_at', 'finished_at')
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def api_job_status(job_id):
+    """Poll a background job for progress and, once done, its result"""
+    job = job_queue.get(job_id)
+    if not job or job.get('owner') != session.get('session_id'):
+        return jsonify({'error': 'Job not found', 'success': False}), 404
+    
+    return jsonify({'success': True, **{key: job[key] for key in JOB_STATUS_FIELDS if key in job}})
+
+@app.route('/api/history/<int:history_id>')
+@login_required
+def api_history_details(history_id):
+    """Extracted text and result of one processing_history entry"""
+    details = db.get_processing_details(history_id, session.get('session_id'))
+    if details is None:
+        return jsonify({'error': 'History entry not found', 'success': False}), 404
+    
+    return jsonify({'success': True, **details})
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'pdf_processing': PDF_PROCESSING_AVAILABLE,
-        'database': DATABASE_AVAILABLE and db.connection is not None,
+        'database': DATABASE_AVAILABLE and db.pool is not None,
         'timestamp': datetime.datetime.now().isoformat()
     })
 
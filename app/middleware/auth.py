@@ -113,6 +113,18 @@ def get_current_user():
     """Get current authenticated user from request context"""
     return getattr(request, 'current_user', None)
 
+def get_request_tenant():
+    """Tenant (client id) of the authenticated user, or None for anonymous requests"""
+    user = get_current_user()
+    if user is None:
+        try:
+            verify_jwt_in_request(optional=True)
+            current_user_id = get_jwt_identity()
+            user = User.query.get(current_user_id) if current_user_id else None
+        except Exception:
+            return None
+    return user.client_id if user is not None and user.is_active else None
+
 def is_authenticated():
     """Check if current request is authenticated"""
     try:
@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify, render_template, current_app, flash, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, current_app, flash, redirect, url_for, Response, stream_with_context
 import os
 import json
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from services.document_processor import DocumentProcessor
+from services.deadline import deadline_for_tenant
+from app.middleware.auth import admin_required, get_request_tenant
 
 documents_bp = Blueprint('documents', __name__, url_prefix='/documents')
 
@@ -44,7 +46,8 @@ def upload_document():
         result = doc_processor.extract_document_data(
             file_data=file_data,
             filename=filename,
-            method=extraction_method
+            method=extraction_method,
+            deadline=deadline_for_tenant(get_request_tenant())
         )
         
         if result['success']:
@@ -88,7 +91,8 @@ def api_process_document():
         result = doc_processor.extract_document_data(
             file_data=file_data,
             filename=filename,
-            method=extraction_method
+            method=extraction_method,
+            deadline=deadline_for_tenant(get_request_tenant())
         )
         
         if result['success']:
@@ -103,6 +107,29 @@ def api_process_document():
             'error': str(e)
         }), 500
 
+@documents_bp.route('/api/process/stream', methods=['POST'])
+def api_process_document_stream():
+    """Streaming API endpoint - one NDJSON record per page, then a summary record"""
+    if 'document' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'No file uploaded'
+        }), 400
+    
+    file = request.files['document']
+    file_data = file.read()
+    filename = secure_filename(file.filename)
+    extraction_method = request.form.get('method', 'auto')
+    # Started here, inside the request, so the tenant lookup sees the caller's token
+    deadline = deadline_for_tenant(get_request_tenant())
+    
+    def generate():
+        for record in doc_processor.iter_pages(file_data, filename, extraction_method,
+                                               deadline=deadline):
+            yield json.dumps(record) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @documents_bp.route('/api/supported-formats')
 def get_supported_formats():
     """Get list of supported document formats"""
@@ -112,6 +139,12 @@ def get_supported_formats():
         'extraction_methods': ['auto', 'pypdf2', 'pdfplumber', 'ocr']
     })
 
+@documents_bp.route('/api/cache-stats')
+@admin_required
+def get_cache_stats():
+    """Get extraction cache hit/miss counters"""
+    return jsonify(doc_processor.cache.stats())
+
 @documents_bp.route('/history')
 def processing_history():
     """View document processing history"""
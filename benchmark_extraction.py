@@ -0,0 +1,202 @@
+"""
+PharmAssist extraction benchmarks
+Measures throughput of the text-processing stages on synthetic multi-page
+documents. Run: python benchmark_extraction.py [pages]
+"""
+import re
+import sys
+import time
+import random
+
+from services import ocr_preprocess
+from services.drug_dictionary import DrugDictionary
+from services.medication_scanner import (DOSAGE_PATTERNS, DRUG_ENDINGS, FALSE_POSITIVES, MedicationIndex,
+                                         extract_medications)
+
+PAGE_LINES = [
+    "Patient: John Doe    DOB: 01/15/1980    MRN: 00012345",
+    "Referring physician: Dr. Jane Smith, Internal Medicine, (555) 123-4567",
+    "Diagnosis: Hypertension; Type 2 diabetes mellitus; Hyperlipidemia.",
+    "Allergies: Penicillin (rash), sulfa drugs.",
+    "The patient was seen in clinic today for follow up of chronic conditions.",
+    "Vitals stable, no acute distress. Continue current regimen as below.",
+    "1. Lisinopril 10mg - Take 1 tablet daily",
+    "2. Metformin 500mg - Take 2 tablets twice daily with meals",
+    "3. Atorvastatin 20mg - Take 1 tablet at bedtime",
+    "4. Metoprolol tartrate 25 mg tab bid",
+    "5. Amlodipine (5 mg) once daily",
+    "Insulin glargine 10 units at bedtime",
+    "Pharmacy: PharmAssist Test Pharmacy, 123 Main St, City, State 12345",
+    "Fax: (555) 987-6543    Page {page} of {pages}",
+]
+
+
+def make_document(pages: int, seed: int = 7) -> str:
+    """Synthetic multi-page text in the extractors' page-marker format"""
+    rng = random.Random(seed)
+    parts = []
+    for page in range(1, pages + 1):
+        lines = [rng.choice(PAGE_LINES).format(page=page, pages=pages) for _ in range(40)]
+        parts.append(f"\n--- Page {page} ---\n" + "\n".join(lines) + "\n")
+    return "".join(parts)
+
+
+def legacy_extract_medications(text: str):
+    """The original per-call regex loop, kept here as the baseline"""
+    medications = []
+    text = re.sub(r'\s+', ' ', text)
+    for pattern, _ in DOSAGE_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            drug_name = match.group(1).strip()
+            dosage_amount = match.group(2)
+            dosage_unit = match.group(3) if len(match.groups()) >= 3 else 'mg'
+            drug_name = re.sub(r'^[^\w]+|[^\w]+$', '', drug_name)
+            drug_name = re.sub(r'\s+', ' ', drug_name)
+            if len(drug_name) < 3 or re.search(r'\d', drug_name):
+                continue
+            if drug_name.lower() in FALSE_POSITIVES:
+                continue
+            medication = {'name': drug_name.title(), 'dosage': f"{dosage_amount} {dosage_unit}",
+                          'strength': dosage_amount, 'unit': dosage_unit, 'source': 'text_extraction'}
+            if not any(med['name'].lower() == medication['name'].lower() for med in medications):
+                medications.append(medication)
+    for ending in DRUG_ENDINGS:
+        for match in re.finditer(rf'\w+{ending}\b', text, re.IGNORECASE):
+            drug_name = match.group(0).strip().title()
+            if not any(med['name'].lower() == drug_name.lower() for med in medications):
+                context = text[max(0, match.start() - 50):min(len(text), match.end() + 50)]
+                dose_match = re.search(r'(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)', context, re.IGNORECASE)
+                if dose_match:
+                    medications.append({'name': drug_name, 'dosage': f"{dose_match.group(1)} {dose_match.group(2)}",
+                                        'strength': dose_match.group(1), 'unit': dose_match.group(2),
+                                        'source': 'pattern_recognition'})
+                else:
+                    medications.append({'name': drug_name, 'dosage': 'Dosage not specified',
+                                        'strength': '', 'unit': '', 'source': 'pattern_recognition'})
+    return medications
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    """Best wall-clock time of several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_medication_scanner(pages: int):
+    text = make_document(pages)
+    megabytes = len(text) / (1024 * 1024)
+    
+    # Same medications as the legacy loop; only the merged 'sources' list is new
+    scanned = [{key: value for key, value in med.items() if key != 'sources'}
+               for med in extract_medications(text)]
+    assert scanned == legacy_extract_medications(text)
+    
+    legacy = timed(legacy_extract_medications, text)
+    compiled = timed(extract_medications, text)
+    
+    print(f"Medication scanner, {pages} pages ({megabytes:.2f} MB of text)")
+    print(f"  legacy regex loop : {legacy * 1000:8.1f} ms  {pages / legacy:8.0f} pages/s")
+    print(f"  compiled scanner  : {compiled * 1000:8.1f} ms  {pages / compiled:8.0f} pages/s")
+    print(f"  speedup           : {legacy / compiled:8.2f}x")
+
+
+
+def legacy_dedupe(medications):
+    """The previous any()-scan de-duplication"""
+    unique = []
+    for medication in medications:
+        if not any(med['name'].lower() == medication['name'].lower() for med in unique):
+            unique.append(medication)
+    return unique
+
+
+def bench_medication_index(count: int):
+    # A long-term-care list: every drug appears once in a table and once in text
+    names = [f"Drug{n:05d}" for n in range(count)]
+    medications = [{'name': name, 'dosage': '10 mg', 'source': source}
+                   for source in ('table_extraction', 'text_extraction') for name in names]
+    
+    assert len(MedicationIndex(medications)) == len(legacy_dedupe(medications)) == count
+    
+    legacy = timed(legacy_dedupe, medications)
+    indexed = timed(MedicationIndex, medications)
+    
+    print(f"Medication de-duplication, {len(medications)} records ({count} unique)")
+    print(f"  any() scan        : {legacy * 1000:8.1f} ms")
+    print(f"  MedicationIndex   : {indexed * 1000:8.1f} ms")
+    print(f"  speedup           : {legacy / indexed:8.2f}x")
+
+
+
+def bench_fuzzy_match(formulary_size: int):
+    rng = random.Random(11)
+    rows = [{'name': ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(6, 14))).title()}
+            for _ in range(formulary_size)]
+    rows += [{'name': 'Lisinopril'}, {'name': 'Metformin'}, {'name': 'Atorvastatin'}]
+    dictionary = DrugDictionary(rows)
+    
+    # OCR near-misses plus words that match nothing
+    queries = ['Lisinoprll', 'Metf0rmin', 'Atorvastatn', 'Prescription', 'Daily'] * 200
+    assert dictionary.match('Lisinoprll')['name'] == 'Lisinopril'
+    
+    elapsed = timed(lambda: [dictionary.match(query) for query in queries])
+    
+    print(f"Fuzzy drug-name match, {len(rows)} formulary names")
+    print(f"  per lookup        : {elapsed / len(queries) * 1000:8.3f} ms")
+
+
+
+def make_scanned_page(height: int = 1584, width: int = 1224, seed: int = 3):
+    """Synthetic 2x-rendered fax page: gray paper, skewed text lines, speckle, black border"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width), 225, dtype=np.uint8)
+    xs = np.arange(80, width - 80)
+    for top in range(120, height - 120, 36):
+        ys = (top - xs * np.tan(np.radians(1.5))).astype(int)
+        ink = rng.random(len(xs)) < 0.6  # Broken strokes, like characters
+        for thickness in range(4):
+            page[ys[ink] + thickness, xs[ink]] = 40
+    page[rng.random(page.shape) < 0.003] = 0
+    page[:, :20] = 0
+    return np.stack([page] * 3, axis=-1)
+
+
+def bench_ocr_preprocess():
+    if not ocr_preprocess.NUMPY_AVAILABLE:
+        print("OCR preprocessing: numpy not installed, skipped")
+        return
+    
+    page = make_scanned_page()
+    binary, info = ocr_preprocess.preprocess_array(page)
+    elapsed = timed(ocr_preprocess.preprocess_array, page)
+    
+    print(f"OCR preprocessing, {page.shape[1]}x{page.shape[0]} RGB page")
+    print(f"  preprocess        : {elapsed * 1000:8.1f} ms/page  (skew {info['skew']:+.2f} deg, "
+          f"{page.shape[1]}x{page.shape[0]} -> {info['size'][0]}x{info['size'][1]})")
+    
+    try:
+        import pytesseract
+        from PIL import Image
+    except ImportError:
+        print("  OCR comparison    : pytesseract/Pillow not installed, skipped")
+        return
+    
+    raw_image = Image.fromarray(page)
+    clean_image = ocr_preprocess._to_image(binary, info['skew'])
+    raw = timed(pytesseract.image_to_string, raw_image, repeat=1)
+    clean = timed(pytesseract.image_to_string, clean_image, repeat=1)
+    print(f"  OCR raw page      : {raw * 1000:8.1f} ms")
+    print(f"  OCR preprocessed  : {(clean + elapsed) * 1000:8.1f} ms (including preprocessing)")
+
+
+if __name__ == '__main__':
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    bench_medication_scanner(pages)
+    bench_medication_index(1000)
+    bench_fuzzy_match(20000)
+    bench_ocr_preprocess()
@@ -201,8 +201,8 @@ Thank you for choosing PharmAssist Enterprise!
 """
 
 # Customer creation routes
-def create_customer_routes(app, user_manager):
-    """Add customer creation routes to Flask app"""
+def create_customer_routes(app, pool):
+    """Add customer creation routes to Flask app; each request checks out a connection from pool"""
     
     @app.route('/admin/create-customer', methods=['GET', 'POST'])
     def create_customer():
@@ -224,8 +224,9 @@ def create_customer_routes(app, user_manager):
                 'admin_last_name': request.form.get('admin_last_name')
             }
             
-            onboarding = CustomerOnboarding(user_manager.connection)
-            result = onboarding.generate_customer_package(customer_data)
+            with pool.connection() as connection:
+                onboarding = CustomerOnboarding(connection)
+                result = onboarding.generate_customer_package(customer_data)
             
             if result['status'] == 'success':
                 return render_template('customer_package.html', package=result['package'])
@@ -237,7 +238,8 @@ def create_customer_routes(app, user_manager):
     @app.route('/login/<subdomain>')
     def branded_login(subdomain):
         """Branded login page for specific pharmacy"""
-        tenant = user_manager.get_tenant_by_subdomain(subdomain)
+        with pool.connection() as connection:
+            tenant = UserManager(connection).get_tenant_by_subdomain(subdomain)
         if not tenant:
             flash('Pharmacy not found', 'error')
             return redirect(url_for('generic_login'))
@@ -247,15 +249,15 @@ def create_customer_routes(app, user_manager):
     @app.route('/api/validate-subdomain/<subdomain>')
     def validate_subdomain(subdomain):
         """API endpoint to check if subdomain is available"""
-        tenant = user_manager.get_tenant_by_subdomain(subdomain)
+        with pool.connection() as connection:
+            tenant = UserManager(connection).get_tenant_by_subdomain(subdomain)
         return jsonify({
             'available': tenant is None,
             'subdomain': subdomain
         })
 
 # Usage example:
-def setup_customer_onboarding(app, db_connection):
-    """Setup customer onboarding system"""
-    user_manager = UserManager(db_connection)
-    create_customer_routes(app, user_manager)
-    return user_manager
+def setup_customer_onboarding(app, pool):
+    """Setup customer onboarding system on a services.db_pool.ConnectionPool"""
+    create_customer_routes(app, pool)
+    return pool
@@ -164,6 +164,10 @@ class IndustryCloner:
     
     def _generate_app_file(self, target_path, config):
         """Generate industry-specific app.py"""
+        # Generated apps (like tattoo_app.py and inktelliassist_app.py) deploy as a
+        # single file, so each carries its own copy of the connection pool
+        # (PooledConnection / DatabaseManager) rather than importing services.db_pool.
+        # Change all copies together; tests/test_vertical_db_pool.py checks they match.
         app_template = f"""\"\"\"
 {config['name']} - AI Document Processing for {config['name'].split()[0]} Industry
 Based on PharmAssist architecture, customized for {config['name'].split()[0].lower()} industry
@@ -182,6 +186,7 @@ import PyPDF2
 import pdfplumber
 import io
 import time
+import threading
 import re
 import json
 
@@ -207,6 +212,112 @@ DATABASE_CONFIG = {{
     'port': os.environ.get('DATABASE_PORT', '5432')
 }}
 
+# Connection pool: most connections open at once, seconds to wait for a free
+# one, seconds an idle connection is kept, and seconds before any connection
+# is closed and reopened (max lifetime); connections idle longer than
+# PING_AFTER seconds are checked with SELECT 1 before reuse
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', '10'))
+DATABASE_POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', '30'))
+DATABASE_POOL_IDLE_TIMEOUT = float(os.environ.get('DATABASE_POOL_IDLE_TIMEOUT', '300'))
+DATABASE_POOL_RECYCLE = float(os.environ.get('DATABASE_POOL_RECYCLE', '3600'))
+DATABASE_POOL_PING_AFTER = float(os.environ.get('DATABASE_POOL_PING_AFTER', '30'))
+
+class PooledConnection:
+    \"\"\"Keep-alive connection from the pool; close() or leaving a with-block hands it back\"\"\"
+    
+    _conn = None
+    
+    def __init__(self, manager, conn, created_at):
+        self._manager = manager
+        self._conn = conn
+        self._created_at = created_at
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._manager.release(conn, self._created_at)
+
+class DatabaseManager:
+    def __init__(self):
+        self.config = DATABASE_CONFIG
+        self._idle = []  # (conn, created_at, released_at), most recently released last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(DATABASE_POOL_SIZE)
+        
+    def get_connection(self):
+        \"\"\"Get a pooled database connection; close() returns it to the pool\"\"\"
+        if not self._slots.acquire(timeout=DATABASE_POOL_TIMEOUT):
+            app.logger.error("Database connection error: no pooled connection free")
+            return None
+        
+        now = time.time()
+        entry = None
+        while entry is None:
+            with self._lock:
+                idle = self._idle.pop() if self._idle else None
+            if idle is None:
+                break
+            conn, created_at, released_at = idle
+            if conn.closed or now - released_at >= DATABASE_POOL_IDLE_TIMEOUT or \\
+                    now - created_at >= DATABASE_POOL_RECYCLE or \\
+                    (now - released_at >= DATABASE_POOL_PING_AFTER and not self._ping(conn)):
+                self._disconnect(conn)
+            else:
+                entry = (conn, created_at)
+        
+        if entry is None:
+            try:
+                entry = (psycopg2.connect(**self.config), now)
+            except psycopg2.Error as e:
+                self._slots.release()
+                app.logger.error(f"Database connection error: {{e}}")
+                return None
+        return PooledConnection(self, *entry)
+    
+    def release(self, conn, created_at):
+        \"\"\"Return a connection to the pool, or close it if it is broken or past its lifetime\"\"\"
+        try:
+            if not conn.closed:
+                conn.rollback()  # Never hand on an open transaction
+        except psycopg2.Error:
+            pass
+        if conn.closed or time.time() - created_at >= DATABASE_POOL_RECYCLE:
+            self._disconnect(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, created_at, time.time()))
+        self._slots.release()
+    
+    def _ping(self, conn):
+        \"\"\"Whether an idle connection still answers; the server may have dropped it\"\"\"
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            app.logger.warning(f"Discarding dead database connection: {{e}}")
+            return False
+    
+    def _disconnect(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+# Initialize database manager
+db_manager = DatabaseManager()
+
 # [Rest of the application code would be here - similar to tattoo_app.py but customized]
 # This is a template generator - full implementation would include all routes and functionality
 
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+processing_history partitioning migration.
+
+Converts a processing_history table created before monthly partitioning
+into the partitioned layout. The app does not do this on startup: every row
+is copied inside one transaction that holds an exclusive lock on the table,
+so run this once during a maintenance window. Until then the app keeps
+writing to the unpartitioned table.
+"""
+
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import db
+
+def migrate_history():
+    """Convert processing_history to monthly partitions"""
+    if not db.pool:
+        print("❌ Database not available")
+        return False
+    
+    print("Converting processing_history to monthly partitions...")
+    with db.pool.cursor() as cursor:
+        converted = db.history_partitions.convert(cursor)
+    
+    if converted:
+        print("✅ processing_history converted to monthly partitions")
+    else:
+        print("✅ processing_history is already partitioned")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if migrate_history() else 1)
@@ -4,10 +4,14 @@ Layer 3: Core PDF processing functionality with multiple methods
 """
 import io
 import os
-import re
+import math
+import time
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 
 # PDF processing libraries
 try:
@@ -30,13 +34,419 @@ try:
 except ImportError:
     OCR_AVAILABLE = False
 
+from services.medication_scanner import MedicationIndex, extract_medications
+from services import ocr_pool, ocr_preprocess
+from services.ocr_pool import OcrTimeoutError, ocr_data_to_page
+from services.deadline import Deadline, DeadlineExceeded
+from services.table_detection import extract_page_tables, summarize_table_checks
+from services.page_buffer import PageBuffer
+
 logger = logging.getLogger(__name__)
 
+# Bump when extraction output changes so cached results are not reused
+EXTRACTOR_VERSION = '1.10'
+
+# Page-parallel extraction settings (PDF_WORKERS=1 keeps extraction in the request thread)
+DEFAULT_WORKERS = int(os.getenv('PDF_WORKERS', '1'))
+PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '4'))
+
+# Hybrid routing: pages with this much text layer skip OCR; sparse pages
+# mostly covered by images are treated as scans and OCR'd
+HYBRID_MIN_TEXT_CHARS = int(os.getenv('HYBRID_MIN_TEXT_CHARS', '50'))
+HYBRID_IMAGE_COVERAGE = float(os.getenv('HYBRID_IMAGE_COVERAGE', '0.5'))
+
+# Adaptive OCR: pages are rendered at the first scale and re-rendered at the
+# next only while mean word confidence stays below threshold. Pages that read
+# as (nearly) blank - covers, signature pages - are never re-rendered.
+OCR_ADAPTIVE = os.getenv('OCR_ADAPTIVE', 'true').lower() == 'true'
+OCR_FIXED_SCALE = 2.0
+OCR_MIN_CONFIDENCE = float(os.getenv('OCR_MIN_CONFIDENCE', '75'))
+OCR_ESCALATE_MIN_WORDS = int(os.getenv('OCR_ESCALATE_MIN_WORDS', '3'))
+
+
+def _parse_scales(value: str) -> List[float]:
+    """OCR_SCALES as positive floats in the given order; the fixed scale if none are usable"""
+    scales = []
+    for item in value.split(','):
+        try:
+            scale = float(item)
+        except ValueError:
+            continue
+        if scale > 0:
+            scales.append(scale)
+    if not scales:
+        logger.warning(f"OCR_SCALES={value!r} has no usable scale, using {OCR_FIXED_SCALE}")
+        return [OCR_FIXED_SCALE]
+    return scales
+
+
+OCR_SCALES = _parse_scales(os.getenv('OCR_SCALES', '1.5,2.0,3.0'))
+
+# Human-readable names reported as 'method_used'
+METHOD_LABELS = {
+    'pypdf2': 'PyPDF2 Text Extraction',
+    'pdfplumber': 'PDFplumber Table & Text Extraction',
+    'ocr': 'OCR Text Recognition',
+    'hybrid': 'Hybrid Text Layer + OCR'
+}
+
+# Process pools are shared across PDFProcessor instances (app.py builds one per request)
+_process_pools: Dict[int, ProcessPoolExecutor] = {}
+_process_pools_lock = threading.Lock()
+
+# Workers are started from a clean server process rather than forked from
+# this one: the app runs background threads (history writer, job queue, OCR
+# pool) and a fork could copy one of their locks while it is held
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool for the given worker count"""
+    with _process_pools_lock:
+        pool = _process_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context(_START_METHOD))
+            _process_pools[workers] = pool
+        return pool
+
+
+def _discard_process_pool(workers: int, pool: Optional[ProcessPoolExecutor] = None):
+    """Drop a broken shared pool (unless another request already replaced it)"""
+    with _process_pools_lock:
+        if pool is None or _process_pools.get(workers) is pool:
+            pool = _process_pools.pop(workers, None)
+        else:
+            pool = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shard_pages(page_count: int, shards: int) -> List[Tuple[int, int]]:
+    """Split pages [0, page_count) into contiguous (start, end) ranges"""
+    if page_count <= 0:
+        return []
+    shards = max(1, min(shards, page_count))
+    size = math.ceil(page_count / shards)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _page_range(start: int, end: int, deadline: Optional[Deadline] = None):
+    """Page numbers [start, end), stopping once the deadline has passed"""
+    for page_num in range(start, end):
+        if deadline is not None and deadline.expired():
+            return
+        yield page_num
+
+
+class ParsedDocument:
+    """
+    A PDF parsed once and shared between method detection and extraction.
+
+    Each library's parser (PyPDF2 reader, pdfplumber document, fitz document)
+    is opened lazily at most once. Page text pulled by a probe (method
+    detection, hybrid routing) is kept only until the extractor takes it,
+    and each page's cached state is released once it has been extracted.
+    """
+    
+    def __init__(self, file_content: bytes):
+        self.file_content = file_content
+        self._reader = None
+        self._plumber = None
+        self._fitz_doc = None
+        self._page_text: Dict[Tuple[str, int], str] = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @property
+    def reader(self):
+        """PyPDF2 reader (parsed on first use)"""
+        if self._reader is None:
+            self._reader = PyPDF2.PdfReader(io.BytesIO(self.file_content))
+        return self._reader
+    
+    @property
+    def plumber(self):
+        """pdfplumber document (parsed on first use)"""
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(io.BytesIO(self.file_content))
+        return self._plumber
+    
+    @property
+    def fitz_doc(self):
+        """PyMuPDF document (parsed on first use)"""
+        if self._fitz_doc is None:
+            self._fitz_doc = fitz.open(stream=io.BytesIO(self.file_content), filetype="pdf")
+        return self._fitz_doc
+    
+    def count_pages(self, method: str) -> int:
+        """Count pages with whichever parser is already open, else the method's own"""
+        if self._reader is not None:
+            return len(self._reader.pages)
+        if self._plumber is not None:
+            return len(self._plumber.pages)
+        if self._fitz_doc is not None:
+            return len(self._fitz_doc)
+        
+        if method == 'pypdf2':
+            return len(self.reader.pages)
+        if method == 'pdfplumber':
+            return len(self.plumber.pages)
+        return len(self.fitz_doc)
+    
+    def page_text(self, page_num: int, method: str = 'pypdf2') -> str:
+        """Text layer of one page (0-based) for a probe, kept until take_page_text() claims it"""
+        key = (method, page_num)
+        if key not in self._page_text:
+            self._page_text[key] = self._extract_text(page_num, method)
+        return self._page_text[key]
+    
+    def take_page_text(self, page_num: int, method: str) -> str:
+        """Text layer of one page for extraction, reusing (and dropping) a probe's copy"""
+        key = (method, page_num)
+        if key in self._page_text:
+            return self._page_text.pop(key)
+        return self._extract_text(page_num, method)
+    
+    def _extract_text(self, page_num: int, method: str) -> str:
+        if method == 'pypdf2':
+            return self.reader.pages[page_num].extract_text()
+        if method == 'pdfplumber':
+            return self.plumber.pages[page_num].extract_text()
+        raise ValueError(f"No text layer extraction for method: {method}")
+    
+    def release_page(self, page_num: int):
+        """Drop everything held for a page once it has been extracted"""
+        for key in [key for key in self._page_text if key[1] == page_num]:
+            del self._page_text[key]
+        if self._plumber is not None:
+            # pdfplumber keeps each page's parsed layout and objects until flushed
+            page = self._plumber.pages[page_num]
+            getattr(page, 'close', page.flush_cache)()
+    
+    def image_coverage(self, page_num: int) -> float:
+        """Fraction of the page area covered by embedded images (0.0 - 1.0)"""
+        if OCR_AVAILABLE:
+            page = self.fitz_doc.load_page(page_num)
+            page_area = abs(page.rect)
+            if not page_area:
+                return 0.0
+            covered = 0.0
+            for info in page.get_image_info():
+                bbox = fitz.Rect(info['bbox']) & page.rect
+                covered += abs(bbox)
+            return min(covered / page_area, 1.0)
+        
+        if PDFPLUMBER_AVAILABLE:
+            page = self.plumber.pages[page_num]
+            page_area = float(page.width * page.height)
+            if not page_area:
+                return 0.0
+            covered = sum(
+                max(0, min(img['x1'], page.width) - max(img['x0'], 0)) *
+                max(0, min(img['bottom'], page.height) - max(img['top'], 0))
+                for img in page.images
+            )
+            return min(float(covered) / page_area, 1.0)
+        
+        return 0.0
+    
+    def classify_page(self, page_num: int) -> Dict:
+        """
+        Decide whether a page's text layer is usable or the page needs OCR.
+
+        Dense text layers are always used; sparse pages that are mostly
+        image (scans, faxes) are routed to OCR.
+        """
+        text_method = 'pypdf2' if PYPDF2_AVAILABLE else 'pdfplumber'
+        text = self.page_text(page_num, text_method) or ''
+        text_chars = len(text.strip())
+        
+        if text_chars >= HYBRID_MIN_TEXT_CHARS:
+            coverage = None
+            route = 'text'
+        else:
+            coverage = self.image_coverage(page_num)
+            route = 'ocr' if coverage >= HYBRID_IMAGE_COVERAGE and OCR_AVAILABLE else 'text'
+        
+        return {
+            'method': route,
+            'text_method': text_method,
+            'text_chars': text_chars,
+            'image_coverage': round(coverage, 3) if coverage is not None else None
+        }
+    
+    def ocr_page(self, page_num: int, deadline: Optional[Deadline] = None) -> str:
+        """Render one page and OCR it"""
+        return self.ocr_page_result(page_num, deadline)['text']
+    
+    def ocr_page_result(self, page_num: int, deadline: Optional[Deadline] = None) -> Dict:
+        """
+        OCR one page, escalating resolution only when needed.
+
+        In adaptive mode the page is tried at each of OCR_SCALES in turn and
+        stops at the first result meeting OCR_MIN_CONFIDENCE, or reading fewer
+        than OCR_ESCALATE_MIN_WORDS words (a higher scale will not find text on
+        a blank page); otherwise the most confident attempt is kept. Returns
+        {'text', 'scale', 'confidence', 'word_count', 'attempts'}.
+
+        With a deadline, each Tesseract call is limited to the time left and
+        escalation stops at the deadline with the best attempt so far; if no
+        attempt finished, OcrTimeoutError or DeadlineExceeded is raised.
+        """
+        scales = OCR_SCALES if OCR_ADAPTIVE and OCR_SCALES else [OCR_FIXED_SCALE]
+        best = None
+        attempts = 0
+        
+        for scale in scales:
+            timeout = None
+            if deadline is not None:
+                if best is not None and deadline.expired():
+                    break
+                deadline.check()
+                timeout = deadline.timeout(ocr_pool.OCR_PAGE_TIMEOUT)
+            
+            try:
+                ocr_data = ocr_pool.image_to_data(self._render_for_ocr(page_num, scale),
+                                                  config='--psm 6', timeout=timeout)
+            except OcrTimeoutError:
+                if best is not None and deadline is not None and deadline.expired():
+                    break
+                raise
+            
+            attempts += 1
+            page = ocr_data_to_page(ocr_data)
+            result = {
+                'text': page['text'],
+                'scale': scale,
+                'confidence': page['confidence'],
+                'word_count': len(page['words']),
+                'attempts': attempts
+            }
+            
+            if best is None or result['confidence'] > best['confidence']:
+                best = result
+            if result['confidence'] >= OCR_MIN_CONFIDENCE:
+                best = result
+                break
+            if result['word_count'] < OCR_ESCALATE_MIN_WORDS:
+                break
+        
+        best['attempts'] = attempts
+        return best
+    
+    def _render_for_ocr(self, page_num: int, scale: float):
+        """Render a page at the given zoom as a PIL image ready for OCR"""
+        page = self.fitz_doc.load_page(page_num)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        
+        # Binarize/deskew straight from the pixmap buffer, or wrap it as is
+        if ocr_preprocess.preprocessing_enabled():
+            return ocr_preprocess.preprocess_pixmap(pix)
+        return ocr_preprocess.pixmap_to_image(pix)
+    
+    def extract_pages(self, method: str, start: int, end: int,
+                      deadline: Optional[Deadline] = None) -> List[Dict]:
+        """
+        Extract pages [start, end) with a single method.
+
+        Returns plain per-page dicts:
+        {'page': 1-based number, 'text': str, 'tables': [table rows, ...]}
+        OCR pages also carry the scale and confidence used under 'ocr'; hybrid
+        pages carry the routing decision (with OCR scale) under 'routing';
+        pdfplumber pages carry the table pre-check outcome under 'table_check'.
+
+        No page is started once the deadline has passed, and a page whose OCR
+        the deadline cut off is dropped, so fewer pages may be returned.
+        """
+        if method not in METHOD_LABELS:
+            raise ValueError(f"Unknown extraction method: {method}")
+        
+        pages = []
+        try:
+            if method == 'pypdf2':
+                for page_num in _page_range(start, end, deadline):
+                    text = self.take_page_text(page_num, 'pypdf2')
+                    pages.append({'page': page_num + 1, 'text': text, 'tables': []})
+                    self.release_page(page_num)
+            
+            elif method == 'pdfplumber':
+                for page_num in _page_range(start, end, deadline):
+                    text = self.take_page_text(page_num, 'pdfplumber')
+                    # Full table extraction only on pages the pre-check flags
+                    page_tables, table_check = extract_page_tables(self.plumber.pages[page_num])
+                    pages.append({'page': page_num + 1, 'text': text, 'tables': page_tables,
+                                  'table_check': table_check})
+                    self.release_page(page_num)
+            
+            elif method == 'ocr':
+                for page_num in _page_range(start, end, deadline):
+                    ocr = self.ocr_page_result(page_num, deadline)
+                    text = ocr.pop('text')
+                    pages.append({'page': page_num + 1, 'text': text, 'tables': [], 'ocr': ocr})
+                    self.release_page(page_num)
+            
+            else:
+                for page_num in _page_range(start, end, deadline):
+                    routing = self.classify_page(page_num)
+                    if routing['method'] == 'ocr':
+                        ocr = self.ocr_page_result(page_num, deadline)
+                        text = ocr.pop('text')
+                        routing['ocr_scale'] = ocr['scale']
+                        routing['ocr_confidence'] = ocr['confidence']
+                    else:
+                        text = self.take_page_text(page_num, routing['text_method'])
+                    pages.append({'page': page_num + 1, 'text': text, 'tables': [], 'routing': routing})
+                    self.release_page(page_num)
+        
+        except (OcrTimeoutError, DeadlineExceeded):
+            # The deadline cut off the page in flight; a plain per-page OCR timeout still fails
+            if deadline is None or not deadline.expired():
+                raise
+        
+        return pages
+    
+    def close(self):
+        """Release parser resources"""
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+        if self._fitz_doc is not None:
+            self._fitz_doc.close()
+            self._fitz_doc = None
+        self._reader = None
+        self._page_text.clear()
+
+
+def _extract_page_range(file_content: bytes, method: str, start: int, end: int,
+                        expires_at: Optional[float] = None) -> List[Dict]:
+    """
+    Extract a page range inside a pool worker (takes only picklable arguments).
+    expires_at is the request deadline as a wall-clock timestamp, so time the
+    shard spent queued counts against it.
+    """
+    deadline = Deadline(expires_at - time.time()) if expires_at is not None else None
+    with ParsedDocument(file_content) as document:
+        return document.extract_pages(method, start, end, deadline)
+
+
 class PDFProcessor:
     """Main PDF processing class with multiple extraction methods"""
     
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None, parallel_min_pages: int = PARALLEL_MIN_PAGES):
+        """
+        Args:
+            workers: Process pool size for page-parallel extraction
+                     (defaults to PDF_WORKERS; 1 disables the pool)
+            parallel_min_pages: Smallest document that is worth sharding
+        """
         self.supported_methods = self._check_available_methods()
+        self.workers = max(1, workers if workers is not None else DEFAULT_WORKERS)
+        self.parallel_min_pages = parallel_min_pages
         logger.info(f"PDF Processor initialized with methods: {list(self.supported_methods.keys())}")
     
     def _check_available_methods(self) -> Dict[str, bool]:
@@ -44,17 +454,21 @@ class PDFProcessor:
         return {
             'pypdf2': PYPDF2_AVAILABLE,
             'pdfplumber': PDFPLUMBER_AVAILABLE,
-            'ocr': OCR_AVAILABLE
+            'ocr': OCR_AVAILABLE,
+            'hybrid': OCR_AVAILABLE and (PYPDF2_AVAILABLE or PDFPLUMBER_AVAILABLE)
         }
     
-    def process_pdf(self, file_content: bytes, method: str = 'auto', filename: str = '') -> Dict:
+    def process_pdf(self, file_content: bytes, method: str = 'auto', filename: str = '',
+                    deadline: Optional[Deadline] = None) -> Dict:
         """
         Main processing function that routes to appropriate method
         
         Args:
             file_content: PDF file content as bytes
-            method: Processing method ('auto', 'pypdf2', 'pdfplumber', 'ocr')
+            method: Processing method ('auto', 'pypdf2', 'pdfplumber', 'ocr', 'hybrid')
             filename: Original filename for reference
+            deadline: Optional time budget; when it runs out the pages finished
+                      so far are returned with 'truncated': True
             
         Returns:
             Dict with processing results
@@ -62,20 +476,24 @@ class PDFProcessor:
         try:
             logger.info(f"Processing PDF: {filename} with method: {method}")
             
-            if method == 'auto':
-                method = self._detect_best_method(file_content)
-                logger.info(f"Auto-detected method: {method}")
-            
-            # Route to appropriate processor
-            if method == 'pypdf2' and self.supported_methods['pypdf2']:
-                return self._process_with_pypdf2(file_content, filename)
-            elif method == 'pdfplumber' and self.supported_methods['pdfplumber']:
-                return self._process_with_pdfplumber(file_content, filename)
-            elif method == 'ocr' and self.supported_methods['ocr']:
-                return self._process_with_ocr(file_content, filename)
-            else:
-                # Fallback to basic text extraction
-                return self._process_basic(file_content, filename)
+            # One parsed handle serves both detection and extraction
+            with ParsedDocument(file_content) as document:
+                if method == 'auto':
+                    method = self._detect_best_method(document)
+                    logger.info(f"Auto-detected method: {method}")
+                
+                # Route to appropriate processor
+                if method == 'pypdf2' and self.supported_methods['pypdf2']:
+                    return self._process_with_pypdf2(document, filename, deadline)
+                elif method == 'pdfplumber' and self.supported_methods['pdfplumber']:
+                    return self._process_with_pdfplumber(document, filename, deadline)
+                elif method == 'ocr' and self.supported_methods['ocr']:
+                    return self._process_with_ocr(document, filename, deadline)
+                elif method == 'hybrid' and self.supported_methods['hybrid']:
+                    return self._process_with_hybrid(document, filename, deadline)
+                else:
+                    # Fallback to basic text extraction
+                    return self._process_basic(file_content, filename)
                 
         except Exception as e:
             logger.error(f"Error processing PDF {filename}: {str(e)}")
@@ -85,21 +503,22 @@ class PDFProcessor:
                 'method_used': method
             }
     
-    def _detect_best_method(self, file_content: bytes) -> str:
+    def _detect_best_method(self, document: ParsedDocument) -> str:
         """Automatically detect the best processing method for the PDF"""
         try:
             # Try to extract some text with PyPDF2 first (fastest)
             if PYPDF2_AVAILABLE:
-                pdf_file = io.BytesIO(file_content)
-                reader = PyPDF2.PdfReader(pdf_file)
-                
-                if len(reader.pages) > 0:
-                    text = reader.pages[0].extract_text()
+                if len(document.reader.pages) > 0:
+                    text = document.page_text(0, 'pypdf2')
+                    # Page 0 says little about later pages, so text-layer and scanned
+                    # documents are routed per page when OCR is installed
                     if len(text.strip()) > 50:  # Good amount of extractable text
-                        return 'pypdf2'
+                        return 'hybrid' if self.supported_methods['hybrid'] else 'pypdf2'
                     elif len(text.strip()) > 10:  # Some text, try pdfplumber for tables
                         return 'pdfplumber' if PDFPLUMBER_AVAILABLE else 'pypdf2'
                     else:
+                        if self.supported_methods['hybrid']:
+                            return 'hybrid'
                         return 'ocr' if OCR_AVAILABLE else 'pdfplumber'
             
             # Fallback order
@@ -114,26 +533,183 @@ class PDFProcessor:
             logger.warning(f"Method detection failed: {e}, defaulting to pdfplumber")
             return 'pdfplumber' if PDFPLUMBER_AVAILABLE else 'pypdf2'
     
-    def _process_with_pypdf2(self, file_content: bytes, filename: str) -> Dict:
+    def _extract_pages(self, document: ParsedDocument, method: str,
+                       deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Extract every page's text and tables (or those finished before the deadline), in page order"""
+        return list(self._iter_extracted_pages(document, method, deadline))
+    
+    def _iter_extracted_pages(self, document: ParsedDocument, method: str,
+                              deadline: Optional[Deadline] = None):
+        """
+        Yield per-page text and tables in page order, sharding page ranges
+        across the process pool for large documents.
+
+        Stops at the deadline: shards still queued are cancelled and running
+        ones stop after their current page, so pages can be missing from the
+        end of the document (or of a shard).
+        """
+        page_count = document.count_pages(method)
+        if self.workers <= 1 or page_count < self.parallel_min_pages:
+            for page_num in _page_range(0, page_count, deadline):
+                yield from document.extract_pages(method, page_num, page_num + 1, deadline)
+            return
+        
+        # Two shards per worker keeps workers busy when page costs are uneven
+        shards = _shard_pages(page_count, self.workers * 2)
+        remaining = deadline.remaining() if deadline is not None else None
+        expires_at = time.time() + remaining if remaining is not None else None
+        pool = None
+        try:
+            pool = _get_process_pool(self.workers)
+            futures = [pool.submit(_extract_page_range, document.file_content, method, start, end, expires_at)
+                       for start, end in shards]
+        except Exception as e:
+            logger.warning(f"Parallel {method} extraction unavailable: {e}, falling back to sequential")
+            _discard_process_pool(self.workers, pool)
+            futures = [None] * len(shards)
+        
+        for (start, end), future in zip(shards, futures):
+            try:
+                if future is None:
+                    raise RuntimeError("no process pool")
+                # Workers stop at the deadline themselves; the grace second covers returning their pages
+                remaining = deadline.remaining() if deadline is not None else None
+                pages = future.result(timeout=remaining + 1 if remaining is not None else None)
+            except FutureTimeoutError:
+                logger.warning(f"Parallel {method} extraction passed its deadline at pages {start + 1}-{end}")
+                for pending in futures:
+                    pending.cancel()
+                return
+            except Exception as e:
+                # A broken pool must not fail the upload; retry the shard in the request thread
+                if future is not None:
+                    logger.warning(f"Parallel {method} extraction failed: {e}, retrying pages {start + 1}-{end}")
+                    _discard_process_pool(self.workers, pool)
+                pages = document.extract_pages(method, start, end, deadline)
+            yield from pages
+    
+    def _truncation(self, document: ParsedDocument, method: str, pages_processed: int,
+                    deadline: Optional[Deadline] = None) -> Dict:
+        """Result fields saying whether the deadline cut extraction short"""
+        pages_total = document.count_pages(method)
+        fields = {'truncated': pages_processed < pages_total, 'pages_total': pages_total}
+        if fields['truncated']:
+            fields['deadline_seconds'] = deadline.seconds if deadline is not None else None
+            logger.warning(f"Extraction deadline reached after {pages_processed} of {pages_total} pages")
+        return fields
+    
+    def iter_pages(self, file_content: bytes, method: str = 'auto', filename: str = '',
+                   deadline: Optional[Deadline] = None):
+        """
+        Streaming variant of process_pdf.
+
+        Yields one record per page as soon as it is extracted, then a summary
+        record. The document releases each page's text and parser caches once
+        the page is extracted, so memory is bounded by one page (or, with the
+        process pool, one shard) rather than by document length.
+
+        Page records:    {'type': 'page', 'page', 'pages_total', 'method', 'text', 'tables_found',
+                          'medications', 'medications_so_far', 'ocr_scale' (OCR'd pages only)}
+        Summary record:  {'type': 'summary', 'success', 'method_used', 'pages_processed',
+                          'pages_total', 'truncated', 'medications_found', 'medications_count',
+                          'caretend_output', 'filename'}
+        Error record:    {'type': 'error', 'success': False, 'error', 'method_used'}
+
+        When the deadline runs out, no further pages are yielded and the summary
+        covers the pages sent so far with 'truncated': True.
+        """
+        try:
+            logger.info(f"Streaming PDF: {filename} with method: {method}")
+            
+            with ParsedDocument(file_content) as document:
+                if method == 'auto':
+                    method = self._detect_best_method(document)
+                    logger.info(f"Auto-detected method: {method}")
+                
+                if not self.supported_methods.get(method):
+                    yield {'type': 'summary', **self._process_basic(file_content, filename)}
+                    return
+                
+                pages_total = document.count_pages(method)
+                medications = MedicationIndex()
+                pages_processed = 0
+                table_checks = []
+                
+                for page in self._iter_extracted_pages(document, method, deadline):
+                    pages_processed += 1
+                    if page.get('table_check'):
+                        table_checks.append(page['table_check'])
+                    
+                    page_medications = []
+                    if page['tables']:
+                        tables = [{'page': page['page'], 'table': table_num + 1, 'data': table}
+                                  for table_num, table in enumerate(page['tables'])]
+                        page_medications.extend(self._extract_medications_from_tables(tables))
+                    if page['text']:
+                        page_medications.extend(self._extract_medications(page['text'], lambda offset: page['page']))
+                    
+                    # Only report medications not already seen on earlier pages
+                    new_medications = medications.extend(page_medications)
+                    
+                    routing = page.get('routing')
+                    record = {
+                        'type': 'page',
+                        'page': page['page'],
+                        'pages_total': pages_total,
+                        'method': routing['method'] if routing else method,
+                        'text': page['text'] or '',
+                        'tables_found': len(page['tables']),
+                        'medications': new_medications,
+                        'medications_so_far': len(medications)
+                    }
+                    ocr_scale = page['ocr']['scale'] if page.get('ocr') else (routing or {}).get('ocr_scale')
+                    if ocr_scale is not None:
+                        record['ocr_scale'] = ocr_scale
+                    yield record
+                
+                yield {
+                    'type': 'summary',
+                    'success': True,
+                    'method_used': METHOD_LABELS[method],
+                    'pages_processed': pages_processed,
+                    **self._truncation(document, method, pages_processed, deadline),
+                    **({'table_detection': summarize_table_checks(table_checks)} if table_checks else {}),
+                    'medications_found': medications.medications(),
+                    'medications_count': len(medications),
+                    'caretend_output': self._convert_to_caretend(medications.medications(), filename),
+                    'filename': filename
+                }
+        
+        except Exception as e:
+            logger.error(f"Error streaming PDF {filename}: {str(e)}")
+            yield {
+                'type': 'error',
+                'success': False,
+                'error': f"Processing failed: {str(e)}",
+                'method_used': method
+            }
+    
+    def _process_with_pypdf2(self, document: ParsedDocument, filename: str,
+                             deadline: Optional[Deadline] = None) -> Dict:
         """Process PDF using PyPDF2 for text extraction"""
         try:
-            pdf_file = io.BytesIO(file_content)
-            reader = PyPDF2.PdfReader(pdf_file)
+            pages = self._extract_pages(document, 'pypdf2', deadline)
             
-            extracted_text = ""
-            pages_processed = len(reader.pages)
+            text = PageBuffer()
+            pages_processed = len(pages)
             
-            for page_num, page in enumerate(reader.pages):
-                text = page.extract_text()
-                extracted_text += f"\n--- Page {page_num + 1} ---\n{text}\n"
+            for page in pages:
+                text.add_page(page['page'], page['text'], f"\n--- Page {page['page']} ---\n", "\n")
             
-            medications = self._extract_medications(extracted_text)
+            extracted_text = text.text()
+            medications = self._extract_medications(extracted_text, text.page_at)
             caretend_output = self._convert_to_caretend(medications, filename)
             
             return {
                 'success': True,
-                'method_used': 'PyPDF2 Text Extraction',
+                'method_used': METHOD_LABELS['pypdf2'],
                 'pages_processed': pages_processed,
+                **self._truncation(document, 'pypdf2', pages_processed, deadline),
                 'extracted_text': extracted_text,
                 'medications_found': medications,
                 'medications_count': len(medications),
@@ -145,42 +721,43 @@ class PDFProcessor:
             logger.error(f"PyPDF2 processing failed: {e}")
             raise
     
-    def _process_with_pdfplumber(self, file_content: bytes, filename: str) -> Dict:
+    def _process_with_pdfplumber(self, document: ParsedDocument, filename: str,
+                                 deadline: Optional[Deadline] = None) -> Dict:
         """Process PDF using pdfplumber for table extraction"""
         try:
-            pdf_file = io.BytesIO(file_content)
-            extracted_text = ""
+            pages = self._extract_pages(document, 'pdfplumber', deadline)
+            text = PageBuffer()
             tables = []
-            pages_processed = 0
+            pages_processed = len(pages)
             
-            with pdfplumber.open(pdf_file) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    pages_processed += 1
-                    
-                    # Extract text
-                    text = page.extract_text()
-                    if text:
-                        extracted_text += f"\n--- Page {page_num + 1} ---\n{text}\n"
-                    
-                    # Extract tables
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        for table_num, table in enumerate(page_tables):
-                            tables.append({
-                                'page': page_num + 1,
-                                'table': table_num + 1,
-                                'data': table
-                            })
+            for page in pages:
+                # Extract text
+                if page['text']:
+                    text.add_page(page['page'], page['text'], f"\n--- Page {page['page']} ---\n", "\n")
+                
+                # Extract tables
+                for table_num, table in enumerate(page['tables']):
+                    tables.append({
+                        'page': page['page'],
+                        'table': table_num + 1,
+                        'data': table
+                    })
             
-            medications = self._extract_medications_from_tables(tables) + self._extract_medications(extracted_text)
+            # Table and text hits for the same drug become one record
+            medications = MedicationIndex(self._extract_medications_from_tables(tables))
+            extracted_text = text.text()
+            medications.extend(self._extract_medications(extracted_text, text.page_at))
+            medications = medications.medications()
             caretend_output = self._convert_to_caretend(medications, filename)
             
             return {
                 'success': True,
-                'method_used': 'PDFplumber Table & Text Extraction',
+                'method_used': METHOD_LABELS['pdfplumber'],
                 'pages_processed': pages_processed,
+                **self._truncation(document, 'pdfplumber', pages_processed, deadline),
                 'extracted_text': extracted_text,
                 'tables_found': len(tables),
+                'table_detection': summarize_table_checks(page.get('table_check') for page in pages),
                 'medications_found': medications,
                 'medications_count': len(medications),
                 'caretend_output': caretend_output,
@@ -191,41 +768,31 @@ class PDFProcessor:
             logger.error(f"PDFplumber processing failed: {e}")
             raise
     
-    def _process_with_ocr(self, file_content: bytes, filename: str) -> Dict:
+    def _process_with_ocr(self, document: ParsedDocument, filename: str,
+                          deadline: Optional[Deadline] = None) -> Dict:
         """Process PDF using OCR for scanned documents"""
         try:
-            pdf_file = io.BytesIO(file_content)
-            extracted_text = ""
-            pages_processed = 0
-            
             # Convert PDF to images and OCR each page
-            doc = fitz.open(stream=pdf_file, filetype="pdf")
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                pages_processed += 1
-                
-                # Convert page to image
-                mat = fitz.Matrix(2.0, 2.0)  # Increase resolution
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-                
-                # OCR the image
-                image = Image.open(io.BytesIO(img_data))
-                text = pytesseract.image_to_string(image, config='--psm 6')
-                
-                extracted_text += f"\n--- Page {page_num + 1} (OCR) ---\n{text}\n"
+            pages = self._extract_pages(document, 'ocr', deadline)
+            text = PageBuffer()
+            pages_processed = len(pages)
+            page_ocr = []
             
-            doc.close()
+            for page in pages:
+                text.add_page(page['page'], page['text'], f"\n--- Page {page['page']} (OCR) ---\n", "\n")
+                page_ocr.append({'page': page['page'], **page['ocr']})
             
-            medications = self._extract_medications(extracted_text)
+            extracted_text = text.text()
+            medications = self._extract_medications(extracted_text, text.page_at)
             caretend_output = self._convert_to_caretend(medications, filename)
             
             return {
                 'success': True,
-                'method_used': 'OCR Text Recognition',
+                'method_used': METHOD_LABELS['ocr'],
                 'pages_processed': pages_processed,
+                **self._truncation(document, 'ocr', pages_processed, deadline),
                 'extracted_text': extracted_text,
+                'page_ocr': page_ocr,
                 'medications_found': medications,
                 'medications_count': len(medications),
                 'caretend_output': caretend_output,
@@ -236,6 +803,45 @@ class PDFProcessor:
             logger.error(f"OCR processing failed: {e}")
             raise
     
+    def _process_with_hybrid(self, document: ParsedDocument, filename: str,
+                             deadline: Optional[Deadline] = None) -> Dict:
+        """Process PDF page by page, using the text layer where present and OCR for scanned pages"""
+        try:
+            pages = self._extract_pages(document, 'hybrid', deadline)
+            text = PageBuffer()
+            page_methods = []
+            
+            for page in pages:
+                routing = page['routing']
+                marker = " (OCR)" if routing['method'] == 'ocr' else ""
+                text.add_page(page['page'], page['text'], f"\n--- Page {page['page']}{marker} ---\n", "\n")
+                page_methods.append({'page': page['page'], **routing})
+            
+            ocr_pages = sum(1 for page in page_methods if page['method'] == 'ocr')
+            
+            extracted_text = text.text()
+            medications = self._extract_medications(extracted_text, text.page_at)
+            caretend_output = self._convert_to_caretend(medications, filename)
+            
+            return {
+                'success': True,
+                'method_used': METHOD_LABELS['hybrid'],
+                'pages_processed': len(pages),
+                **self._truncation(document, 'hybrid', len(pages), deadline),
+                'extracted_text': extracted_text,
+                'page_methods': page_methods,
+                'ocr_pages': ocr_pages,
+                'text_layer_pages': len(pages) - ocr_pages,
+                'medications_found': medications,
+                'medications_count': len(medications),
+                'caretend_output': caretend_output,
+                'filename': filename
+            }
+            
+        except Exception as e:
+            logger.error(f"Hybrid processing failed: {e}")
+            raise
+    
     def _process_basic(self, file_content: bytes, filename: str) -> Dict:
         """Basic processing when no specialized libraries are available"""
         return {
@@ -249,108 +855,9 @@ class PDFProcessor:
             'filename': filename
         }
     
-    def _extract_medications(self, text: str) -> List[Dict]:
-        """Extract medication information from text using comprehensive pattern matching"""
-        medications = []
-        
-        # Clean and normalize text
-        text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
-        
-        # Enhanced medication patterns - more flexible and comprehensive
-        patterns = [
-            # Pattern 1: Drug name followed by dosage (most common)
-            r'(\b[A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?|tabs?|capsules?)\b',
-            
-            # Pattern 2: Numbered list format (1. Drug 10mg, 2. Drug 20mg)
-            r'\d+\.?\s*([A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?|tabs?|capsules?)',
-            
-            # Pattern 3: With dosing instructions
-            r'([A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)\s+(?:take|taken?|daily|twice|once|bid|tid|qid|prn)',
-            
-            # Pattern 4: Tablet/capsule format
-            r'([A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*mg\s+(?:tablet|capsule|tab|cap)',
-            
-            # Pattern 5: Generic format with parentheses
-            r'([A-Za-z][A-Za-z\s\-]{2,30}?)\s*\(\s*(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)\s*\)',
-            
-            # Pattern 6: Simple drug name with mg
-            r'\b([A-Za-z][A-Za-z]{2,}(?:\s+[A-Za-z]{2,})*)\s+(\d+)\s*mg\b',
-        ]
-        
-        # Common medication name patterns (to improve recognition)
-        common_drug_endings = [
-            r'\w+pril\b',  # ACE inhibitors (lisinopril, enalapril)
-            r'\w+sartan\b',  # ARBs (losartan, valsartan)
-            r'\w+statin\b',  # Statins (atorvastatin, simvastatin)
-            r'\w+metformin\b',  # Diabetes (metformin)
-            r'\w+lol\b',  # Beta blockers (metoprolol, atenolol)
-            r'\w+dipine\b',  # Calcium channel blockers (amlodipine)
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                drug_name = match.group(1).strip()
-                dosage_amount = match.group(2)
-                dosage_unit = match.group(3) if len(match.groups()) >= 3 else 'mg'
-                
-                # Clean up drug name
-                drug_name = re.sub(r'^[^\w]+|[^\w]+$', '', drug_name)  # Remove leading/trailing non-word chars
-                drug_name = re.sub(r'\s+', ' ', drug_name)  # Normalize spaces
-                
-                # Skip if name is too short or contains numbers
-                if len(drug_name) < 3 or re.search(r'\d', drug_name):
-                    continue
-                
-                # Skip common false positives
-                false_positives = ['mg', 'tab', 'tablet', 'capsule', 'daily', 'twice', 'once', 'take', 'dose']
-                if drug_name.lower() in false_positives:
-                    continue
-                
-                medication = {
-                    'name': drug_name.title(),  # Proper case
-                    'dosage': f"{dosage_amount} {dosage_unit}",
-                    'strength': dosage_amount,
-                    'unit': dosage_unit,
-                    'source': 'text_extraction'
-                }
-                
-                # Avoid duplicates (case-insensitive)
-                if not any(med['name'].lower() == medication['name'].lower() for med in medications):
-                    medications.append(medication)
-        
-        # Additional pattern for common drug endings (even without clear dosage)
-        for ending_pattern in common_drug_endings:
-            matches = re.finditer(ending_pattern, text, re.IGNORECASE)
-            for match in matches:
-                drug_name = match.group(0).strip().title()
-                
-                # Check if we already found this medication
-                if not any(med['name'].lower() == drug_name.lower() for med in medications):
-                    # Try to find dosage nearby
-                    context_start = max(0, match.start() - 50)
-                    context_end = min(len(text), match.end() + 50)
-                    context = text[context_start:context_end]
-                    
-                    dose_match = re.search(r'(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)', context, re.IGNORECASE)
-                    if dose_match:
-                        medications.append({
-                            'name': drug_name,
-                            'dosage': f"{dose_match.group(1)} {dose_match.group(2)}",
-                            'strength': dose_match.group(1),
-                            'unit': dose_match.group(2),
-                            'source': 'pattern_recognition'
-                        })
-                    else:
-                        medications.append({
-                            'name': drug_name,
-                            'dosage': 'Dosage not specified',
-                            'strength': '',
-                            'unit': '',
-                            'source': 'pattern_recognition'
-                        })
-        
-        return medications
+    def _extract_medications(self, text: str, page_of: Optional[Callable[[int], Optional[int]]] = None) -> List[Dict]:
+        """Extract medication information from text; page_of maps offsets to page numbers"""
+        return extract_medications(text, page_of)
     
     def _extract_medications_from_tables(self, tables: List[Dict]) -> List[Dict]:
         """Extract medications from table structures"""
@@ -377,7 +884,8 @@ class PDFProcessor:
                         medication = {
                             'name': name.strip(),
                             'dosage': dose.strip(),
-                            'source': 'table_extraction'
+                            'source': 'table_extraction',
+                            'page': table_info['page']
                         }
                         medications.append(medication)
         
@@ -22,10 +22,12 @@ except ImportError:
     PDF_PROCESSING_AVAILABLE = False
     print("PDF processing libraries not available - running in demo mode")
 
+from services.db_pool import ConnectionPool
+
 class DatabaseManager:
     def __init__(self, app=None):
         self.app = app
-        self.connection = None
+        self.pool = None
         
     def init_app(self, app):
         self.app = app
@@ -34,74 +36,78 @@ class DatabaseManager:
             self.create_tables()
     
     def connect(self):
-        """Connect to PostgreSQL database"""
+        """Open the PostgreSQL connection pool"""
         try:
-            database_url = os.getenv('DATABASE_URL')
-            if database_url:
-                self.connection = psycopg2.connect(database_url)
-            else:
-                # Fallback to individual environment variables
-                self.connection = psycopg2.connect(
-                    host=os.getenv('DATABASE_HOST', 'localhost'),
-                    database=os.getenv('DATABASE_NAME', 'pharmassist_db'),
-                    user=os.getenv('DATABASE_USER', 'pharmadmin'),
-                    password=os.getenv('DATABASE_PASSWORD', '')
-                )
-            self.connection.autocommit = True
+            self.pool = ConnectionPool(self._open_connection)
             print("✓ Database connected successfully")
         except Exception as e:
             print(f"Database connection failed: {e}")
-            self.connection = None
+            self.pool = None
+    
+    def _open_connection(self):
+        """Open one PostgreSQL connection for the pool"""
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            connection = psycopg2.connect(database_url)
+        else:
+            # Fallback to individual environment variables
+            connection = psycopg2.connect(
+                host=os.getenv('DATABASE_HOST', 'localhost'),
+                database=os.getenv('DATABASE_NAME', 'pharmassist_db'),
+                user=os.getenv('DATABASE_USER', 'pharmadmin'),
+                password=os.getenv('DATABASE_PASSWORD', '')
+            )
+        connection.autocommit = True
+        return connection
     
     def create_tables(self):
         """Create necessary database tables"""
-        if not self.connection:
+        if not self.pool:
             return
             
         try:
-            cursor = self.connection.cursor()
-            
-            # Create processing history table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS processing_history (
-                    id SERIAL PRIMARY KEY,
-                    session_id VARCHAR(255),
-                    filename VARCHAR(255),
-                    original_filename VARCHAR(255),
-                    processing_method VARCHAR(50),
-                    status VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    processing_time_seconds FLOAT,
-                    file_size_bytes INTEGER,
-                    extracted_text TEXT,
-                    converted_data JSONB
-                )
-            """)
+            with self.pool.cursor() as cursor:
+                # Create processing history table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS processing_history (
+                        id SERIAL PRIMARY KEY,
+                        session_id VARCHAR(255),
+                        filename VARCHAR(255),
+                        original_filename VARCHAR(255),
+                        processing_method VARCHAR(50),
+                        status VARCHAR(50),
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        processing_time_seconds FLOAT,
+                        file_size_bytes INTEGER,
+                        extracted_text TEXT,
+                        converted_data JSONB
+                    )
+                """)
             
-            # Create medication database table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS medications (
-                    id SERIAL PRIMARY KEY,
-                    name VARCHAR(255) UNIQUE,
-                    generic_name VARCHAR(255),
-                    drug_class VARCHAR(255),
-                    common_dosages TEXT[],
-                    caretend_code VARCHAR(50),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+                # Create medication database table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS medications (
+                        id SERIAL PRIMARY KEY,
+                        name VARCHAR(255) UNIQUE,
+                        generic_name VARCHAR(255),
+                        drug_class VARCHAR(255),
+                        common_dosages TEXT[],
+                        caretend_code VARCHAR(50),
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
             
-            # Insert some sample medications
-            cursor.execute("""
-                INSERT INTO medications (name, generic_name, drug_class, common_dosages, caretend_code)
-                VALUES 
-                    ('Lisinopril', 'lisinopril', 'ACE Inhibitor', ARRAY['5mg', '10mg', '20mg'], 'ACE001'),
-                    ('Metformin', 'metformin', 'Diabetes', ARRAY['500mg', '850mg', '1000mg'], 'DIA001'),
-                    ('Atorvastatin', 'atorvastatin', 'Statin', ARRAY['10mg', '20mg', '40mg', '80mg'], 'STA001')
-                ON CONFLICT (name) DO NOTHING
-            """)
+                # Insert some sample medications
+                cursor.execute("""
+                    INSERT INTO medications (name, generic_name, drug_class, common_dosages, caretend_code)
+                    VALUES 
+                        ('Lisinopril', 'lisinopril', 'ACE Inhibitor', ARRAY['5mg', '10mg', '20mg'], 'ACE001'),
+                        ('Metformin', 'metformin', 'Diabetes', ARRAY['500mg', '850mg', '1000mg'], 'DIA001'),
+                        ('Atorvastatin', 'atorvastatin', 'Statin', ARRAY['10mg', '20mg', '40mg', '80mg'], 'STA001')
+                    ON CONFLICT (name) DO NOTHING
+                """)
             
-            print("✓ Database tables created successfully")
+                print("✓ Database tables created successfully")
             
         except Exception as e:
             print(f"Error creating tables: {e}")
@@ -109,35 +115,35 @@ class DatabaseManager:
     def log_processing(self, session_id, filename, original_filename, method, status, 
                       processing_time=None, file_size=None, extracted_text=None, converted_data=None):
         """Log processing activity to database"""
-        if not self.connection:
+        if not self.pool:
             return
             
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                INSERT INTO processing_history 
-                (session_id, filename, original_filename, processing_method, status, 
-                 processing_time_seconds, file_size_bytes, extracted_text, converted_data)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (session_id, filename, original_filename, method, status, 
-                  processing_time, file_size, extracted_text, converted_data))
+            with self.pool.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO processing_history 
+                    (session_id, filename, original_filename, processing_method, status, 
+                     processing_time_seconds, file_size_bytes, extracted_text, converted_data)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (session_id, filename, original_filename, method, status, 
+                      processing_time, file_size, extracted_text, converted_data))
         except Exception as e:
             print(f"Error logging processing: {e}")
     
     def get_processing_history(self, session_id, limit=50):
         """Get processing history for a session"""
-        if not self.connection:
+        if not self.pool:
             return []
             
         try:
-            cursor = self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute("""
-                SELECT * FROM processing_history 
-                WHERE session_id = %s 
-                ORDER BY created_at DESC 
-                LIMIT %s
-            """, (session_id, limit))
-            return cursor.fetchall()
+            with self.pool.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute("""
+                    SELECT * FROM processing_history 
+                    WHERE session_id = %s 
+                    ORDER BY created_at DESC 
+                    LIMIT %s
+                """, (session_id, limit))
+                return cursor.fetchall()
         except Exception as e:
             print(f"Error getting history: {e}")
             return []
@@ -173,7 +179,7 @@ def create_app():
         
         # Get processing history if database is available
         history = []
-        if DATABASE_AVAILABLE and db.connection:
+        if DATABASE_AVAILABLE and db.pool:
             history = db.get_processing_history(session['session_id'])
         
         return render_template('index.html', 
@@ -219,7 +225,7 @@ def create_app():
                     processing_time = (datetime.datetime.now() - start_time).total_seconds()
                     
                     # Log to database
-                    if DATABASE_AVAILABLE and db.connection:
+                    if DATABASE_AVAILABLE and db.pool:
                         db.log_processing(
                             session['session_id'], filename, original_filename, 
                             method, status, processing_time, file_size,
@@ -239,7 +245,7 @@ def create_app():
                     error_msg = str(e)
                     
                     # Log error to database
-                    if DATABASE_AVAILABLE and db.connection:
+                    if DATABASE_AVAILABLE and db.pool:
                         db.log_processing(
                             session['session_id'], filename, original_filename, 
                             method, status, None, file_size, None, None
@@ -267,7 +273,7 @@ def create_app():
                 }
                 
                 # Log demo processing
-                if DATABASE_AVAILABLE and db.connection:
+                if DATABASE_AVAILABLE and db.pool:
                     processing_time = (datetime.datetime.now() - start_time).total_seconds()
                     db.log_processing(
                         session['session_id'], filename, original_filename, 
@@ -292,7 +298,7 @@ def create_app():
         if 'session_id' not in session:
             return jsonify([])
         
-        if DATABASE_AVAILABLE and db.connection:
+        if DATABASE_AVAILABLE and db.pool:
             history = db.get_processing_history(session['session_id'])
             # Convert to JSON-serializable format
             history_data = []
@@ -316,7 +322,7 @@ def create_app():
         return jsonify({
             'status': 'healthy',
             'pdf_processing': PDF_PROCESSING_AVAILABLE,
-            'database': DATABASE_AVAILABLE and db.connection is not None,
+            'database': DATABASE_AVAILABLE and db.pool is not None,
             'timestamp': datetime.datetime.now().isoformat()
         })
     
@@ -327,7 +333,7 @@ def create_app():
         return jsonify({
             'status': 'operational',
             'pdf_processing_available': PDF_PROCESSING_AVAILABLE,
-            'database_available': DATABASE_AVAILABLE and db.connection is not None,
+            'database_available': DATABASE_AVAILABLE and db.pool is not None,
             'methods_available': ['auto', 'pypdf2', 'pdfplumber', 'ocr'] if PDF_PROCESSING_AVAILABLE else ['demo'],
             'version': '1.0.0',
             'timestamp': datetime.datetime.now().isoformat()
@@ -371,7 +377,7 @@ def create_app():
                     processing_time = (datetime.datetime.now() - start_time).total_seconds()
                     
                     # Log to database
-                    if DATABASE_AVAILABLE and db.connection:
+                    if DATABASE_AVAILABLE and db.pool:
                         db.log_processing(
                             session['session_id'], filename, original_filename, 
                             method, status, processing_time, file_size,
@@ -399,7 +405,7 @@ def create_app():
                     
                 except Exception as e:
                     # Log error to database
-                    if DATABASE_AVAILABLE and db.connection:
+                    if DATABASE_AVAILABLE and db.pool:
                         processing_time = (datetime.datetime.now() - start_time).total_seconds()
                         db.log_processing(
                             session['session_id'], filename, original_filename, 
@@ -447,7 +453,7 @@ Converted by PharmAssist Enterprise
                 }
                 
                 # Log demo processing
-                if DATABASE_AVAILABLE and db.connection:
+                if DATABASE_AVAILABLE and db.pool:
                     db.log_processing(
                         session['session_id'], filename, original_filename, 
                         'demo', 'success', processing_time, file_size,
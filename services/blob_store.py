@@ -0,0 +1,183 @@
+"""
+Content-addressed blob store
+Bulky processing output (extracted text, full result dicts) is stored once,
+zlib-compressed and keyed by the SHA-256 of its content, so identical text
+from re-uploaded documents is kept a single time. processing_history rows
+hold only the 64-character reference and load the content on demand.
+
+Blobs live in a PostgreSQL table (BLOB_STORE=table) or, without a database,
+in a local directory (BLOB_STORE=directory, under BLOB_STORE_DIR).
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 'table' keeps blobs in PostgreSQL next to processing_history, 'directory' on local disk
+BLOB_STORE = os.getenv('BLOB_STORE', 'table').lower()
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', os.path.join(os.getcwd(), 'data', 'blobs'))
+
+# zlib level 6 is the usual size/speed balance for text
+BLOB_COMPRESSION_LEVEL = int(os.getenv('BLOB_COMPRESSION_LEVEL', '6'))
+
+
+def encode_blob(value: Any) -> bytes:
+    """Bytes for a blob: text as UTF-8, anything else as canonical JSON so equal values hash equally"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+
+
+def blob_ref(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore(ABC):
+    """Base class: compression, hashing and counters; subclasses store the compressed bytes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'puts': 0, 'deduplicated': 0, 'gets': 0, 'bytes_in': 0, 'bytes_stored': 0}
+
+    def put(self, value: Any) -> Optional[str]:
+        """Store a value (str, bytes or JSON-serializable) and return its reference; None stores nothing"""
+        if value is None:
+            return None
+        data = encode_blob(value)
+        ref = blob_ref(data)
+        compressed = zlib.compress(data, BLOB_COMPRESSION_LEVEL)
+        stored = self._write(ref, compressed, len(data))
+        with self._lock:
+            self._stats['puts'] += 1
+            self._stats['bytes_in'] += len(data)
+            if stored:
+                self._stats['bytes_stored'] += len(compressed)
+            else:
+                self._stats['deduplicated'] += 1
+        return ref
+
+    def get(self, ref: Optional[str]) -> Optional[bytes]:
+        """The stored bytes for a reference, or None if it is unknown"""
+        if not ref:
+            return None
+        compressed = self._read(ref)
+        with self._lock:
+            self._stats['gets'] += 1
+        return zlib.decompress(compressed) if compressed is not None else None
+
+    def get_text(self, ref: Optional[str]) -> Optional[str]:
+        data = self.get(ref)
+        return data.decode('utf-8') if data is not None else None
+
+    def get_json(self, ref: Optional[str]) -> Any:
+        data = self.get(ref)
+        return json.loads(data) if data is not None else None
+
+    def stats(self) -> Dict:
+        """Counters; 'compression_ratio' compares input bytes with bytes actually written"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['compression_ratio'] = round(stats['bytes_in'] / stats['bytes_stored'], 2) \
+            if stats['bytes_stored'] else None
+        return stats
+
+    @abstractmethod
+    def _write(self, ref: str, compressed: bytes, size: int) -> bool:
+        """Store compressed bytes under ref; returns False if ref was already stored"""
+
+    @abstractmethod
+    def _read(self, ref: str) -> Optional[bytes]:
+        """Compressed bytes stored under ref, or None"""
+
+
+class DirectoryBlobStore(BlobStore):
+    """Blobs as files under root, fanned out by the first two hex digits of the reference"""
+
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.root, ref[:2], f"{ref}.z")
+
+    def _write(self, ref: str, compressed: bytes, size: int) -> bool:
+        path = self._path(ref)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return True
+
+    def _read(self, ref: str) -> Optional[bytes]:
+        try:
+            with open(self._path(ref), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class TableBlobStore(BlobStore):
+    """Blobs in a PostgreSQL 'blobs' table, using connections from a services.db_pool.ConnectionPool"""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    def create_table(self):
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash CHAR(64) PRIMARY KEY,
+                    compression VARCHAR(16) DEFAULT 'zlib',
+                    size_bytes INTEGER,
+                    stored_bytes INTEGER,
+                    data BYTEA NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Already compressed: skip TOAST's own compression pass
+            cursor.execute("ALTER TABLE blobs ALTER COLUMN data SET STORAGE EXTERNAL")
+
+    def _write(self, ref: str, compressed: bytes, size: int) -> bool:
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO blobs (hash, size_bytes, stored_bytes, data)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (hash) DO NOTHING
+            """, (ref, size, len(compressed), compressed))
+            return cursor.rowcount == 1
+
+    def _read(self, ref: str) -> Optional[bytes]:
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT data FROM blobs WHERE hash = %s", (ref,))
+            row = cursor.fetchone()
+        return bytes(row[0]) if row else None
+
+
+def make_blob_store(pool=None) -> BlobStore:
+    """The configured store: a table when a database pool is available, else a directory"""
+    if BLOB_STORE == 'table' and pool is not None:
+        store = TableBlobStore(pool)
+        try:
+            store.create_table()
+            return store
+        except Exception as e:
+            logger.warning(f"Blob table unavailable, storing blobs in {BLOB_STORE_DIR}: {e}")
+    return DirectoryBlobStore(BLOB_STORE_DIR)
@@ -0,0 +1,225 @@
+"""
+Database connection pool
+Thread-safe pool of DB-API connections (psycopg2 in production), checked
+out per request instead of one connection shared by every request thread.
+Connections are health-checked on checkout and replaced when they are
+broken, idle too long or older than the recycle age, so a dropped database
+connection heals on the next request instead of at restart.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Connections kept open when idle, and the most open at once
+DATABASE_POOL_MIN = int(os.getenv('DATABASE_POOL_MIN', '1'))
+DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '20'))
+
+# Seconds to wait for a free connection before giving up
+DATABASE_POOL_TIMEOUT = float(os.getenv('DATABASE_POOL_TIMEOUT', '30'))
+
+# Connections older than this many seconds are closed and reopened (0 disables)
+DATABASE_POOL_RECYCLE = float(os.getenv('DATABASE_POOL_RECYCLE', '3600'))
+
+# Idle connections above the minimum are closed after this many seconds (0 disables)
+DATABASE_POOL_IDLE_TIMEOUT = float(os.getenv('DATABASE_POOL_IDLE_TIMEOUT', '300'))
+
+# A connection idle this many seconds is pinged with SELECT 1 before reuse
+DATABASE_POOL_PING_AFTER = float(os.getenv('DATABASE_POOL_PING_AFTER', '30'))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the pool timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of connections opened by a connect() factory.
+
+    Use `with pool.connection() as connection:` or `with pool.cursor() as
+    cursor:`; the connection goes back to the pool when the block ends, or is
+    discarded if it was closed underneath us. Checkouts block up to timeout
+    seconds when max_size connections are already in use.
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_size: Optional[int] = None,
+                 max_size: Optional[int] = None, timeout: Optional[float] = None,
+                 recycle: Optional[float] = None, idle_timeout: Optional[float] = None,
+                 ping_after: Optional[float] = None):
+        self._connect = connect
+        self.max_size = max(1, max_size if max_size is not None else DATABASE_POOL_SIZE)
+        self.min_size = min(self.max_size, min_size if min_size is not None else DATABASE_POOL_MIN)
+        self.timeout = timeout if timeout is not None else DATABASE_POOL_TIMEOUT
+        self.recycle = recycle if recycle is not None else DATABASE_POOL_RECYCLE
+        self.idle_timeout = idle_timeout if idle_timeout is not None else DATABASE_POOL_IDLE_TIMEOUT
+        self.ping_after = ping_after if ping_after is not None else DATABASE_POOL_PING_AFTER
+
+        self._lock = threading.Condition()
+        self._idle = []  # Entries in the order they were returned; reuse takes the newest
+        self._in_use = {}
+        self._size = 0
+        self._stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+                       'timeouts': 0, 'connects': 0, 'discarded': 0}
+
+        # Open the minimum up front so a bad configuration fails at startup
+        try:
+            for _ in range(self.min_size):
+                self._size += 1
+                self._idle.append(self._open())
+        except Exception:
+            self.closeall()
+            raise
+
+    def _open(self) -> Dict:
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        now = time.monotonic()
+        with self._lock:
+            self._stats['connects'] += 1
+        return {'connection': connection, 'created_at': now, 'returned_at': now}
+
+    def getconn(self):
+        """Check out a healthy connection, opening one if the pool has room"""
+        started = time.monotonic()
+        expires_at = started + self.timeout
+        waited = False
+        while True:
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = expires_at - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(f"No database connection free after {self.timeout:g}s "
+                                               f"({self.max_size} in use)")
+                    waited = True
+                    self._lock.wait(remaining)
+                entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    self._size += 1
+
+            if entry is None:
+                entry = self._open()
+            elif not self._healthy(entry):
+                self._close(entry)
+                continue
+
+            wait = time.monotonic() - started
+            with self._lock:
+                self._in_use[id(entry['connection'])] = entry
+                self._stats['checkouts'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_seconds'] += wait
+                    self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], wait)
+            return entry['connection']
+
+    def putconn(self, connection, discard: bool = False):
+        """Return a connection; broken or discarded connections are closed instead"""
+        with self._lock:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            return
+
+        if not discard and not connection.closed and not getattr(connection, 'autocommit', True):
+            try:
+                connection.rollback()  # Never hand on an open transaction
+            except Exception:
+                discard = True
+        if discard or connection.closed:
+            self._close(entry)
+            return
+
+        entry['returned_at'] = time.monotonic()
+        with self._lock:
+            self._idle.append(entry)
+            stale = self._stale_idle(entry['returned_at'])
+            self._lock.notify()
+        for idle in stale:
+            self._close(idle)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a with-block"""
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    @contextmanager
+    def cursor(self, **kwargs):
+        """A cursor on a checked-out connection; both are released when the block ends"""
+        with self.connection() as connection:
+            cursor = connection.cursor(**kwargs)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def _healthy(self, entry: Dict) -> bool:
+        """Whether an idle connection can be reused as is"""
+        connection = entry['connection']
+        if connection.closed:
+            return False
+        now = time.monotonic()
+        if self.recycle and now - entry['created_at'] >= self.recycle:
+            return False
+        if self.idle_timeout and now - entry['returned_at'] >= self.idle_timeout:
+            return False
+        if now - entry['returned_at'] >= self.ping_after:
+            try:
+                cursor = connection.cursor()
+                cursor.execute('SELECT 1')
+                cursor.close()
+            except Exception as e:
+                logger.warning(f"Discarding dead database connection: {e}")
+                return False
+        return True
+
+    def _stale_idle(self, now: float) -> list:
+        """Pop idle entries past the idle timeout, keeping min_size open (lock held)"""
+        stale = []
+        if not self.idle_timeout:
+            return stale
+        while self._idle and self._size - len(stale) > self.min_size and \
+                now - self._idle[0]['returned_at'] >= self.idle_timeout:
+            stale.append(self._idle.pop(0))
+        return stale
+
+    def _close(self, entry: Dict):
+        try:
+            entry['connection'].close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._lock.notify()
+
+    def closeall(self):
+        """Close every idle connection; checked-out ones close when returned"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self) -> Dict:
+        """Pool size, usage and wait metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'size': self._size, 'idle': len(self._idle), 'in_use': len(self._in_use),
+                          'min_size': self.min_size, 'max_size': self.max_size})
+        stats['avg_wait_seconds'] = round(stats['wait_seconds'] / stats['waits'], 4) if stats['waits'] else 0.0
+        stats['wait_seconds'] = round(stats['wait_seconds'], 4)
+        stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 4)
+        return stats
@@ -0,0 +1,82 @@
+"""
+Extraction deadlines
+Per-request time budgets for PDF extraction. Extractors check the deadline
+between pages and stop once it passes, returning the pages finished so far
+with a truncated flag; OCR calls get the remaining budget as their timeout,
+so a page in flight is cancelled rather than allowed to run on.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default seconds per extraction request (0 disables the deadline)
+EXTRACTION_DEADLINE = float(os.getenv('EXTRACTION_DEADLINE', '120'))
+
+
+def _parse_tenant_deadlines(value: str) -> Dict[str, float]:
+    """Parse 'tenant=seconds,tenant=seconds' into {tenant: seconds}"""
+    deadlines = {}
+    for item in (value or '').split(','):
+        tenant, _, seconds = item.partition('=')
+        if not tenant.strip() or not seconds.strip():
+            continue
+        try:
+            deadlines[tenant.strip()] = float(seconds)
+        except ValueError:
+            logger.warning(f"Ignoring invalid extraction deadline for tenant {tenant.strip()}: {seconds}")
+    return deadlines
+
+
+# Per-tenant overrides of EXTRACTION_DEADLINE, e.g. "acme_pharmacy=60,mercy_health=300"
+TENANT_DEADLINES = _parse_tenant_deadlines(os.getenv('EXTRACTION_DEADLINE_TENANTS', ''))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work cannot start because the extraction deadline has passed"""
+
+
+class Deadline:
+    """
+    A point in time after which extraction should stop.
+
+    Built from a budget in seconds; None means no deadline. Uses the
+    monotonic clock, so budgets are not affected by wall-clock changes.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self._expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None when there is no deadline"""
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+    def timeout(self, limit: Optional[float] = None) -> Optional[float]:
+        """The smaller of limit and the remaining time, for blocking calls"""
+        remaining = self.remaining()
+        if remaining is None:
+            return limit
+        return remaining if limit is None else min(limit, remaining)
+
+    def check(self):
+        """Raise DeadlineExceeded if the deadline has passed"""
+        if self.expired():
+            raise DeadlineExceeded(f"Extraction deadline of {self.seconds:g}s reached")
+
+
+def deadline_for_tenant(tenant: Optional[str] = None) -> Deadline:
+    """
+    A fresh Deadline using the tenant's budget, or EXTRACTION_DEADLINE when
+    it has none. A budget of 0 means no deadline.
+    """
+    seconds = TENANT_DEADLINES.get(str(tenant), EXTRACTION_DEADLINE) if tenant else EXTRACTION_DEADLINE
+    return Deadline(seconds if seconds > 0 else None)
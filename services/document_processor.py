@@ -6,7 +6,10 @@ Supports text extraction, OCR, and metadata extraction
 import os
 import io
 import json
+import time
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
@@ -16,17 +19,39 @@ try:
     import pdfplumber
     from PIL import Image
     import pytesseract
-    from pdf2image import convert_from_bytes
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
 except ImportError as e:
     logging.warning(f"PDF processing libraries not available: {e}")
     PyPDF2 = pdfplumber = pytesseract = None
 
+from services.extraction_cache import ExtractionCache, get_extraction_cache, make_cache_key
+from services import ocr_pool, ocr_preprocess
+from services.ocr_pool import OcrTimeoutError, ocr_data_to_page
+from services.deadline import Deadline
+from services.table_detection import extract_page_tables, summarize_table_checks
+from services.extraction_planner import ExtractionPlanner, PLANNER_TEXT_DENSITY
+
+# OCR rasterization: render resolution, pages held in memory at once, and an
+# optional directory to render pages to disk instead of memory
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+OCR_RENDER_WINDOW = int(os.getenv('OCR_RENDER_WINDOW', '2'))
+OCR_SPILL_DIR = os.getenv('OCR_SPILL_DIR') or None
+
 class DocumentProcessor:
     """Service for processing and extracting data from PDF documents"""
     
-    def __init__(self):
+    # Bump when extraction output changes so cached results are not reused
+    EXTRACTOR_VERSION = '1.6'
+    
+    def __init__(self, cache: Optional[ExtractionCache] = None, ocr_dpi: int = OCR_DPI,
+                 ocr_window: int = OCR_RENDER_WINDOW, ocr_spill_dir: Optional[str] = OCR_SPILL_DIR):
         self.supported_formats = ['.pdf']
         self.max_file_size = 10 * 1024 * 1024  # 10MB
+        self.cache = cache if cache is not None else get_extraction_cache()
+        self.ocr_dpi = ocr_dpi
+        self.ocr_window = max(1, ocr_window)
+        self.ocr_spill_dir = ocr_spill_dir
+        self.planner = ExtractionPlanner()
         
     def is_supported_format(self, filename: str) -> bool:
         """Check if file format is supported"""
@@ -42,7 +67,7 @@ class DocumentProcessor:
         
         return True, "File is valid"
     
-    def extract_text_pypdf2(self, file_data: bytes) -> Dict:
+    def extract_text_pypdf2(self, file_data: bytes, deadline: Optional[Deadline] = None) -> Dict:
         """Extract text using PyPDF2 (fast, basic extraction)"""
         try:
             pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_data))
@@ -65,26 +90,14 @@ class DocumentProcessor:
                 })
             
             # Extract text from each page
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    page_text = page.extract_text()
-                    text_content.append({
-                        'page': page_num,
-                        'text': page_text.strip(),
-                        'char_count': len(page_text)
-                    })
-                except Exception as e:
-                    text_content.append({
-                        'page': page_num,
-                        'text': '',
-                        'error': str(e)
-                    })
+            text_content.extend(self._iter_pypdf2_pages(pdf_reader, deadline))
             
             return {
                 'success': True,
                 'metadata': metadata,
                 'content': text_content,
-                'total_chars': sum(page.get('char_count', 0) for page in text_content)
+                'total_chars': sum(page.get('char_count', 0) for page in text_content),
+                **self._truncation(len(text_content), metadata['num_pages'], deadline)
             }
             
         except Exception as e:
@@ -93,7 +106,7 @@ class DocumentProcessor:
                 'error': f"PyPDF2 extraction failed: {str(e)}"
             }
     
-    def extract_text_pdfplumber(self, file_data: bytes) -> Dict:
+    def extract_text_pdfplumber(self, file_data: bytes, deadline: Optional[Deadline] = None) -> Dict:
         """Extract text using pdfplumber (more accurate, slower)"""
         try:
             with pdfplumber.open(io.BytesIO(file_data)) as pdf:
@@ -117,37 +130,9 @@ class DocumentProcessor:
                     })
                 
                 # Process each page
-                for page_num, page in enumerate(pdf.pages, 1):
-                    try:
-                        # Extract text
-                        page_text = page.extract_text() or ""
-                        
-                        # Extract tables
-                        page_tables = page.extract_tables()
-                        
-                        text_content.append({
-                            'page': page_num,
-                            'text': page_text.strip(),
-                            'char_count': len(page_text),
-                            'table_count': len(page_tables)
-                        })
-                        
-                        # Store table data
-                        for table_idx, table in enumerate(page_tables):
-                            tables.append({
-                                'page': page_num,
-                                'table_index': table_idx,
-                                'rows': len(table),
-                                'columns': len(table[0]) if table else 0,
-                                'data': table
-                            })
-                    
-                    except Exception as e:
-                        text_content.append({
-                            'page': page_num,
-                            'text': '',
-                            'error': str(e)
-                        })
+                for page_record, page_tables in self._iter_pdfplumber_pages(pdf, deadline):
+                    text_content.append(page_record)
+                    tables.extend(page_tables)
                 
                 return {
                     'success': True,
@@ -155,7 +140,9 @@ class DocumentProcessor:
                     'content': text_content,
                     'tables': tables,
                     'total_chars': sum(page.get('char_count', 0) for page in text_content),
-                    'total_tables': len(tables)
+                    'total_tables': len(tables),
+                    'table_detection': summarize_table_checks(page.get('table_check') for page in text_content),
+                    **self._truncation(len(text_content), metadata['num_pages'], deadline)
                 }
                 
         except Exception as e:
@@ -164,50 +151,42 @@ class DocumentProcessor:
                 'error': f"pdfplumber extraction failed: {str(e)}"
             }
     
-    def extract_text_ocr(self, file_data: bytes) -> Dict:
-        """Extract text using OCR (for scanned PDFs)"""
+    def extract_text_ocr(self, file_data: bytes, cancel: Optional[threading.Event] = None,
+                         deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Extract text using OCR (for scanned PDFs). Setting cancel stops it
+        after the current page; at the deadline the page in flight is dropped
+        and the pages done so far are returned as truncated.
+        """
         try:
-            # Convert PDF to images
-            images = convert_from_bytes(file_data)
+            # Render pages a window at a time so memory does not grow with page count
+            page_count = pdfinfo_from_bytes(file_data)['Pages']
             
             text_content = []
             metadata = {
-                'num_pages': len(images),
+                'num_pages': page_count,
                 'extraction_method': 'OCR (pytesseract)',
+                'ocr_dpi': self.ocr_dpi,
                 'timestamp': datetime.now().isoformat()
             }
             
-            for page_num, image in enumerate(images, 1):
-                try:
-                    # Perform OCR on the image
-                    page_text = pytesseract.image_to_string(image)
-                    
-                    # Get OCR confidence data
-                    ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-                    confidences = [int(conf) for conf in ocr_data['conf'] if int(conf) > 0]
-                    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-                    
-                    text_content.append({
-                        'page': page_num,
-                        'text': page_text.strip(),
-                        'char_count': len(page_text),
-                        'ocr_confidence': round(avg_confidence, 2),
-                        'word_count': len([word for word in ocr_data['text'] if word.strip()])
-                    })
-                    
-                except Exception as e:
-                    text_content.append({
-                        'page': page_num,
-                        'text': '',
-                        'error': str(e)
-                    })
+            text_content.extend(self._iter_ocr_pages(self._iter_page_images(file_data, page_count), cancel, deadline))
+            
+            if cancel is not None and cancel.is_set():
+                return {
+                    'success': False,
+                    'cancelled': True,
+                    'error': f"OCR cancelled after {len(text_content)} of {page_count} pages"
+                }
             
             return {
                 'success': True,
                 'metadata': metadata,
                 'content': text_content,
                 'total_chars': sum(page.get('char_count', 0) for page in text_content),
-                'avg_confidence': sum(page.get('ocr_confidence', 0) for page in text_content) / len(text_content)
+                'avg_confidence': (sum(page.get('ocr_confidence', 0) for page in text_content) / len(text_content)
+                                   if text_content else 0),
+                **self._truncation(len(text_content), page_count, deadline)
             }
             
         except Exception as e:
@@ -216,7 +195,215 @@ class DocumentProcessor:
                 'error': f"OCR extraction failed: {str(e)}"
             }
     
-    def extract_document_data(self, file_data: bytes, filename: str, method: str = 'auto') -> Dict:
+    def _iter_page_images(self, file_data: bytes, page_count: int):
+        """
+        Yield page images in order, rendering ocr_window pages at a time.
+
+        Each image is closed as soon as the consumer asks for the next one, so
+        at most one window of pages is held at once. With ocr_spill_dir set the
+        window is rendered to PNG files there rather than kept in memory, and
+        each file is deleted once its page has been used.
+        """
+        for first_page in range(1, page_count + 1, self.ocr_window):
+            last_page = min(page_count, first_page + self.ocr_window - 1)
+            
+            if self.ocr_spill_dir:
+                os.makedirs(self.ocr_spill_dir, exist_ok=True)
+                with tempfile.TemporaryDirectory(dir=self.ocr_spill_dir) as spill:
+                    paths = convert_from_bytes(file_data, dpi=self.ocr_dpi, first_page=first_page,
+                                               last_page=last_page, output_folder=spill,
+                                               fmt='png', paths_only=True)
+                    for path in paths:
+                        image = Image.open(path)
+                        try:
+                            yield image
+                        finally:
+                            image.close()
+                            os.remove(path)
+            else:
+                images = convert_from_bytes(file_data, dpi=self.ocr_dpi,
+                                            first_page=first_page, last_page=last_page)
+                while images:
+                    image = images.pop(0)
+                    try:
+                        yield image
+                    finally:
+                        image.close()
+    
+    def _iter_pypdf2_pages(self, pdf_reader, deadline: Optional[Deadline] = None):
+        """Yield one content record per page from a PyPDF2 reader, until the deadline"""
+        for page_num, page in enumerate(pdf_reader.pages, 1):
+            if deadline is not None and deadline.expired():
+                return
+            try:
+                page_text = page.extract_text()
+                yield {
+                    'page': page_num,
+                    'text': page_text.strip(),
+                    'char_count': len(page_text)
+                }
+            except Exception as e:
+                yield {
+                    'page': page_num,
+                    'text': '',
+                    'error': str(e)
+                }
+    
+    def _iter_pdfplumber_pages(self, pdf, deadline: Optional[Deadline] = None):
+        """Yield (content record, table records) per page from a pdfplumber document, until the deadline"""
+        for page_num, page in enumerate(pdf.pages, 1):
+            if deadline is not None and deadline.expired():
+                return
+            try:
+                # Extract text
+                page_text = page.extract_text() or ""
+                
+                # Extract tables, only on pages the pre-check flags
+                page_tables, table_check = extract_page_tables(page)
+                
+                tables = [{
+                    'page': page_num,
+                    'table_index': table_idx,
+                    'rows': len(table),
+                    'columns': len(table[0]) if table else 0,
+                    'data': table
+                } for table_idx, table in enumerate(page_tables)]
+                
+                yield {
+                    'page': page_num,
+                    'text': page_text.strip(),
+                    'char_count': len(page_text),
+                    'table_count': len(page_tables),
+                    'table_check': table_check
+                }, tables
+            
+            except Exception as e:
+                yield {
+                    'page': page_num,
+                    'text': '',
+                    'error': str(e)
+                }, []
+    
+    def _iter_ocr_pages(self, images, cancel: Optional[threading.Event] = None,
+                        deadline: Optional[Deadline] = None):
+        """
+        Yield one OCR content record per page image, stopping early once cancel
+        is set or the deadline passes (a page cut off by the deadline is dropped)
+        """
+        for page_num, image in enumerate(images, 1):
+            if cancel is not None and cancel.is_set():
+                return
+            if deadline is not None and deadline.expired():
+                return
+            try:
+                if ocr_preprocess.preprocessing_enabled():
+                    image = ocr_preprocess.preprocess_image(image)
+                
+                # One Tesseract pass gives text, confidences and word boxes together
+                timeout = deadline.timeout(ocr_pool.OCR_PAGE_TIMEOUT) if deadline is not None else None
+                try:
+                    ocr_data = ocr_pool.image_to_data(image, timeout=timeout)
+                except OcrTimeoutError:
+                    if deadline is not None and deadline.expired():
+                        return
+                    raise
+                page = ocr_data_to_page(ocr_data)
+                
+                yield {
+                    'page': page_num,
+                    'text': page['text'],
+                    'char_count': len(page['text']),
+                    'ocr_confidence': page['confidence'],
+                    'word_count': len(page['words']),
+                    'words': page['words']
+                }
+                
+            except Exception as e:
+                yield {
+                    'page': page_num,
+                    'text': '',
+                    'error': str(e)
+                }
+    
+    def _truncation(self, pages_done: int, page_count: int, deadline: Optional[Deadline] = None) -> Dict:
+        """Result fields saying whether the deadline cut extraction short"""
+        fields = {'truncated': pages_done < page_count, 'pages_total': page_count}
+        if fields['truncated']:
+            fields['deadline_seconds'] = deadline.seconds if deadline is not None else None
+        return fields
+    
+    def iter_pages(self, file_data: bytes, filename: str, method: str = 'auto',
+                   deadline: Optional[Deadline] = None):
+        """
+        Streaming variant of extract_document_data.
+
+        Yields {'type': 'page', ...content record} as each page is extracted,
+        then {'type': 'summary', ...totals}. Auto mode streams the planner's
+        first choice instead of trying each method in turn. At the deadline
+        the stream stops and the summary is marked truncated.
+        """
+        is_valid, validation_message = self.validate_file(file_data, filename)
+        if not is_valid:
+            yield {'type': 'error', 'success': False, 'error': validation_message}
+            return
+        
+        if method == 'auto':
+            # Pages already sent cannot be withdrawn, so a race plan streams its text method
+            plan = self.planner.plan(file_data, self._available_methods())
+            method = plan['methods'][0] if plan['methods'] else None
+        
+        total_chars = 0
+        total_tables = 0
+        num_pages = 0
+        pdf = None
+        
+        try:
+            if method == 'pypdf2' and PyPDF2:
+                reader = PyPDF2.PdfReader(io.BytesIO(file_data))
+                page_count = len(reader.pages)
+                records = ((record, []) for record in self._iter_pypdf2_pages(reader, deadline))
+            elif method == 'pdfplumber' and pdfplumber:
+                pdf = pdfplumber.open(io.BytesIO(file_data))
+                page_count = len(pdf.pages)
+                records = self._iter_pdfplumber_pages(pdf, deadline)
+            elif method == 'ocr' and pytesseract:
+                page_count = pdfinfo_from_bytes(file_data)['Pages']
+                images = self._iter_page_images(file_data, page_count)
+                records = ((record, []) for record in self._iter_ocr_pages(images, deadline=deadline))
+            else:
+                yield {'type': 'error', 'success': False, 'error': f"Unknown extraction method: {method}"}
+                return
+            
+            table_checks = []
+            for record, tables in records:
+                num_pages += 1
+                total_chars += record.get('char_count', 0)
+                total_tables += len(tables)
+                if record.get('table_check'):
+                    table_checks.append(record['table_check'])
+                yield {'type': 'page', **record, 'tables': tables}
+            
+            yield {
+                'type': 'summary',
+                'success': True,
+                'filename': filename,
+                'file_size': len(file_data),
+                'best_method': method,
+                'num_pages': num_pages,
+                'total_chars': total_chars,
+                'total_tables': total_tables,
+                **({'table_detection': summarize_table_checks(table_checks)} if table_checks else {}),
+                **self._truncation(num_pages, page_count, deadline)
+            }
+        
+        except Exception as e:
+            yield {'type': 'error', 'success': False, 'error': f"{method} extraction failed: {str(e)}"}
+        finally:
+            if pdf is not None:
+                pdf.close()
+    
+    def extract_document_data(self, file_data: bytes, filename: str, method: str = 'auto',
+                              deadline: Optional[Deadline] = None) -> Dict:
         """
         Main method to extract data from PDF document
         
@@ -224,6 +411,8 @@ class DocumentProcessor:
             file_data: PDF file content as bytes
             filename: Original filename
             method: Extraction method ('auto', 'pypdf2', 'pdfplumber', 'ocr')
+            deadline: Optional time budget; when it runs out the pages finished
+                      so far are returned with 'truncated': True (and not cached)
         """
         # Validate file
         is_valid, validation_message = self.validate_file(file_data, filename)
@@ -233,70 +422,168 @@ class DocumentProcessor:
                 'error': validation_message
             }
         
+        # Repeat uploads of the same bytes return the cached extraction
+        cache_key = make_cache_key(file_data, f"document-{method}", self.EXTRACTOR_VERSION)
+        cached = self.cache.get(cache_key)
+        if cached:
+            results = dict(cached)
+            results['filename'] = filename
+            results['cached'] = True
+            return results
+        
         results = {
             'filename': filename,
             'file_size': len(file_data),
             'extraction_attempts': []
         }
         
-        # Try different extraction methods based on the specified method
+        # Auto mode plans from cheap document features instead of trying every method
         if method == 'auto':
-            # Try methods in order of preference
-            methods_to_try = ['pdfplumber', 'pypdf2', 'ocr']
+            started = time.monotonic()
+            available = self._available_methods()
+            plan = self.planner.plan(file_data, available)
+            results['plan'] = plan
+            
+            if plan['strategy'] == 'race':
+                best_result, best_method = self._race_methods(file_data, plan['methods'],
+                                                              results['extraction_attempts'], deadline)
+            else:
+                best_result, best_method = self._try_methods(file_data, plan['methods'],
+                                                             results['extraction_attempts'], deadline=deadline)
+            
+            # The plan found no text: fall back to the methods it skipped
+            if not best_result or not best_result.get('total_chars'):
+                remaining = [m for m in available if m not in plan['methods']]
+                best_result, best_method = self._try_methods(file_data, remaining, results['extraction_attempts'],
+                                                             best_result, best_method, deadline)
+                plan['fell_back'] = bool(remaining)
+            
+            plan['elapsed_seconds'] = round(time.monotonic() - started, 3)
         elif method in ['pypdf2', 'pdfplumber', 'ocr']:
-            methods_to_try = [method]
+            best_result, best_method = self._try_methods(file_data, [method], results['extraction_attempts'],
+                                                         deadline=deadline)
         else:
             return {
                 'success': False,
                 'error': f"Unknown extraction method: {method}"
             }
         
-        best_result = None
+        if best_method:
+            results['best_method'] = best_method
         
-        for extract_method in methods_to_try:
+        if best_result:
+            results.update(best_result)
+            # Partial extractions are not cached, so a retry can finish the document
+            if not results.get('truncated'):
+                self.cache.put(cache_key, dict(results))
+            return results
+        else:
+            return {
+                'success': False,
+                'error': 'All extraction methods failed',
+                'extraction_attempts': results['extraction_attempts']
+            }
+    
+    def _available_methods(self) -> List[str]:
+        """Extraction methods whose libraries are installed, in preference order"""
+        return [m for m, lib in (('pdfplumber', pdfplumber), ('pypdf2', PyPDF2), ('ocr', pytesseract)) if lib]
+    
+    def _run_method(self, extract_method: str, file_data: bytes, cancel: Optional[threading.Event] = None,
+                    deadline: Optional[Deadline] = None):
+        """Run one extraction method, or return None if its library is missing"""
+        if extract_method == 'pypdf2' and PyPDF2:
+            return self.extract_text_pypdf2(file_data, deadline)
+        elif extract_method == 'pdfplumber' and pdfplumber:
+            return self.extract_text_pdfplumber(file_data, deadline)
+        elif extract_method == 'ocr' and pytesseract:
+            return self.extract_text_ocr(file_data, cancel, deadline)
+        return None
+    
+    def _record_attempt(self, attempts: List[Dict], extract_method: str, result: Dict):
+        attempt = {
+            'method': extract_method,
+            'success': result['success'],
+            'error': result.get('error', None)
+        }
+        if result.get('cancelled'):
+            attempt['cancelled'] = True
+        if result.get('truncated'):
+            attempt['truncated'] = True
+        attempts.append(attempt)
+    
+    def _try_methods(self, file_data: bytes, methods: List[str], attempts: List[Dict],
+                     best_result: Optional[Dict] = None, best_method: Optional[str] = None,
+                     deadline: Optional[Deadline] = None):
+        """
+        Run methods in order, keeping the result with the most text; returns
+        (result, method). No further method is started once the deadline passes.
+        """
+        for extract_method in methods:
+            if deadline is not None and deadline.expired():
+                break
             try:
-                if extract_method == 'pypdf2' and PyPDF2:
-                    result = self.extract_text_pypdf2(file_data)
-                elif extract_method == 'pdfplumber' and pdfplumber:
-                    result = self.extract_text_pdfplumber(file_data)
-                elif extract_method == 'ocr' and pytesseract:
-                    result = self.extract_text_ocr(file_data)
-                else:
+                result = self._run_method(extract_method, file_data, deadline=deadline)
+                if result is None:
                     continue
                 
-                results['extraction_attempts'].append({
-                    'method': extract_method,
-                    'success': result['success'],
-                    'error': result.get('error', None)
-                })
+                self._record_attempt(attempts, extract_method, result)
                 
                 if result['success']:
                     # Check if this result is better than previous ones
                     total_chars = result.get('total_chars', 0)
                     if best_result is None or total_chars > best_result.get('total_chars', 0):
                         best_result = result
-                        results['best_method'] = extract_method
+                        best_method = extract_method
                     
                     # If pdfplumber works well, use it (it's usually the best)
                     if extract_method == 'pdfplumber' and total_chars > 0:
                         break
                         
             except Exception as e:
-                results['extraction_attempts'].append({
+                attempts.append({
                     'method': extract_method,
                     'success': False,
                     'error': str(e)
                 })
         
-        if best_result:
-            results.update(best_result)
-            return results
-        else:
-            return {
-                'success': False,
-                'error': 'All extraction methods failed',
-                'extraction_attempts': results['extraction_attempts']
-            }
+        return best_result, best_method
+    
+    def _race_methods(self, file_data: bytes, methods: List[str], attempts: List[Dict],
+                      deadline: Optional[Deadline] = None):
+        """
+        Run a text method and OCR concurrently. If the text layer turns out
+        dense enough, OCR is cancelled; otherwise the result with more text wins.
+        """
+        text_method, ocr_method = methods
+        cancel = threading.Event()
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            ocr_future = executor.submit(self._run_method, ocr_method, file_data, cancel, deadline)
+            
+            try:
+                text_result = self._run_method(text_method, file_data, deadline=deadline)
+                self._record_attempt(attempts, text_method, text_result)
+            except Exception as e:
+                text_result = {'success': False, 'error': str(e)}
+                attempts.append({'method': text_method, 'success': False, 'error': str(e)})
+            
+            if text_result['success']:
+                pages = text_result.get('metadata', {}).get('num_pages') or 1
+                if text_result.get('total_chars', 0) / pages >= PLANNER_TEXT_DENSITY:
+                    cancel.set()
+            
+            try:
+                ocr_result = ocr_future.result()
+                self._record_attempt(attempts, ocr_method, ocr_result)
+            except Exception as e:
+                ocr_result = {'success': False, 'error': str(e)}
+                attempts.append({'method': ocr_method, 'success': False, 'error': str(e)})
+        
+        candidates = [(result, method) for result, method in ((text_result, text_method), (ocr_result, ocr_method))
+                      if result['success']]
+        if not candidates:
+            return None, None
+        return max(candidates, key=lambda candidate: candidate[0].get('total_chars', 0))
     
     def analyze_document_content(self, extraction_result: Dict) -> Dict:
         """Analyze extracted document content for insights"""
@@ -311,11 +598,12 @@ class DocumentProcessor:
         total_words = 0
         
         # Content analysis
-        all_text = ""
+        page_texts = []
         for page in content:
             page_text = page.get('text', '')
-            all_text += page_text + " "
+            page_texts.append(page_text)
             total_words += len(page_text.split())
+        all_text = " ".join(page_texts)
         
         # Simple keyword extraction (most common words)
         words = all_text.lower().split()
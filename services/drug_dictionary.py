@@ -0,0 +1,299 @@
+"""
+Drug-name dictionary index
+Builds a token trie from the medications table (brand and generic names) and
+scans extracted text in one pass, returning each known drug with its
+drug_class and caretend_code. Misspelled names (typically OCR output) are
+resolved through a trigram index with bounded edit distance. The reloading
+wrapper rebuilds both when the table changes.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'[A-Za-z0-9]+')
+
+# Trie key marking the end of a complete name
+_TERMINAL = None
+
+# Approximate matching: edits allowed and the minimum score to accept a match
+FUZZY_MAX_DISTANCE = int(os.getenv('DRUG_FUZZY_MAX_DISTANCE', '2'))
+FUZZY_MIN_SCORE = float(os.getenv('DRUG_FUZZY_MIN_SCORE', '0.8'))
+
+# Characters OCR commonly reads in place of letters inside words
+_OCR_CONFUSIONS = str.maketrans({'0': 'o', '1': 'l', '5': 's', '8': 'b', '|': 'l'})
+
+
+def _tokens(name: str) -> List[str]:
+    return [token.lower() for token in _TOKEN.findall(name or '')]
+
+
+def _normalize(name: str) -> str:
+    return ' '.join(_tokens(name))
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Edit distance between a and b, or None as soon as it must exceed max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (char_a != char_b))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class FuzzyNameIndex:
+    """
+    Trigram inverted index for approximate name lookup.
+
+    A candidate must share enough trigrams with the query to be within
+    max_distance edits (each edit changes at most three trigrams), and only
+    those candidates are checked with a bounded Levenshtein distance.
+    """
+
+    def __init__(self, max_distance: int = FUZZY_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._keys = []
+        self._values = []
+        self._gram_counts = []
+        self._postings = {}
+
+    def add(self, key: str, value):
+        if not key:
+            return
+        key_id = len(self._keys)
+        grams = set(_trigrams(key))
+        self._keys.append(key)
+        self._values.append(value)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(key_id)
+
+    def search(self, query: str) -> Optional[tuple]:
+        """(key, value, distance) of the closest key within max_distance, or None"""
+        if not query:
+            return None
+
+        grams = set(_trigrams(query))
+        shared = {}
+        for gram in grams:
+            for key_id in self._postings.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+
+        best = None
+        for key_id, count in shared.items():
+            if count < max(len(grams), self._gram_counts[key_id]) - 3 * self.max_distance:
+                continue
+            key = self._keys[key_id]
+            limit = best[2] if best else self.max_distance
+            distance = bounded_levenshtein(query, key, limit)
+            if distance is not None and (best is None or distance < best[2]):
+                best = (key, self._values[key_id], distance)
+                if distance == 0:
+                    break
+        return best
+
+
+class DrugDictionary:
+    """
+    Immutable word-level trie over drug names.
+
+    Rows are dicts with name, generic_name, drug_class and caretend_code.
+    Both the name and the generic name are indexed; a hit always reports the
+    row's name. version is a digest of the indexed rows, so results built
+    from one dictionary can be told apart from another's (e.g. in cache keys).
+    """
+
+    def __init__(self, rows: Iterable[Dict] = (), max_distance: int = FUZZY_MAX_DISTANCE,
+                 min_score: float = FUZZY_MIN_SCORE):
+        self._trie = {}
+        self._fuzzy = FuzzyNameIndex(max_distance)
+        self._fuzzy_keys = set()
+        self.min_score = min_score
+        self.max_tokens = 0
+        self.size = 0
+        digest = hashlib.sha256()
+
+        for row in rows:
+            entry = {
+                'name': row['name'],
+                'generic_name': row.get('generic_name') or '',
+                'drug_class': row.get('drug_class') or '',
+                'caretend_code': row.get('caretend_code') or ''
+            }
+            for name in {row['name'], entry['generic_name']}:
+                self._insert(_tokens(name), entry)
+            digest.update('\x1f'.join(entry.values()).encode('utf-8') + b'\x1e')
+            self.size += 1
+        self.version = digest.hexdigest()[:16]
+
+    def _insert(self, tokens: List[str], entry: Dict):
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # First row wins if a brand name collides with another row's generic name
+        node.setdefault(_TERMINAL, entry)
+        self.max_tokens = max(self.max_tokens, len(tokens))
+
+        key = ' '.join(tokens)
+        if key not in self._fuzzy_keys:
+            self._fuzzy_keys.add(key)
+            self._fuzzy.add(key, node[_TERMINAL])
+
+    def current(self) -> 'DrugDictionary':
+        """A fixed dictionary is always current (same interface as ReloadingDrugDictionary)"""
+        return self
+
+    def scan(self, text: str) -> List[Dict]:
+        """Leftmost-longest, non-overlapping dictionary hits in text"""
+        if not self._trie or not text:
+            return []
+
+        words = list(_TOKEN.finditer(text))
+        hits = []
+        i = 0
+        while i < len(words):
+            node = self._trie
+            match = None
+            for j in range(i, min(len(words), i + self.max_tokens)):
+                node = node.get(words[j].group(0).lower())
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    match = (j, node[_TERMINAL])
+
+            if match is None:
+                i += 1
+                continue
+
+            last, entry = match
+            start, end = words[i].start(), words[last].end()
+            hits.append({**entry, 'matched': text[start:end], 'start': start, 'end': end})
+            i = last + 1
+
+        return hits
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """The dictionary entry for a name that is exactly a known drug, or None"""
+        node = self._trie
+        for token in _tokens(name):
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get(_TERMINAL) if node is not self._trie else None
+
+    def match(self, name: str) -> Optional[Dict]:
+        """
+        Resolve a possibly misspelled name to a dictionary entry.
+
+        Returns the entry plus 'matched' (the input) and 'match_score'
+        (1.0 for an exact name, lower by edit distance relative to length),
+        or None when nothing scores at least min_score.
+        """
+        entry = self.lookup(name)
+        if entry:
+            return {**entry, 'matched': name, 'match_score': 1.0}
+
+        raw = _normalize(name)
+        found = self._fuzzy.search(_normalize(name.translate(_OCR_CONFUSIONS)))
+        if found is None:
+            return None
+
+        key, entry, _ = found
+        # Score against what was actually read, so OCR digit fixes count as edits
+        distance = bounded_levenshtein(raw, key, len(raw) + len(key))
+        score = round(1 - distance / max(len(raw), len(key)), 3)
+        if score < self.min_score:
+            return None
+        return {**entry, 'matched': name, 'match_score': score}
+
+
+class ReloadingDrugDictionary:
+    """
+    DrugDictionary that follows its source table.
+
+    load_rows() returns the current rows and fingerprint() a cheap value that
+    changes whenever the table does. The fingerprint is checked at most every
+    refresh_interval seconds and the trie is rebuilt only when it changed. If
+    loading fails the previous dictionary stays in use.
+    """
+
+    def __init__(self, load_rows: Callable[[], Iterable[Dict]],
+                 fingerprint: Optional[Callable[[], object]] = None,
+                 refresh_interval: float = 300):
+        self.load_rows = load_rows
+        self.fingerprint = fingerprint
+        self.refresh_interval = refresh_interval
+        self._dictionary = DrugDictionary()
+        self._fingerprint = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def current(self) -> DrugDictionary:
+        """The up-to-date dictionary, reloading it first if the table changed"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return self._dictionary
+
+        with self._lock:
+            if self._checked_at is None or now - self._checked_at >= self.refresh_interval:
+                self._refresh()
+                self._checked_at = time.monotonic()
+        return self._dictionary
+
+    def reload(self) -> DrugDictionary:
+        """Rebuild now regardless of the fingerprint"""
+        with self._lock:
+            self._fingerprint = None
+            self._refresh()
+            self._checked_at = time.monotonic()
+        return self._dictionary
+
+    @property
+    def version(self) -> str:
+        """Digest of the current dictionary's rows; changes when a reload changes them"""
+        return self.current().version
+
+    def scan(self, text: str) -> List[Dict]:
+        return self.current().scan(text)
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        return self.current().lookup(name)
+
+    def match(self, name: str) -> Optional[Dict]:
+        return self.current().match(name)
+
+    def _refresh(self):
+        """Rebuild the trie if the fingerprint moved; caller holds the lock"""
+        try:
+            fingerprint = self.fingerprint() if self.fingerprint else None
+            if fingerprint is not None and fingerprint == self._fingerprint:
+                return
+            dictionary = DrugDictionary(self.load_rows())
+        except Exception as e:
+            logger.warning(f"Drug dictionary reload failed: {e}")
+            return
+
+        self._dictionary = dictionary
+        self._fingerprint = fingerprint
+        logger.info(f"Drug dictionary loaded: {dictionary.size} medications")
@@ -0,0 +1,176 @@
+"""
+Content-addressed cache for PDF extraction results
+Keys are a SHA-256 of the PDF bytes plus the extraction method and extractor
+version, so re-uploads of the same document skip extraction entirely.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(file_data: bytes, method: str, version: str,
+                   dictionary_version: Optional[str] = None) -> str:
+    """
+    Build the cache key for a document, extraction method and extractor version.
+
+    dictionary_version (the drug dictionary's digest) keeps results whose
+    drug_class and caretend_code came from an older medications table from
+    being served after the dictionary reloads.
+    """
+    digest = hashlib.sha256(file_data).hexdigest()
+    key = f"{digest}-{method}-{version}"
+    return f"{key}-{dictionary_version}" if dictionary_version else key
+
+
+class ExtractionCache:
+    """Two-tier LRU cache: bounded in-memory dict plus optional on-disk JSON files"""
+
+    def __init__(self, max_entries: int = 128, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0,
+                       'evictions': 0, 'disk_evictions': 0}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached result for key, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats['hits'] += 1
+                self._stats['memory_hits'] += 1
+                return self._memory[key]
+
+        value = self._disk_get(key)
+
+        with self._lock:
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key: str, value: Dict):
+        """Store a result in memory and, if configured, on disk"""
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def clear(self):
+        """Drop the in-memory tier (disk entries are left in place)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['disk_enabled'] = bool(self.disk_dir)
+        return stats
+
+    def _memory_put(self, key: str, value: Dict):
+        """Insert into the LRU dict; caller holds the lock"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)  # Refresh recency for eviction
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed for {key}: {e}")
+            return None
+
+    def _disk_put(self, key: str, value: Dict):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp_path, path)
+            self._disk_evict()
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed for {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _disk_evict(self):
+        """Delete least recently used files until the directory fits disk_max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.disk_max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats['disk_evictions'] += 1
+            if total <= self.disk_max_bytes:
+                break
+
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Return the process-wide cache configured from the environment"""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache(
+                max_entries=int(os.getenv('EXTRACTION_CACHE_SIZE', '128')),
+                disk_dir=os.getenv('EXTRACTION_CACHE_DIR') or None,
+                disk_max_bytes=int(os.getenv('EXTRACTION_CACHE_MAX_MB', '256')) * 1024 * 1024
+            )
+        return _extraction_cache
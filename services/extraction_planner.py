@@ -0,0 +1,196 @@
+"""
+Cost-based extraction planner
+Chooses the extraction method for DocumentProcessor's auto mode from cheap
+document features (page count, fonts, text-layer density, image coverage)
+instead of running every method in turn. Ambiguous documents race a text
+method against OCR and cancel the loser.
+"""
+
+import io
+import os
+import logging
+from typing import Dict, List, Optional
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+logger = logging.getLogger(__name__)
+
+# Estimated seconds per page for each method, used to rank plans
+METHOD_COSTS = {
+    'pypdf2': float(os.getenv('PLANNER_COST_PYPDF2', '0.02')),
+    'pdfplumber': float(os.getenv('PLANNER_COST_PDFPLUMBER', '0.1')),
+    'ocr': float(os.getenv('PLANNER_COST_OCR', '2.5'))
+}
+
+# Text-layer characters per page above which a text method is trusted, and
+# below which the text layer is treated as absent
+PLANNER_TEXT_DENSITY = int(os.getenv('PLANNER_TEXT_DENSITY', '100'))
+PLANNER_MIN_TEXT = int(os.getenv('PLANNER_MIN_TEXT', '5'))
+PLANNER_IMAGE_COVERAGE = float(os.getenv('PLANNER_IMAGE_COVERAGE', '0.5'))
+
+# Pages sampled for features (first pages plus evenly spaced ones)
+PLANNER_SAMPLE_PAGES = int(os.getenv('PLANNER_SAMPLE_PAGES', '5'))
+
+# Ruling lines/rectangles per sampled page that suggest tables worth pdfplumber
+_TABLE_HINT_SHAPES = 10
+
+
+def _sample(page_count: int, size: int) -> List[int]:
+    if page_count <= size:
+        return list(range(page_count))
+    step = (page_count - 1) / (size - 1)
+    return sorted({round(i * step) for i in range(size)})
+
+
+class ExtractionPlanner:
+    """Profiles a PDF and picks the extraction plan with the lowest expected cost"""
+
+    def profile(self, file_data: bytes) -> Dict:
+        """
+        Cheap features from a few sampled pages:
+        {'pages', 'sampled', 'chars_per_page', 'fonts', 'image_coverage', 'table_hints'}
+        """
+        try:
+            if pdfplumber:
+                return self._profile_pdfplumber(file_data)
+            if PyPDF2:
+                return self._profile_pypdf2(file_data)
+            error = 'no PDF library available'
+        except Exception as e:
+            logger.warning(f"Document profiling failed: {e}")
+            error = str(e)
+        return {'pages': 0, 'sampled': 0, 'chars_per_page': 0, 'fonts': 0,
+                'image_coverage': None, 'table_hints': False, 'error': error}
+
+    def _profile_pdfplumber(self, file_data: bytes) -> Dict:
+        with pdfplumber.open(io.BytesIO(file_data)) as pdf:
+            page_count = len(pdf.pages)
+            sampled = _sample(page_count, PLANNER_SAMPLE_PAGES)
+            chars = 0
+            fonts = set()
+            coverage = 0.0
+            shapes = 0
+
+            for page_num in sampled:
+                page = pdf.pages[page_num]
+                page_chars = page.chars  # Character objects only; no layout analysis
+                chars += sum(1 for char in page_chars if not char['text'].isspace())
+                fonts.update(char.get('fontname') for char in page_chars)
+
+                page_area = float(page.width * page.height) or 1.0
+                image_area = sum(abs((image['x1'] - image['x0']) * (image['bottom'] - image['top']))
+                                 for image in page.images)
+                coverage += min(1.0, image_area / page_area)
+                shapes += len(page.rects) + len(page.lines)
+
+        count = len(sampled) or 1
+        return {
+            'pages': page_count,
+            'sampled': len(sampled),
+            'chars_per_page': round(chars / count, 1),
+            'fonts': len(fonts),
+            'image_coverage': round(coverage / count, 3),
+            'table_hints': shapes / count >= _TABLE_HINT_SHAPES
+        }
+
+    def _profile_pypdf2(self, file_data: bytes) -> Dict:
+        reader = PyPDF2.PdfReader(io.BytesIO(file_data))
+        page_count = len(reader.pages)
+        sampled = _sample(page_count, PLANNER_SAMPLE_PAGES)
+        chars = 0
+        fonts = set()
+        image_pages = 0
+
+        for page_num in sampled:
+            page = reader.pages[page_num]
+            chars += len(''.join((page.extract_text() or '').split()))
+            resources = page.get('/Resources') or {}
+            fonts.update((resources.get('/Font') or {}).keys())
+            xobjects = resources.get('/XObject') or {}
+            if any(xobjects[name].get_object().get('/Subtype') == '/Image' for name in xobjects):
+                image_pages += 1
+
+        count = len(sampled) or 1
+        return {
+            'pages': page_count,
+            'sampled': len(sampled),
+            'chars_per_page': round(chars / count, 1),
+            'fonts': len(fonts),
+            # PyPDF2 cannot cheaply measure placement; count image pages as fully covered
+            'image_coverage': round(image_pages / count, 3),
+            'table_hints': False
+        }
+
+    def plan(self, file_data: bytes, available: List[str], features: Optional[Dict] = None) -> Dict:
+        """
+        Choose methods for a document. Returns
+        {'strategy': 'single'|'race'|'sequential', 'methods', 'reason', 'features',
+         'estimated_seconds', 'legacy_estimated_seconds', 'estimated_time_saved_seconds'}
+        """
+        features = features if features is not None else self.profile(file_data)
+        if features.get('error'):
+            # Nothing to plan from: try methods in the usual order
+            return {'strategy': 'sequential', 'methods': list(available),
+                    'reason': f"profiling failed ({features['error']})", 'features': features,
+                    'estimated_seconds': None, 'legacy_estimated_seconds': None,
+                    'estimated_time_saved_seconds': 0.0}
+
+        text_methods = [method for method in ('pdfplumber', 'pypdf2') if method in available]
+        has_ocr = 'ocr' in available
+
+        density = features['chars_per_page']
+        coverage = features['image_coverage'] or 0.0
+        text_method = None
+        if text_methods:
+            # pdfplumber only pays off when there are tables to pull out
+            if 'pdfplumber' in text_methods and (features['table_hints'] or 'pypdf2' not in text_methods):
+                text_method = 'pdfplumber'
+            else:
+                text_method = text_methods[-1]
+
+        if text_method and (density >= PLANNER_TEXT_DENSITY or not has_ocr):
+            strategy, methods = 'single', [text_method]
+            reason = f"text layer with {density:g} chars/page"
+        elif has_ocr and (not text_method or (density < PLANNER_MIN_TEXT and
+                                              (coverage >= PLANNER_IMAGE_COVERAGE or not features['fonts']))):
+            strategy, methods = 'single', ['ocr']
+            reason = f"no usable text layer ({density:g} chars/page, {coverage:.0%} image coverage)"
+        elif text_method and has_ocr:
+            strategy, methods = 'race', [text_method, 'ocr']
+            reason = f"sparse text layer ({density:g} chars/page, {coverage:.0%} image coverage)"
+        else:
+            strategy, methods = 'single', available[:1]
+            reason = "no planning features available"
+
+        pages = features['pages'] or 1
+        estimated = max(METHOD_COSTS.get(method, 0) for method in methods) * pages if methods else 0
+        legacy = self._legacy_cost(available, density, pages)
+        return {
+            'strategy': strategy,
+            'methods': methods,
+            'reason': reason,
+            'features': features,
+            'estimated_seconds': round(estimated, 2),
+            'legacy_estimated_seconds': round(legacy, 2),
+            'estimated_time_saved_seconds': round(max(0.0, legacy - estimated), 2)
+        }
+
+    @staticmethod
+    def _legacy_cost(available: List[str], density: float, pages: int) -> float:
+        """What the old try-everything loop would have spent on this document"""
+        cost = 0.0
+        for method in ('pdfplumber', 'pypdf2', 'ocr'):
+            if method not in available:
+                continue
+            cost += METHOD_COSTS[method] * pages
+            if method == 'pdfplumber' and density > 0:
+                break
+        return cost
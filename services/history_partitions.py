@@ -0,0 +1,275 @@
+"""
+processing_history schema
+processing_history is range-partitioned by month on created_at and indexed
+for its access paths: a session's history (session_id, created_at), the
+admin log view and today's count (created_at), and background job updates
+(job_id). Month partitions are created on demand, HISTORY_PARTITIONS_AHEAD
+months in advance; a DEFAULT partition catches rows outside them (writers
+that skip ensure(), or a database clock in another month) and ensure()
+moves those rows into their month partition when it creates it.
+
+An unpartitioned table from an older release gets the indexes on startup but
+is not converted: the conversion copies every row in one transaction under an
+exclusive lock, so it runs as an explicit step (migrate_history.py) in a
+maintenance window.
+"""
+
+import os
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = 'processing_history'
+DEFAULT_PARTITION = f"{HISTORY_TABLE}_default"
+
+# Month partitions kept ready beyond the current one
+HISTORY_PARTITIONS_AHEAD = int(os.getenv('HISTORY_PARTITIONS_AHEAD', '3'))
+
+# Serializes partition DDL between server workers (pg_advisory_xact_lock key)
+_LOCK_KEY = 0x70685f70  # 'ph_p'
+
+COLUMNS = [
+    ('id', 'SERIAL'),
+    ('job_id', 'VARCHAR(64)'),
+    ('session_id', 'VARCHAR(255)'),
+    ('filename', 'VARCHAR(255)'),
+    ('original_filename', 'VARCHAR(255)'),
+    ('processing_method', 'VARCHAR(50)'),
+    ('status', 'VARCHAR(50)'),
+    ('created_at', 'TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP'),
+    ('processing_time_seconds', 'FLOAT'),
+    ('file_size_bytes', 'INTEGER'),
+    ('extracted_text', 'TEXT'),
+    ('converted_data', 'JSONB'),
+    ('text_blob', 'CHAR(64)'),
+    ('result_blob', 'CHAR(64)'),
+]
+
+# Created on the parent table, so every partition gets them
+INDEXES = [
+    # get_processing_history: WHERE session_id = %s ORDER BY created_at DESC
+    ('processing_history_session_created_idx', '(session_id, created_at DESC)'),
+    # Admin log view (ORDER BY created_at DESC) and the today's-count range
+    ('processing_history_created_idx', '(created_at DESC)'),
+    # finish_job_entry: WHERE job_id = %s
+    ('processing_history_job_idx', '(job_id) WHERE job_id IS NOT NULL'),
+]
+
+
+def month_start(value) -> datetime.date:
+    """First day of the month holding a date or datetime"""
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, count: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{HISTORY_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds(month: datetime.date) -> Tuple[datetime.date, datetime.date]:
+    """[start, end) of a month partition"""
+    month = month_start(month)
+    return month, add_months(month, 1)
+
+
+def default_partition_ddl() -> str:
+    return f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {HISTORY_TABLE} DEFAULT"
+
+
+def partition_ddl(month: datetime.date) -> str:
+    start, end = partition_bounds(month)
+    return (f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {HISTORY_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')")
+
+
+class HistoryPartitions:
+    """
+    Creates and maintains the partitioned processing_history table.
+
+    Months already known to exist are remembered, so ensure() costs nothing
+    on the insert path once the current month's partition is in place.
+    """
+
+    def __init__(self, ahead: Optional[int] = None):
+        self.ahead = max(0, ahead if ahead is not None else HISTORY_PARTITIONS_AHEAD)
+        self.partitioned = False
+        self._lock = threading.Lock()
+        self._known = set()
+
+    def months_for(self, moments: Iterable) -> Set[datetime.date]:
+        """Months needed to insert rows created at moments, plus the months ahead of them"""
+        months = set()
+        for moment in moments:
+            first = month_start(moment)
+            months.update(add_months(first, count) for count in range(self.ahead + 1))
+        return months
+
+    def ensure(self, cursor, moments: Iterable) -> List[datetime.date]:
+        """Create any missing partitions for rows created at moments; returns the months created"""
+        if not self.partitioned:
+            return []
+        with self._lock:
+            missing = sorted(self.months_for(moments) - self._known)
+        if not missing:
+            return []
+        with _transaction(cursor):
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            for month in missing:
+                self._create_partition(cursor, month)
+        with self._lock:
+            self._known.update(missing)
+        logger.info(f"Ensured {HISTORY_TABLE} partitions: {', '.join(map(partition_name, missing))}")
+        return missing
+
+    def migrate(self, cursor, now: Optional[datetime.datetime] = None):
+        """
+        Startup schema step: create the table if missing, add new columns and
+        indexes, and on a partitioned table its current partitions. A legacy
+        unpartitioned table is indexed but otherwise left as it is until
+        convert() runs.
+        """
+        with _transaction(cursor):
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            relkind = self._relkind(cursor)
+            if relkind is None:
+                self._create(cursor)
+            else:
+                self._add_columns(cursor)
+            if relkind not in (None, 'p'):
+                # Job updates and history reads need the indexes before conversion
+                self._create_indexes(cursor)
+                logger.warning(f"{HISTORY_TABLE} is not partitioned; run migrate_history.py to convert it")
+                return
+            self._finish(cursor, now)
+
+    def convert(self, cursor, now: Optional[datetime.datetime] = None) -> bool:
+        """
+        Explicit migration: move an unpartitioned table's rows into the
+        partitioned layout. Runs in one transaction, so it either completes or
+        leaves the old table untouched; writers wait on its lock meanwhile.
+        Returns False if the table was already partitioned.
+        """
+        with _transaction(cursor):
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            relkind = self._relkind(cursor)
+            if relkind == 'p':
+                return False
+            if relkind is None:
+                self._create(cursor)
+            else:
+                self._add_columns(cursor)
+                self._convert(cursor)
+            self._finish(cursor, now)
+        return True
+
+    def _relkind(self, cursor) -> Optional[str]:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (HISTORY_TABLE,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _finish(self, cursor, now: Optional[datetime.datetime]):
+        """Indexes, the default partition and the current months on a partitioned table"""
+        months = self.months_for([now or datetime.datetime.now()])
+        self._create_indexes(cursor)
+        cursor.execute(default_partition_ddl())
+        for month in sorted(months):
+            self._create_partition(cursor, month)
+        with self._lock:
+            self.partitioned = True
+            self._known.update(months)
+
+    def _create_indexes(self, cursor):
+        for name, definition in INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {HISTORY_TABLE} {definition}")
+
+    def _create_partition(self, cursor, month: datetime.date):
+        """Create a month partition, moving in any of its rows the default partition caught"""
+        start, end = partition_bounds(month)
+        name = partition_name(start)
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+        if cursor.fetchone()[0]:
+            return
+
+        in_month = "created_at >= %s AND created_at < %s"
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})", (start, end))
+        if not cursor.fetchone()[0]:
+            cursor.execute(partition_ddl(start))
+            return
+
+        # A new partition may not overlap rows already in the default one
+        names = ', '.join(name for name, _ in COLUMNS)
+        cursor.execute(f"ALTER TABLE {HISTORY_TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(partition_ddl(start))
+        cursor.execute(f"INSERT INTO {name} ({names}) SELECT {names} FROM {DEFAULT_PARTITION} WHERE {in_month}",
+                       (start, end))
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}", (start, end))
+        cursor.execute(f"ALTER TABLE {HISTORY_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+        logger.info(f"Moved {name} rows out of {DEFAULT_PARTITION}")
+
+    def _create(self, cursor):
+        columns = ''.join(f"{name} {definition},\n                " for name, definition in COLUMNS)
+        # A partitioned table's primary key must include the partition key
+        cursor.execute(f"""
+            CREATE TABLE {HISTORY_TABLE} (
+                {columns}PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+
+    def _add_columns(self, cursor):
+        """Bring a table created by an older release up to the current columns"""
+        for name, definition in COLUMNS:
+            if name in ('id', 'created_at'):
+                continue
+            cursor.execute(f"ALTER TABLE {HISTORY_TABLE} ADD COLUMN IF NOT EXISTS {name} {definition}")
+
+    def _convert(self, cursor):
+        """Move the rows of an unpartitioned processing_history into the partitioned layout"""
+        legacy = f"{HISTORY_TABLE}_legacy"
+        logger.info(f"Converting {HISTORY_TABLE} to monthly partitions")
+
+        # Free the names the new table's sequence and key take
+        cursor.execute(f"ALTER TABLE {HISTORY_TABLE} RENAME TO {legacy}")
+        cursor.execute(f"ALTER SEQUENCE IF EXISTS {HISTORY_TABLE}_id_seq RENAME TO {legacy}_id_seq")
+        cursor.execute(f"ALTER INDEX IF EXISTS {HISTORY_TABLE}_pkey RENAME TO {legacy}_pkey")
+        for name, _ in INDEXES:
+            # Created on the legacy table at startup; the new table takes the names
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        self._create(cursor)
+
+        cursor.execute(f"""
+            SELECT DISTINCT date_trunc('month', COALESCE(created_at, CURRENT_TIMESTAMP))::date
+            FROM {legacy}
+        """)
+        for (month,) in cursor.fetchall():
+            cursor.execute(partition_ddl(month))
+
+        names = ', '.join(name for name, _ in COLUMNS)
+        values = ', '.join('COALESCE(created_at, CURRENT_TIMESTAMP)' if name == 'created_at' else name
+                           for name, _ in COLUMNS)
+        cursor.execute(f"INSERT INTO {HISTORY_TABLE} ({names}) SELECT {values} FROM {legacy}")
+        cursor.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{HISTORY_TABLE}', 'id'), COALESCE(MAX(id), 0) + 1, false)
+            FROM {HISTORY_TABLE}
+        """)
+        cursor.execute(f"DROP TABLE {legacy}")
+        logger.info(f"Converted {HISTORY_TABLE} to monthly partitions")
+
+
+@contextmanager
+def _transaction(cursor):
+    """Explicit transaction on a pooled (autocommit) connection"""
+    cursor.execute("BEGIN")
+    try:
+        yield cursor
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    cursor.execute("COMMIT")
@@ -0,0 +1,164 @@
+"""
+Write-behind history logger
+Buffers processing_history rows in memory and writes them from a background
+thread in batches, so a request no longer waits on its log INSERT. A batch
+is written once it reaches HISTORY_BATCH_SIZE rows or its oldest row has
+waited HISTORY_FLUSH_INTERVAL seconds. The buffer is bounded: when it is
+full, rows are dropped ('drop') or the caller waits briefly for room
+('block'). close() flushes what is left and is registered to run at exit.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', '100'))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', '2.0'))
+HISTORY_QUEUE_SIZE = int(os.getenv('HISTORY_QUEUE_SIZE', '10000'))
+
+# 'drop' discards rows while the buffer is full; 'block' waits up to
+# HISTORY_BLOCK_TIMEOUT seconds for room before dropping
+HISTORY_QUEUE_POLICY = os.getenv('HISTORY_QUEUE_POLICY', 'drop').lower()
+HISTORY_BLOCK_TIMEOUT = float(os.getenv('HISTORY_BLOCK_TIMEOUT', '1.0'))
+
+
+class _Flush:
+    """Queue marker: write everything queued before it, then signal"""
+
+    def __init__(self, stop: bool = False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+class HistoryWriter:
+    """
+    Batches rows (dicts of column -> value) for write_batch(rows).
+
+    write_batch is called from the writer thread with rows that share the
+    same columns, in the order they were logged, so it can issue a single
+    multi-row INSERT. A batch that raises is logged and counted as failed.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict]], None], batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, max_queue: Optional[int] = None,
+                 policy: Optional[str] = None, block_timeout: Optional[float] = None):
+        self._write_batch = write_batch
+        self.batch_size = max(1, batch_size or HISTORY_BATCH_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else HISTORY_FLUSH_INTERVAL
+        self.policy = policy or HISTORY_QUEUE_POLICY
+        self.block_timeout = block_timeout if block_timeout is not None else HISTORY_BLOCK_TIMEOUT
+        self._queue = queue.Queue(maxsize=max_queue if max_queue is not None else HISTORY_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._stats = {'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    def log(self, row: Dict) -> bool:
+        """Queue a row for writing; returns False if it was dropped"""
+        if self._closed:
+            self._count('dropped')
+            return False
+        self._start()
+        try:
+            if self.policy == 'block':
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("History buffer full; dropping processing_history row")
+            return False
+        self._count('queued')
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write every row queued so far; returns False if that took longer than timeout"""
+        return self._send(_Flush(), timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """Flush the remaining rows and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+            running = self._thread is not None and self._thread.is_alive()
+        if not running:
+            return True
+        done = self._send(_Flush(stop=True), timeout)
+        self._thread.join(timeout)
+        return done
+
+    def _send(self, marker: _Flush, timeout: Optional[float]) -> bool:
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def _start(self):
+        # Started lazily so forked server workers each get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        flush_at = None
+        while True:
+            timeout = max(0.0, flush_at - time.monotonic()) if flush_at is not None else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, _Flush):
+                self._write(batch)
+                batch, flush_at = [], None
+                item.done.set()
+                if item.stop:
+                    return
+                continue
+
+            if item is not None:
+                batch.append(item)
+                if flush_at is None:
+                    flush_at = time.monotonic() + self.flush_interval
+            if batch and (len(batch) >= self.batch_size or item is None):
+                self._write(batch)
+                batch, flush_at = [], None
+
+    def _write(self, rows: List[Dict]):
+        """Write rows grouped by column set, keeping their order within each group"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+        for group in groups.values():
+            try:
+                self._write_batch(group)
+            except Exception as e:
+                logger.error(f"Error writing {len(group)} processing_history rows: {e}")
+                self._count('failed', len(group))
+            else:
+                self._count('written', len(group))
+                self._count('batches')
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def stats(self) -> Dict:
+        """Row counts and the number of rows waiting to be written"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
@@ -0,0 +1,236 @@
+"""
+Background job queue for document processing
+Uploads are submitted as jobs and processed by a bounded pool of worker
+threads, so slow OCR runs no longer hold a request open. Clients poll the
+job for progress and the final result.
+"""
+
+import time
+import uuid
+import queue
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Fields kept internally but never returned to clients
+_PRIVATE_FIELDS = ('payload',)
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at capacity and cannot accept more jobs"""
+
+
+class JobBackend(ABC):
+    """Storage and dispatch interface for jobs (in-process or e.g. Redis)"""
+
+    @abstractmethod
+    def enqueue(self, job_id: str):
+        """Queue a job id; raises QueueFullError when at capacity"""
+
+    @abstractmethod
+    def dequeue(self, timeout: float) -> Optional[str]:
+        """Next queued job id, or None after timeout seconds"""
+
+    @abstractmethod
+    def save(self, job: Dict):
+        """Store a job record"""
+
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[Dict]:
+        """A stored job record, or None"""
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        """Forget a job record"""
+
+    @abstractmethod
+    def job_ids(self):
+        """Ids of every stored job"""
+
+
+class InMemoryJobBackend(JobBackend):
+    """Single-process backend: a bounded FIFO of job ids plus a dict of job records"""
+
+    def __init__(self, max_pending: int = 50):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, job_id: str):
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            raise QueueFullError(f"Job queue is full ({self._queue.maxsize} pending)")
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def save(self, job: Dict):
+        with self._lock:
+            self._jobs[job['id']] = job
+
+    def load(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def job_ids(self):
+        with self._lock:
+            return list(self._jobs)
+
+
+class JobQueue:
+    """
+    Submit/poll job runner.
+
+    The handler is called as handler(payload, report_progress) in a worker
+    thread and returns the result dict; report_progress(pages_done, pages_total)
+    updates the job record as pages complete. on_submit(job) runs before a job
+    is queued and on_finish(job) after it ends, e.g. to keep processing_history
+    in step.
+    """
+
+    def __init__(self, handler: Callable, backend: Optional[JobBackend] = None, workers: int = 2,
+                 job_ttl: int = 3600, on_submit: Optional[Callable] = None,
+                 on_finish: Optional[Callable] = None):
+        self.handler = handler
+        self.backend = backend or InMemoryJobBackend()
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self.on_submit = on_submit
+        self.on_finish = on_finish
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        if self._threads:
+            return
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Signal workers to exit once their current job finishes"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, payload: Dict, owner: Optional[str] = None) -> Dict:
+        """Queue a job and return its public record; raises QueueFullError when at capacity"""
+        self._expire_finished()
+
+        now = datetime.now().isoformat()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': QUEUED,
+            'owner': owner,
+            'filename': payload.get('filename'),
+            'pages_done': 0,
+            'pages_total': None,
+            'result': None,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'finished_at': None,
+            'payload': payload
+        }
+        self.backend.save(job)
+        if self.on_submit:
+            self.on_submit(job)
+        try:
+            self.backend.enqueue(job['id'])
+        except QueueFullError as e:
+            # Close out anything on_submit recorded for the rejected job
+            job['status'] = FAILED
+            job['error'] = str(e)
+            if self.on_submit and self.on_finish:
+                self.on_finish(job)
+            self.backend.delete(job['id'])
+            raise
+        return self._public(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Public view of a job, or None if unknown or expired"""
+        job = self.backend.load(job_id)
+        return self._public(job) if job else None
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            job_id = self.backend.dequeue(timeout=1.0)
+            if job_id is None:
+                continue
+            job = self.backend.load(job_id)
+            if job is None:
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict):
+        job['status'] = RUNNING
+        job['updated_at'] = datetime.now().isoformat()
+        self.backend.save(job)
+        started = time.monotonic()
+
+        def report_progress(pages_done: int, pages_total: Optional[int] = None):
+            job['pages_done'] = pages_done
+            if pages_total is not None:
+                job['pages_total'] = pages_total
+            job['updated_at'] = datetime.now().isoformat()
+            self.backend.save(job)
+
+        try:
+            job['result'] = self.handler(job['payload'], report_progress)
+            job['status'] = DONE
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            job['error'] = str(e)
+            job['status'] = FAILED
+
+        job['processing_time'] = time.monotonic() - started
+        job['finished_at'] = job['updated_at'] = datetime.now().isoformat()
+        job['finished_monotonic'] = time.monotonic()
+
+        if self.on_finish:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                logger.error(f"Job {job['id']} finish hook failed: {e}")
+
+        # The uploaded bytes are no longer needed once the job has run
+        job['payload'] = {key: value for key, value in job['payload'].items() if key != 'file_content'}
+        self.backend.save(job)
+
+    def _expire_finished(self):
+        """Forget finished jobs older than job_ttl"""
+        cutoff = time.monotonic() - self.job_ttl
+        for job_id in self.backend.job_ids():
+            job = self.backend.load(job_id)
+            if job and job.get('finished_monotonic') and job['finished_monotonic'] < cutoff:
+                self.backend.delete(job_id)
+
+    @staticmethod
+    def _public(job: Dict) -> Dict:
+        public = {key: value for key, value in job.items()
+                  if key not in _PRIVATE_FIELDS and key != 'finished_monotonic'}
+        if job.get('pages_total'):
+            public['progress'] = round(job['pages_done'] / job['pages_total'], 3)
+        return public
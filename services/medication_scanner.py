@@ -0,0 +1,370 @@
+"""
+Compiled medication scanner
+Finds medication name/dosage mentions in extracted document text. All
+patterns are compiled once at import. Dosage patterns only run on text
+segments that contain a dose, and the drug-suffix patterns run as one
+combined alternation. Duplicates are merged through a MedicationIndex keyed
+on the normalized name.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Dosage patterns, in priority order (earlier patterns win duplicate names).
+# Each is paired with an anchor: a short literal sequence every match must
+# contain, used to skip text the full pattern cannot match.
+_UNIT_ANCHOR = r'\d\s*(?:mcg|mg|g|ml|unit|tab|capsule)'
+
+DOSAGE_PATTERNS = [
+    # Pattern 1: Drug name followed by dosage (most common)
+    (r'(\b[A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?|tabs?|capsules?)\b',
+     _UNIT_ANCHOR),
+
+    # Pattern 2: Numbered list format (1. Drug 10mg, 2. Drug 20mg)
+    (r'\d+\.?\s*([A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?|tabs?|capsules?)',
+     _UNIT_ANCHOR),
+
+    # Pattern 3: With dosing instructions
+    (r'([A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)\s+(?:take|taken?|daily|twice|once|bid|tid|qid|prn)',
+     r'\d\s*(?:mcg|mg|g|ml|unit|units)\s+(?:take|daily|twice|once|bid|tid|qid|prn)'),
+
+    # Pattern 4: Tablet/capsule format
+    (r'([A-Za-z][A-Za-z\s\-]{2,30}?)\s+(\d+(?:\.\d+)?)\s*mg\s+(?:tablet|capsule|tab|cap)',
+     r'\d\s*mg\s+(?:tab|cap)'),
+
+    # Pattern 5: Generic format with parentheses
+    (r'([A-Za-z][A-Za-z\s\-]{2,30}?)\s*\(\s*(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)\s*\)',
+     r'\(\s*\d'),
+
+    # Pattern 6: Simple drug name with mg
+    (r'\b([A-Za-z][A-Za-z]{2,}(?:\s+[A-Za-z]{2,})*)\s+(\d+)\s*mg\b',
+     r'\d\s*mg'),
+]
+
+# Common medication name endings (to improve recognition), in priority order
+DRUG_ENDINGS = [
+    'pril',       # ACE inhibitors (lisinopril, enalapril)
+    'sartan',     # ARBs (losartan, valsartan)
+    'statin',     # Statins (atorvastatin, simvastatin)
+    'metformin',  # Diabetes (metformin)
+    'lol',        # Beta blockers (metoprolol, atenolol)
+    'dipine',     # Calcium channel blockers (amlodipine)
+]
+
+FALSE_POSITIVES = frozenset(['mg', 'tab', 'tablet', 'capsule', 'daily', 'twice', 'once', 'take', 'dose'])
+
+_COMPILED_DOSAGE = [(re.compile(pattern, re.IGNORECASE), re.compile(anchor, re.IGNORECASE),
+                     re.compile(pattern).groups >= 3)
+                    for pattern, anchor in DOSAGE_PATTERNS]
+
+# One alternation for all endings; a word can only end in one of them
+_DRUG_ENDING = re.compile(r'\w+(' + '|'.join(DRUG_ENDINGS) + r')\b', re.IGNORECASE)
+_ENDING_RANK = {ending: rank for rank, ending in enumerate(DRUG_ENDINGS)}
+
+_DOSE = re.compile(r'(\d+(?:\.\d+)?)\s*(mg|mcg|g|mL|units?)', re.IGNORECASE)
+
+# Every dosage match is made of these characters only, so maximal runs of
+# them bound where a match can be. A run without a number+unit anchor cannot
+# match any dosage pattern and is skipped.
+_SEGMENT = re.compile(r'[\w \-.()]+')
+_DOSE_ANCHOR = re.compile(_UNIT_ANCHOR, re.IGNORECASE)
+
+_WHITESPACE = re.compile(r'\s+')
+_EDGE_NON_WORD = re.compile(r'^[^\w]+|[^\w]+$')
+_DIGIT = re.compile(r'\d')
+
+# Letters with a digit inside, as OCR produces for "Metf0rmin"
+_OCR_WORD = re.compile(r'\b[A-Za-z]+\d[A-Za-z0-9]*[A-Za-z]\b')
+
+
+# Dosage values that mean "unknown" and may be filled in by a later source
+_EMPTY_DOSAGES = frozenset(['', 'dosage not specified', 'not specified'])
+
+
+def medication_key(name: str) -> str:
+    """Normalized lookup key for a medication name"""
+    return _WHITESPACE.sub(' ', name).strip().lower()
+
+
+class MedicationIndex:
+    """
+    Ordered set of medication records keyed by normalized name.
+
+    Membership checks are O(1). Adding a medication whose name is already
+    indexed merges it into the existing record instead: its source is added
+    to the record's 'sources' list and a missing dosage is filled in. The
+    first record keeps its position and its 'source' field; other fields it
+    lacks (e.g. caretend_code) are copied over. Records tagged with a 'page'
+    collect every page they were found on in 'pages'.
+    """
+
+    def __init__(self, medications: Iterable[Dict] = ()):
+        self._records = {}
+        self.extend(medications)
+
+    def __contains__(self, name: str) -> bool:
+        return medication_key(name) in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, medication: Dict) -> bool:
+        """Index a medication; returns True if it was new, False if merged"""
+        key = medication_key(medication['name'])
+        record = self._records.get(key)
+        if record is None:
+            record = dict(medication)
+            record['sources'] = list(medication.get('sources') or [medication.get('source')])
+            if _pages(medication):
+                record['pages'] = _pages(medication)
+            self._records[key] = record
+            return True
+
+        for source in medication.get('sources') or [medication.get('source')]:
+            if source not in record['sources']:
+                record['sources'].append(source)
+
+        for page in _pages(medication):
+            pages = record.setdefault('pages', [])
+            if page not in pages:
+                pages.append(page)
+
+        if str(record.get('dosage', '')).strip().lower() in _EMPTY_DOSAGES and \
+                str(medication.get('dosage', '')).strip().lower() not in _EMPTY_DOSAGES:
+            for field in ('dosage', 'strength', 'unit'):
+                if field in medication:
+                    record[field] = medication[field]
+
+        for field, value in medication.items():
+            if field not in ('source', 'sources', 'pages') and value and not record.get(field):
+                record[field] = value
+        return False
+
+    def extend(self, medications: Iterable[Dict]) -> List[Dict]:
+        """Index several medications; returns the records that were new"""
+        added = []
+        for medication in medications:
+            if self.add(medication):
+                added.append(self._records[medication_key(medication['name'])])
+        return added
+
+    def medications(self) -> List[Dict]:
+        """Indexed records in first-seen order"""
+        return list(self._records.values())
+
+
+def _pages(medication: Dict) -> List:
+    """Pages a medication record was found on"""
+    if medication.get('pages'):
+        return list(medication['pages'])
+    return [medication['page']] if medication.get('page') is not None else []
+
+
+def _dose_segments(text: str) -> List[tuple]:
+    """(start, end) spans of text that contain a number followed by a dose unit"""
+    segments = []
+    for segment in _SEGMENT.finditer(text):
+        start, end = segment.span()
+        if _DOSE_ANCHOR.search(text, start, end):
+            segments.append((start, end))
+    return segments
+
+
+class MedicationScanner:
+    """
+    Extracts medication dicts from free text.
+
+    With a drug dictionary (see services.drug_dictionary) known brand and
+    generic names are found too, misspelled names are mapped to the closest
+    known drug, and every hit on a known drug carries its drug_class,
+    caretend_code and match_score.
+    """
+
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary
+
+    def extract(self, text: str, page_of: Optional[Callable[[int], Optional[int]]] = None) -> List[Dict]:
+        """
+        Extract medication information from text using comprehensive pattern matching.
+
+        page_of maps an offset in text to its page number (see
+        services.page_buffer.PageBuffer.page_at); when given, each record
+        carries the 'page' it was first found on and the 'pages' it appears on.
+        """
+        medications = MedicationIndex()
+        locate = _page_locator(text, page_of) if page_of is not None else None
+
+        # Clean and normalize text
+        text = _WHITESPACE.sub(' ', text)
+
+        segments = _dose_segments(text)
+
+        for pattern, anchor, has_unit in _COMPILED_DOSAGE:
+            for start, end in segments:
+                if not anchor.search(text, start, end):
+                    continue
+                for match in pattern.finditer(text, start, end):
+                    medication = self._dosage_match(match, has_unit)
+                    if medication is not None:
+                        medications.add(_located(medication, locate, match.start()))
+
+        # Additional pattern for common drug endings (even without clear dosage)
+        for match in self._ending_matches(text):
+            drug_name = match.group(0).strip().title()
+            medication = self._ending_match(text, match.start(), match.end(), drug_name)
+            medications.add(_located(medication, locate, match.start()))
+
+        if self.dictionary is not None:
+            medications = self._resolve_with_dictionary(text, medications, locate)
+
+        return medications.medications()
+
+    def _resolve_with_dictionary(self, text: str, medications: MedicationIndex,
+                                 locate: Optional[Callable[[int], Optional[int]]] = None) -> MedicationIndex:
+        """
+        Map pattern hits onto known drugs, then add known drugs the patterns
+        missed. Resolved records take the dictionary name, its codes and a
+        match_score; near-misses (e.g. OCR's "Lisinoprll") score below 1.0.
+        """
+        dictionary = self.dictionary.current()
+        resolved = MedicationIndex()
+
+        for record in medications.medications():
+            hit = self._resolve_name(dictionary, record['name'])
+            if hit is None:
+                resolved.add(record)
+                continue
+            resolved.add({**record, **_dictionary_fields(hit), 'name': hit['name'],
+                          'sources': record['sources'] + ['dictionary']})
+
+        for hit in dictionary.scan(text):
+            if hit['name'] not in resolved:
+                medication = self._dictionary_match(text, hit['start'], hit['end'], {**hit, 'match_score': 1.0})
+                resolved.add(_located(medication, locate, hit['start']))
+
+        # Words OCR mixed digits into ("Metf0rmin") never reach the patterns
+        for word in _OCR_WORD.finditer(text):
+            hit = dictionary.match(word.group(0)) if len(word.group(0)) >= 5 else None
+            if hit and hit['name'] not in resolved:
+                medication = self._dictionary_match(text, word.start(), word.end(), hit)
+                resolved.add(_located(medication, locate, word.start()))
+
+        return resolved
+
+    def _resolve_name(self, dictionary, name: str):
+        """Dictionary hit for a candidate name: exact, else closest whole-name or single-word match"""
+        hits = dictionary.scan(name)
+        if hits:
+            return {**hits[0], 'match_score': 1.0}
+
+        candidates = [name] + [word for word in name.split() if len(word) >= 5 and word != name]
+        matches = [match for match in map(dictionary.match, candidates) if match]
+        return max(matches, key=lambda match: match['match_score']) if matches else None
+
+    def _dictionary_match(self, text: str, start: int, end: int, hit: Dict) -> Dict:
+        """Medication dict for a dictionary hit found at text[start:end]"""
+        medication = self._ending_match(text, start, end, hit['name'])
+        medication.update(_dictionary_fields(hit))
+        medication['source'] = 'dictionary'
+        return medication
+
+    def _dosage_match(self, match, has_unit: bool):
+        """Build a medication dict from a dosage-pattern match, or None if it is noise"""
+        drug_name = match.group(1).strip()
+        dosage_amount = match.group(2)
+        dosage_unit = match.group(3) if has_unit else 'mg'
+
+        # Clean up drug name
+        drug_name = _EDGE_NON_WORD.sub('', drug_name)  # Remove leading/trailing non-word chars
+        drug_name = _WHITESPACE.sub(' ', drug_name)  # Normalize spaces
+
+        # Skip if name is too short or contains numbers
+        if len(drug_name) < 3 or _DIGIT.search(drug_name):
+            return None
+
+        # Skip common false positives
+        if drug_name.lower() in FALSE_POSITIVES:
+            return None
+
+        return {
+            'name': drug_name.title(),  # Proper case
+            'dosage': f"{dosage_amount} {dosage_unit}",
+            'strength': dosage_amount,
+            'unit': dosage_unit,
+            'source': 'text_extraction'
+        }
+
+    def _ending_matches(self, text: str):
+        """Drug-ending matches grouped by ending priority, then by position"""
+        matches = list(_DRUG_ENDING.finditer(text))
+        matches.sort(key=lambda match: _ENDING_RANK[match.group(1).lower()])
+        return matches
+
+    def _ending_match(self, text: str, start: int, end: int, drug_name: str) -> Dict:
+        """Build a medication dict for a name found at text[start:end], looking for a dose nearby"""
+        context_start = max(0, start - 50)
+        context_end = min(len(text), end + 50)
+
+        dose_match = _DOSE.search(text, context_start, context_end)
+        if dose_match:
+            return {
+                'name': drug_name,
+                'dosage': f"{dose_match.group(1)} {dose_match.group(2)}",
+                'strength': dose_match.group(1),
+                'unit': dose_match.group(2),
+                'source': 'pattern_recognition'
+            }
+        return {
+            'name': drug_name,
+            'dosage': 'Dosage not specified',
+            'strength': '',
+            'unit': '',
+            'source': 'pattern_recognition'
+        }
+
+
+def _page_locator(text: str, page_of: Callable[[int], Optional[int]]) -> Callable[[int], Optional[int]]:
+    """
+    Wrap page_of so it takes offsets in the whitespace-normalized text the
+    scanner matches against: each collapsed whitespace run shifts later
+    offsets, so the run ends are recorded to map offsets back to text.
+    """
+    normalized, original = [0], [0]
+    removed = 0
+    for run in _WHITESPACE.finditer(text):
+        extra = len(run.group(0)) - 1
+        if extra:
+            removed += extra
+            normalized.append(run.end() - removed)
+            original.append(run.end())
+
+    def locate(offset: int) -> Optional[int]:
+        index = bisect_right(normalized, offset) - 1
+        return page_of(original[index] + offset - normalized[index])
+    return locate
+
+
+def _located(medication: Dict, locate, offset: int) -> Dict:
+    """Tag a medication with the page its match starts on"""
+    if locate is not None:
+        page = locate(offset)
+        if page is not None:
+            medication['page'] = page
+    return medication
+
+
+def _dictionary_fields(hit: Dict) -> Dict:
+    fields = {'generic_name': hit['generic_name'], 'drug_class': hit['drug_class'],
+              'caretend_code': hit['caretend_code'], 'match_score': hit['match_score']}
+    if hit['match_score'] < 1.0:
+        fields['matched_text'] = hit['matched']
+    return fields
+
+
+medication_scanner = MedicationScanner()
+
+
+def extract_medications(text: str, page_of: Optional[Callable[[int], Optional[int]]] = None) -> List[Dict]:
+    """Extract medications from text with the shared scanner"""
+    return medication_scanner.extract(text, page_of)
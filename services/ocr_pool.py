@@ -0,0 +1,374 @@
+"""
+Persistent OCR worker pool
+Long-lived worker processes that each keep a Tesseract engine loaded, so a
+page costs one OCR call instead of a process spawn, temp files and model
+load. Page images are sent to workers over pipes as raw pixels. The pool
+limits concurrency to its worker count, enforces a per-page timeout and
+replaces workers that hang or crash. Results are cached by an exact hash of
+the page raster, so repeated pages (fax cover sheets, boilerplate) skip
+Tesseract entirely.
+"""
+
+import os
+import re
+import time
+import atexit
+import queue
+import logging
+import threading
+import multiprocessing
+from typing import Dict, Optional
+
+from services.extraction_cache import ExtractionCache, make_cache_key
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Worker processes (0 disables the pool and OCR runs in-process), seconds
+# allowed per page, and Tesseract language
+OCR_POOL_WORKERS = int(os.getenv('OCR_POOL_WORKERS', '2'))
+OCR_PAGE_TIMEOUT = float(os.getenv('OCR_PAGE_TIMEOUT', '60'))
+OCR_LANG = os.getenv('OCR_LANG', 'eng')
+
+# Page OCR cache: entries kept in memory (0 disables) and optional disk tier
+OCR_CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', '256'))
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR') or None
+
+_PSM = re.compile(r'--psm\s+(\d+)')
+
+
+class OcrTimeoutError(Exception):
+    """Raised when a page takes longer than the pool's per-page timeout"""
+
+
+class OcrWorkerError(Exception):
+    """Raised when an OCR worker dies or fails on a page"""
+
+
+def tsv_to_data(tsv: str) -> Dict:
+    """Parse Tesseract TSV output into pytesseract's image_to_data DICT layout"""
+    lines = tsv.rstrip('\n').split('\n')
+    columns = lines[0].split('\t')
+    data = {column: [] for column in columns}
+    for line in lines[1:]:
+        values = line.split('\t')
+        values += [''] * (len(columns) - len(values))
+        for column, value in zip(columns, values):
+            data[column].append(value if column in ('text', 'conf') else int(value))
+    return data
+
+
+def ocr_data_to_page(ocr_data: Dict) -> Dict:
+    """
+    Build page text, word boxes and average confidence from
+    pytesseract.image_to_data output.
+
+    Words are joined with spaces within a line, lines with newlines and
+    paragraphs with a blank line, as image_to_string lays them out.
+    """
+    words = []
+    lines = []
+    paragraph = None
+    line = None
+
+    for i, word in enumerate(ocr_data['text']):
+        word = (word or '').strip()
+        if not word:
+            continue
+
+        word_paragraph = (ocr_data['block_num'][i], ocr_data['par_num'][i])
+        word_line = word_paragraph + (ocr_data['line_num'][i],)
+        if word_line != line:
+            if paragraph is not None and word_paragraph != paragraph:
+                lines.append('')
+            lines.append(word)
+            paragraph, line = word_paragraph, word_line
+        else:
+            lines[-1] += ' ' + word
+
+        words.append({
+            'text': word,
+            'confidence': float(ocr_data['conf'][i]),
+            'left': int(ocr_data['left'][i]),
+            'top': int(ocr_data['top'][i]),
+            'width': int(ocr_data['width'][i]),
+            'height': int(ocr_data['height'][i]),
+            'line': len(lines)  # 1-based line of the page text
+        })
+
+    confidences = [word['confidence'] for word in words if word['confidence'] > 0]
+    return {
+        'text': '\n'.join(lines),
+        'words': words,
+        'confidence': round(sum(confidences) / len(confidences), 2) if confidences else 0
+    }
+
+
+class _Engine:
+    """OCR engine living inside a worker: a warm tesserocr API, else pytesseract"""
+
+    def __init__(self, lang: str):
+        self.lang = lang
+        self.api = tesserocr.PyTessBaseAPI(lang=lang) if TESSEROCR_AVAILABLE else None
+
+    def run(self, image, mode: str, config: str):
+        if self.api is None:
+            if mode == 'data':
+                return pytesseract.image_to_data(image, lang=self.lang, config=config,
+                                                 output_type=pytesseract.Output.DICT)
+            return pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+        psm = _PSM.search(config or '')
+        self.api.SetPageSegMode(int(psm.group(1)) if psm else tesserocr.PSM.AUTO)
+        self.api.SetImage(image)
+        if mode == 'data':
+            # Tesseract's TSV omits the header row here; add the one image_to_data uses
+            header = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n'
+            return tsv_to_data(header + self.api.GetTSVText(0))
+        return self.api.GetUTF8Text()
+
+
+def _worker_main(conn, lang: str):
+    """Worker process loop: receive (mode, config, pixel mode, size, pixels), reply (status, value)"""
+    engine = _Engine(lang)
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if request is None:
+            break
+
+        mode, config, pixel_mode, size, pixels = request
+        try:
+            image = Image.frombytes(pixel_mode, size, pixels)
+            conn.send(('ok', engine.run(image, mode, config)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+class _Worker:
+    """Parent-side handle for one worker process and its pipe"""
+
+    def __init__(self, context, lang: str):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, lang), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        try:
+            self.conn.close()
+        finally:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(1)
+
+
+class OcrWorkerPool:
+    """
+    Fixed set of OCR worker processes.
+
+    image_to_string / image_to_data mirror pytesseract's functions. Callers
+    block until a worker is free, so at most `workers` pages are OCR'd at
+    once across all threads. `timeout` covers both the wait for a worker and
+    the OCR itself; a page that exceeds it or kills its worker raises, and a
+    worker that was running it is replaced before the next page.
+    """
+
+    def __init__(self, workers: int = OCR_POOL_WORKERS, timeout: float = OCR_PAGE_TIMEOUT,
+                 lang: str = OCR_LANG):
+        self.workers = workers
+        self.timeout = timeout
+        self.lang = lang
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._stats = {'pages': 0, 'timeouts': 0, 'queue_timeouts': 0, 'restarts': 0}
+
+    def start(self):
+        """Spawn the worker processes (idempotent)"""
+        with self._lock:
+            if self._all:
+                return
+            for _ in range(self.workers):
+                worker = _Worker(self._context, self.lang)
+                self._all.append(worker)
+                self._idle.put(worker)
+
+    def stop(self):
+        """Ask workers to exit, killing any that do not"""
+        with self._lock:
+            workers, self._all = self._all, []
+        self._idle = queue.Queue()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+                worker.process.join(1)
+            except Exception:
+                pass
+            worker.kill()
+
+    def image_to_string(self, image, config: str = '', timeout: Optional[float] = None) -> str:
+        return self._run(image, 'string', config, timeout)
+
+    def image_to_data(self, image, config: str = '', timeout: Optional[float] = None) -> Dict:
+        return self._run(image, 'data', config, timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, workers=len(self._all))
+
+    def _run(self, image, mode: str, config: str, timeout: Optional[float] = None):
+        timeout = self.timeout if timeout is None else timeout
+        self.start()
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB')
+
+        # Waiting for a free worker spends the same budget (and so the caller's deadline)
+        expires_at = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            with self._lock:
+                self._stats['queue_timeouts'] += 1
+            raise OcrTimeoutError(f"No OCR worker free within {timeout:g}s")
+        try:
+            worker.conn.send((mode, config, image.mode, image.size, image.tobytes()))
+            if not worker.conn.poll(max(0.0, expires_at - time.monotonic())):
+                worker = self._replace(worker, timed_out=True)
+                raise OcrTimeoutError(f"OCR exceeded {timeout:g}s for one page")
+            status, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker = self._replace(worker)
+            raise OcrWorkerError(f"OCR worker died: {e}")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+        with self._lock:
+            self._stats['pages'] += 1
+        if status != 'ok':
+            raise OcrWorkerError(value)
+        return value
+
+    def _replace(self, worker: _Worker, timed_out: bool = False) -> Optional[_Worker]:
+        """Kill a hung or dead worker and start a fresh one in its place"""
+        worker.kill()
+        with self._lock:
+            if worker not in self._all:
+                return None  # Pool was stopped meanwhile
+            self._stats['restarts'] += 1
+            if timed_out:
+                self._stats['timeouts'] += 1
+            replacement = _Worker(self._context, self.lang)
+            self._all[self._all.index(worker)] = replacement
+        logger.warning(f"Replaced OCR worker (pid {worker.process.pid})")
+        return replacement
+
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> Optional[OcrWorkerPool]:
+    """
+    The process-wide pool, or None when disabled (OCR_POOL_WORKERS=0) or when
+    called from a child process such as a page-extraction worker.
+    """
+    global _ocr_pool
+    if OCR_POOL_WORKERS <= 0 or multiprocessing.parent_process() is not None:
+        return None
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = OcrWorkerPool()
+            atexit.register(_ocr_pool.stop)
+        return _ocr_pool
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[ExtractionCache]:
+    """The process-wide page OCR cache, or None when OCR_CACHE_SIZE is 0"""
+    global _ocr_cache
+    if OCR_CACHE_SIZE <= 0:
+        return None
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = ExtractionCache(max_entries=OCR_CACHE_SIZE, disk_dir=OCR_CACHE_DIR)
+        return _ocr_cache
+
+
+def raster_cache_key(image, mode: str, config: str) -> str:
+    """Cache key for OCR output: exact hash of the pixels plus OCR mode, language and config"""
+    header = f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode()
+    return make_cache_key(header + image.tobytes(), f"ocr-{mode}", f"{OCR_LANG}{config.replace(' ', '')}")
+
+
+def _ocr(image, mode: str, config: str, timeout: Optional[float] = None):
+    """
+    OCR through the page cache, then the pool, then pytesseract directly.
+    timeout (default OCR_PAGE_TIMEOUT) bounds the Tesseract call; on expiry
+    the call is killed and OcrTimeoutError raised.
+    """
+    cache = get_ocr_cache()
+    key = raster_cache_key(image, mode, config) if cache else None
+    if key:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached['value']
+
+    timeout = OCR_PAGE_TIMEOUT if timeout is None else timeout
+    if timeout <= 0:
+        # No time left (and pytesseract reads 0 as "no timeout")
+        raise OcrTimeoutError("No time left to OCR the page")
+
+    pool = get_ocr_pool()
+    if pool is not None:
+        value = (pool.image_to_data(image, config, timeout) if mode == 'data'
+                 else pool.image_to_string(image, config, timeout))
+    else:
+        try:
+            if mode == 'data':
+                value = pytesseract.image_to_data(image, lang=OCR_LANG, config=config, timeout=timeout,
+                                                  output_type=pytesseract.Output.DICT)
+            else:
+                value = pytesseract.image_to_string(image, lang=OCR_LANG, config=config, timeout=timeout)
+        except RuntimeError as e:
+            # pytesseract kills Tesseract and raises RuntimeError('Tesseract process timeout')
+            if 'timeout' in str(e).lower():
+                raise OcrTimeoutError(f"OCR exceeded {timeout:g}s for one page")
+            raise
+
+    if key:
+        cache.put(key, {'value': value})
+    return value
+
+
+def image_to_string(image, config: str = '', timeout: Optional[float] = None) -> str:
+    """OCR an image to text (cached by raster, through the pool when enabled)"""
+    return _ocr(image, 'string', config, timeout)
+
+
+def image_to_data(image, config: str = '', timeout: Optional[float] = None) -> Dict:
+    """OCR an image to pytesseract's image_to_data DICT (cached by raster, through the pool when enabled)"""
+    return _ocr(image, 'data', config, timeout)
@@ -0,0 +1,63 @@
+"""
+Page text buffer
+Assembles a document's text from per-page segments. Segments are collected
+in a list and joined once, instead of growing one string page by page, and
+each page's span in the joined text is recorded so an offset (e.g. where a
+medication was matched) maps back to its page without re-splitting the text
+on "--- Page N ---" markers.
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+
+class PageBuffer:
+    """
+    Per-page text segments with their offsets in the joined document text.
+
+    Each page is written as header + text + footer; the page's span covers
+    all three, so offsets inside a page marker belong to that page.
+    """
+
+    def __init__(self):
+        self._segments = []
+        self._length = 0
+        self._starts = []
+        self._pages = []
+        self._spans = []
+        self._text = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def add_page(self, page: int, text: str, header: str = '', footer: str = '') -> int:
+        """Append a page; returns the offset of its text in the joined document"""
+        self._starts.append(self._length)
+        self._pages.append(page)
+
+        text = text or ''
+        start = self._length + len(header)
+        for segment in (header, text, footer):
+            if segment:
+                self._segments.append(segment)
+        self._length = start + len(text) + len(footer)
+        self._spans.append({'page': page, 'start': start, 'end': start + len(text)})
+        self._text = None
+        return start
+
+    def text(self) -> str:
+        """The joined document text (joined once, then reused until the next add)"""
+        if self._text is None:
+            self._text = ''.join(self._segments)
+            self._segments = [self._text] if self._text else []
+        return self._text
+
+    def page_at(self, offset: int) -> Optional[int]:
+        """Page number holding the character at offset, or None outside the document"""
+        if offset < 0 or offset >= self._length:
+            return None
+        return self._pages[bisect_right(self._starts, offset) - 1]
+
+    def pages(self) -> List[Dict]:
+        """[{'page', 'start', 'end'}] spans of each page's text in the joined document"""
+        return [dict(span) for span in self._spans]
@@ -0,0 +1,142 @@
+"""
+Selective table extraction
+Cheap per-page pre-check for pdfplumber pages, so the expensive
+extract_tables() only runs where a table is likely. pdfplumber's default
+("lines") strategy builds cells from ruling edges, so pages are judged by
+their ruling lines and rect objects, with aligned character columns tipping
+borderline pages. Curves alone (logos, signatures, rounded boxes) do not
+make a table; a rounded-corner table still has straight ruling edges.
+"""
+
+import os
+import time
+from typing import Dict, Iterable, List, Tuple
+
+# 'auto' pre-checks each page, 'always' extracts tables on every page,
+# 'never' skips table extraction entirely
+TABLE_EXTRACTION = os.getenv('TABLE_EXTRACTION', 'auto').lower()
+
+# Seconds per page assumed for a skipped extract_tables() call when no page
+# of the document was extracted to measure it
+TABLE_EXTRACT_ESTIMATE = float(os.getenv('TABLE_EXTRACT_ESTIMATE', '0.1'))
+
+# Objects thinner than this (points) are treated as ruling lines
+_RULE_THICKNESS = 2.0
+
+
+def ruling_edges(page) -> Tuple[int, int]:
+    """(horizontal, vertical) ruling edges from a page's line and rect objects"""
+    horizontal = vertical = 0
+    for line in page.lines:
+        if abs(line['top'] - line['bottom']) < _RULE_THICKNESS:
+            horizontal += 1
+        elif abs(line['x0'] - line['x1']) < _RULE_THICKNESS:
+            vertical += 1
+
+    for rect in page.rects:
+        width = abs(rect['x1'] - rect['x0'])
+        height = abs(rect['bottom'] - rect['top'])
+        if height < _RULE_THICKNESS and width >= _RULE_THICKNESS:
+            horizontal += 1
+        elif width < _RULE_THICKNESS and height >= _RULE_THICKNESS:
+            vertical += 1
+        elif width >= _RULE_THICKNESS and height >= _RULE_THICKNESS:
+            # A box contributes all four edges
+            horizontal += 2
+            vertical += 2
+    return horizontal, vertical
+
+
+def aligned_columns(chars: List[Dict], tolerance: float = 3.0, min_rows: int = 3) -> int:
+    """
+    Number of x positions where text starts after a wide gap on at least
+    min_rows different lines - the signature of tabular columns.
+    """
+    rows = {}
+    for char in chars:
+        if not char['text'].isspace():
+            rows.setdefault(round(char['top']), []).append(char)
+
+    starts = {}
+    for row_chars in rows.values():
+        row_chars.sort(key=lambda char: char['x0'])
+        for previous, char in zip(row_chars, row_chars[1:]):
+            # A gap of a full character size or more separates columns, not words
+            if char['x0'] - previous['x1'] >= char.get('size', 10):
+                bucket = round(char['x0'] / tolerance)
+                starts.setdefault(bucket, set()).add(round(char['top']))
+
+    return sum(1 for tops in starts.values() if len(tops) >= min_rows)
+
+
+def table_hints(page) -> Dict:
+    """Pre-check features of a pdfplumber page and whether a table is likely"""
+    horizontal, vertical = ruling_edges(page)
+    curves = len(page.curves)
+    # Two rows of cells need three horizontal and two vertical edges
+    likely = horizontal >= 3 and vertical >= 2
+
+    columns = None
+    if not likely and horizontal >= 2 and vertical >= 2:
+        # A single ruled box holding aligned columns is still worth extracting
+        columns = aligned_columns(page.chars)
+        likely = columns >= 2
+    return {
+        'horizontal_edges': horizontal,
+        'vertical_edges': vertical,
+        'curves': curves,
+        'aligned_columns': columns,
+        'likely': likely
+    }
+
+
+def extract_page_tables(page, mode: str = None) -> Tuple[List, Dict]:
+    """
+    Run page.extract_tables() if the mode and pre-check call for it.
+
+    Returns (tables, check) where check records what happened for the
+    page: {'mode', 'extracted', 'precheck_seconds', 'extract_seconds', 'hints'}.
+    """
+    mode = mode or TABLE_EXTRACTION
+    check = {'mode': mode, 'extracted': False, 'precheck_seconds': 0.0, 'extract_seconds': 0.0}
+
+    if mode == 'never':
+        return [], check
+
+    if mode != 'always':
+        started = time.perf_counter()
+        check['hints'] = table_hints(page)
+        check['precheck_seconds'] = time.perf_counter() - started
+        if not check['hints']['likely']:
+            return [], check
+
+    started = time.perf_counter()
+    tables = page.extract_tables() or []
+    check['extract_seconds'] = time.perf_counter() - started
+    check['extracted'] = True
+    return tables, check
+
+
+def summarize_table_checks(checks: Iterable[Dict]) -> Dict:
+    """
+    Document totals for per-page checks: pages extracted and skipped, time
+    spent, and the extraction time the skipped pages are estimated to have
+    saved (net of the pre-check).
+    """
+    checks = [check for check in checks if check]
+    extracted = [check for check in checks if check['extracted']]
+    skipped = len(checks) - len(extracted)
+
+    precheck = sum(check['precheck_seconds'] for check in checks)
+    extract = sum(check['extract_seconds'] for check in extracted)
+    per_page = extract / len(extracted) if extracted else TABLE_EXTRACT_ESTIMATE
+
+    return {
+        'mode': checks[0]['mode'] if checks else TABLE_EXTRACTION,
+        'pages_checked': len(checks),
+        'pages_extracted': len(extracted),
+        'pages_skipped': skipped,
+        'precheck_seconds': round(precheck, 4),
+        'extract_seconds': round(extract, 4),
+        'estimated_seconds_saved': round(skipped * per_page - precheck, 4)
+    }
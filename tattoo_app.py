@@ -16,6 +16,7 @@ import PyPDF2
 import pdfplumber
 import io
 import time
+import threading
 import re
 import json
 
@@ -63,18 +64,108 @@ DATABASE_CONFIG = {
     'port': os.environ.get('DATABASE_PORT', '5432')
 }
 
+# Connection pool: most connections open at once, seconds to wait for a free
+# one, seconds an idle connection is kept, and seconds before any connection
+# is closed and reopened (max lifetime); connections idle longer than
+# PING_AFTER seconds are checked with SELECT 1 before reuse
+DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', '10'))
+DATABASE_POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', '30'))
+DATABASE_POOL_IDLE_TIMEOUT = float(os.environ.get('DATABASE_POOL_IDLE_TIMEOUT', '300'))
+DATABASE_POOL_RECYCLE = float(os.environ.get('DATABASE_POOL_RECYCLE', '3600'))
+DATABASE_POOL_PING_AFTER = float(os.environ.get('DATABASE_POOL_PING_AFTER', '30'))
+
+class PooledConnection:
+    """Keep-alive connection from the pool; close() or leaving a with-block hands it back"""
+    
+    _conn = None
+    
+    def __init__(self, manager, conn, created_at):
+        self._manager = manager
+        self._conn = conn
+        self._created_at = created_at
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._manager.release(conn, self._created_at)
+
 class DatabaseManager:
     def __init__(self):
         self.config = DATABASE_CONFIG
+        self._idle = []  # (conn, created_at, released_at), most recently released last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(DATABASE_POOL_SIZE)
         
     def get_connection(self):
-        """Get database connection with proper error handling"""
+        """Get a pooled database connection; close() returns it to the pool"""
+        if not self._slots.acquire(timeout=DATABASE_POOL_TIMEOUT):
+            app.logger.error("Database connection error: no pooled connection free")
+            return None
+        
+        now = time.time()
+        entry = None
+        while entry is None:
+            with self._lock:
+                idle = self._idle.pop() if self._idle else None
+            if idle is None:
+                break
+            conn, created_at, released_at = idle
+            if conn.closed or now - released_at >= DATABASE_POOL_IDLE_TIMEOUT or \
+                    now - created_at >= DATABASE_POOL_RECYCLE or \
+                    (now - released_at >= DATABASE_POOL_PING_AFTER and not self._ping(conn)):
+                self._disconnect(conn)
+            else:
+                entry = (conn, created_at)
+        
+        if entry is None:
+            try:
+                entry = (psycopg2.connect(**self.config), now)
+            except psycopg2.Error as e:
+                self._slots.release()
+                app.logger.error(f"Database connection error: {e}")
+                return None
+        return PooledConnection(self, *entry)
+    
+    def release(self, conn, created_at):
+        """Return a connection to the pool, or close it if it is broken or past its lifetime"""
+        try:
+            if not conn.closed:
+                conn.rollback()  # Never hand on an open transaction
+        except psycopg2.Error:
+            pass
+        if conn.closed or time.time() - created_at >= DATABASE_POOL_RECYCLE:
+            self._disconnect(conn)
+        else:
+            with self._lock:
+                self._idle.append((conn, created_at, time.time()))
+        self._slots.release()
+    
+    def _ping(self, conn):
+        """Whether an idle connection still answers; the server may have dropped it"""
         try:
-            conn = psycopg2.connect(**self.config)
-            return conn
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+            return True
         except psycopg2.Error as e:
-            app.logger.error(f"Database connection error: {e}")
-            return None
+            app.logger.warning(f"Discarding dead database connection: {e}")
+            return False
+    
+    def _disconnect(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
     
     def init_tables(self):
         """Initialize database tables for tattoo parlor"""
@@ -158,14 +249,13 @@ class DatabaseManager:
             
             conn.commit()
             cursor.close()
-            conn.close()
             return True
             
         except psycopg2.Error as e:
             app.logger.error(f"Database initialization error: {e}")
-            if conn:
-                conn.close()
             return False
+        finally:
+            conn.close()
 
 # Initialize database manager
 db_manager = DatabaseManager()
@@ -232,12 +322,12 @@ class TattooDocumentProcessor:
         """Advanced text extraction using pdfplumber"""
         try:
             with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-                text = ""
+                page_texts = []
                 for page in pdf.pages:
                     page_text = page.extract_text()
                     if page_text:
-                        text += page_text + "\n"
-                return text
+                        page_texts.append(page_text + "\n")
+                return "".join(page_texts)
         except:
             return None
     
@@ -245,10 +335,7 @@ class TattooDocumentProcessor:
         """Basic text extraction using PyPDF2"""
         try:
             pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            return "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
         except:
             return None
     
@@ -386,11 +473,12 @@ def login():
                     flash('Invalid username or password', 'error')
                     
                 cursor.close()
-                conn.close()
                 
             except psycopg2.Error as e:
                 app.logger.error(f"Login error: {e}")
                 flash('Login system error', 'error')
+            finally:
+                conn.close()
     
     return render_template('auth.html', 
                          app_name=INDUSTRY_CONFIG['name'],
@@ -447,12 +535,13 @@ def api_process_document():
                     processing_id = cursor.fetchone()[0]
                     conn.commit()
                     cursor.close()
-                    conn.close()
                     
                     result['processing_id'] = processing_id
                     
                 except psycopg2.Error as e:
                     app.logger.error(f"Database save error: {e}")
+                finally:
+                    conn.close()
         
         return jsonify(result)
         
@@ -0,0 +1,47 @@
+import os
+from services.blob_store import DirectoryBlobStore, encode_blob, blob_ref
+
+
+class TestDirectoryBlobStore:
+    """Test cases for the content-addressed blob store"""
+    
+    def test_round_trip_text_and_json(self, tmp_path):
+        """Test text and result dicts come back as stored"""
+        store = DirectoryBlobStore(str(tmp_path))
+        result = {'medications_count': 2, 'medications_found': [{'name': 'Lisinopril'}]}
+        
+        text_ref = store.put('Lisinopril 10 mg daily\n' * 100)
+        result_ref = store.put(result)
+        
+        assert store.get_text(text_ref) == 'Lisinopril 10 mg daily\n' * 100
+        assert store.get_json(result_ref) == result
+        assert len(text_ref) == 64
+    
+    def test_identical_content_is_stored_once(self, tmp_path):
+        """Test re-uploaded text de-duplicates to one compressed file"""
+        store = DirectoryBlobStore(str(tmp_path))
+        text = '--- Page 1 ---\nMetformin 500 mg twice daily\n' * 200
+        
+        first = store.put(text)
+        second = store.put(text)
+        
+        files = [name for _, _, names in os.walk(tmp_path) for name in names]
+        assert first == second == blob_ref(encode_blob(text))
+        assert len(files) == 1
+        stats = store.stats()
+        assert (stats['puts'], stats['deduplicated']) == (2, 1)
+        assert stats['bytes_stored'] < len(text) / 10
+    
+    def test_json_references_ignore_key_order(self, tmp_path):
+        """Test equal dicts share a reference whatever their key order"""
+        store = DirectoryBlobStore(str(tmp_path))
+        
+        assert store.put({'a': 1, 'b': 2}) == store.put({'b': 2, 'a': 1})
+    
+    def test_missing_and_empty_references(self, tmp_path):
+        """Test None stores nothing and unknown references read as None"""
+        store = DirectoryBlobStore(str(tmp_path))
+        
+        assert store.put(None) is None
+        assert store.get(None) is None
+        assert store.get_text('0' * 64) is None
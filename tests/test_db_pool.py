@@ -0,0 +1,119 @@
+import threading
+import time
+import pytest
+from services.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def execute(self, query, params=None):
+        if self.connection.broken:
+            self.connection.closed = 2
+            raise RuntimeError('server closed the connection unexpectedly')
+    
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+    
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+    
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    opened = []
+    
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+    
+    options = dict(min_size=1, max_size=2, timeout=1, recycle=0, idle_timeout=0, ping_after=30)
+    options.update(kwargs)
+    return ConnectionPool(connect, **options), opened
+
+
+class TestConnectionPool:
+    """Test cases for the database connection pool"""
+    
+    def test_reuses_returned_connection(self):
+        """Test sequential checkouts share one connection instead of reconnecting"""
+        pool, opened = make_pool()
+        
+        for _ in range(3):
+            with pool.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        
+        assert len(opened) == 1
+        assert pool.stats()['checkouts'] == 3
+        assert pool.stats()['in_use'] == 0
+    
+    def test_concurrent_checkouts_get_separate_connections(self):
+        """Test two threads holding connections at once are not serialized on one socket"""
+        pool, opened = make_pool()
+        
+        with pool.connection() as first, pool.connection() as second:
+            assert first is not second
+        
+        assert len(opened) == 2
+        assert pool.stats()['idle'] == 2
+    
+    def test_waits_for_free_connection_then_times_out(self):
+        """Test checkouts beyond max_size block, are measured, and give up after the timeout"""
+        pool, opened = make_pool(max_size=1, timeout=0.05)
+        connection = pool.getconn()
+        
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+        
+        threading.Timer(0.02, pool.putconn, [connection]).start()
+        pool.timeout = 1
+        assert pool.getconn() is connection
+        stats = pool.stats()
+        assert stats['timeouts'] == 1
+        assert stats['waits'] == 1
+        assert stats['max_wait_seconds'] > 0
+    
+    def test_dropped_connection_is_replaced(self):
+        """Test a connection the server dropped is discarded and a new one opened"""
+        pool, opened = make_pool(ping_after=0)
+        with pool.connection() as connection:
+            pass
+        connection.broken = True
+        
+        with pool.connection() as replacement:
+            assert replacement is not connection
+        
+        assert connection.closed
+        assert pool.stats()['discarded'] == 1
+        assert pool.stats()['size'] == 1
+    
+    def test_recycles_old_connections(self):
+        """Test connections past the recycle age are closed and reopened"""
+        pool, opened = make_pool(recycle=0.01)
+        time.sleep(0.02)
+        
+        with pool.connection() as connection:
+            assert connection is opened[1]
+        
+        assert opened[0].closed
+    
+    def test_idle_connections_above_minimum_are_closed(self):
+        """Test the idle timeout trims the pool back to min_size"""
+        pool, opened = make_pool(idle_timeout=0.01)
+        with pool.connection(), pool.connection():
+            pass
+        time.sleep(0.02)
+        
+        with pool.connection():
+            pass
+        
+        assert pool.stats()['size'] == 1
@@ -0,0 +1,54 @@
+import time
+from services import deadline as deadline_module
+from services.deadline import Deadline, DeadlineExceeded, _parse_tenant_deadlines, deadline_for_tenant
+
+
+class TestDeadline:
+    """Test cases for extraction deadlines"""
+    
+    def test_no_deadline_never_expires(self):
+        """Test a deadline without a budget leaves timeouts unchanged"""
+        deadline = Deadline()
+        
+        assert not deadline.expired()
+        assert deadline.remaining() is None
+        assert deadline.timeout(60) == 60
+    
+    def test_timeout_is_capped_by_time_left(self):
+        """Test blocking calls get no more than the remaining budget"""
+        deadline = Deadline(5)
+        
+        assert 4 < deadline.timeout(60) <= 5
+        assert deadline.timeout(1) == 1
+    
+    def test_expired_deadline(self):
+        """Test an exhausted budget reports expiry and raises on check"""
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        
+        assert deadline.expired()
+        assert deadline.remaining() == 0.0
+        try:
+            deadline.check()
+        except DeadlineExceeded:
+            pass
+        else:
+            raise AssertionError("check() did not raise")
+
+
+class TestTenantDeadlines:
+    """Test cases for per-tenant deadline configuration"""
+    
+    def test_parse_skips_invalid_entries(self):
+        """Test tenant budgets are parsed and malformed entries ignored"""
+        assert _parse_tenant_deadlines('acme=60, mercy = 300,broken=abc,=5,') == {'acme': 60.0, 'mercy': 300.0}
+    
+    def test_tenant_override_and_default(self, monkeypatch):
+        """Test a tenant's budget replaces the default, and 0 disables the deadline"""
+        monkeypatch.setattr(deadline_module, 'EXTRACTION_DEADLINE', 120.0)
+        monkeypatch.setattr(deadline_module, 'TENANT_DEADLINES', {'acme': 30.0, '7': 0.0})
+        
+        assert deadline_for_tenant('acme').seconds == 30.0
+        assert deadline_for_tenant('other').seconds == 120.0
+        assert deadline_for_tenant(None).seconds == 120.0
+        assert deadline_for_tenant(7).seconds is None
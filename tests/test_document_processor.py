@@ -0,0 +1,87 @@
+import pytest
+from services import document_processor as dp
+from services.extraction_cache import ExtractionCache
+
+
+class FakeImage:
+    """Stand-in for a rendered PIL page image"""
+    
+    open_count = 0
+    
+    def __init__(self, page):
+        self.page = page
+        FakeImage.open_count += 1
+    
+    def close(self):
+        FakeImage.open_count -= 1
+
+
+class TestOcrRendering:
+    """Test cases for windowed OCR rasterization"""
+    
+    def test_renders_in_windows_and_releases_pages(self, monkeypatch):
+        """Test pages are rendered a window at a time and closed after use"""
+        calls = []
+        
+        def fake_convert(file_data, dpi=200, first_page=None, last_page=None, **kwargs):
+            calls.append((first_page, last_page, dpi))
+            return [FakeImage(n) for n in range(first_page, last_page + 1)]
+        
+        monkeypatch.setattr(dp, 'convert_from_bytes', fake_convert, raising=False)
+        FakeImage.open_count = 0
+        processor = dp.DocumentProcessor(cache=ExtractionCache(), ocr_dpi=150, ocr_window=2)
+        
+        pages = []
+        peak = 0
+        for image in processor._iter_page_images(b'%PDF', 5):
+            peak = max(peak, FakeImage.open_count)
+            pages.append(image.page)
+        
+        assert pages == [1, 2, 3, 4, 5]
+        assert calls == [(1, 2, 150), (3, 4, 150), (5, 5, 150)]
+        assert peak <= 2
+        assert FakeImage.open_count == 0
+
+
+class TestOcrDataToPage:
+    """Test cases for building OCR page records from image_to_data output"""
+    
+    def test_text_words_and_confidence_from_one_pass(self):
+        """Test lines, paragraphs, word boxes and average confidence"""
+        ocr_data = {
+            'text': ['', 'Lisinopril', '10mg', 'Metformin', '', 'Notes'],
+            'conf': ['-1', '96.5', '90', '80.5', '-1', '0'],
+            'block_num': [1, 1, 1, 1, 2, 2],
+            'par_num': [1, 1, 1, 1, 1, 1],
+            'line_num': [0, 1, 1, 2, 0, 1],
+            'left': [0, 10, 80, 10, 0, 10],
+            'top': [0, 5, 5, 30, 0, 60],
+            'width': [0, 60, 30, 70, 0, 40],
+            'height': [0, 12, 12, 12, 0, 12]
+        }
+        
+        page = dp.ocr_data_to_page(ocr_data)
+        
+        assert page['text'] == 'Lisinopril 10mg\nMetformin\n\nNotes'
+        assert [word['line'] for word in page['words']] == [1, 1, 2, 4]
+        assert page['words'][0] == {'text': 'Lisinopril', 'confidence': 96.5, 'left': 10, 'top': 5,
+                                    'width': 60, 'height': 12, 'line': 1}
+        assert page['confidence'] == 89.0
+
+
+class TestExtractionDeadline:
+    """Test cases for deadline-bounded document extraction"""
+    
+    def test_truncated_result_is_returned_but_not_cached(self, monkeypatch):
+        """Test partial results from a deadline are flagged and a retry is not served from cache"""
+        cache = ExtractionCache()
+        processor = dp.DocumentProcessor(cache=cache)
+        partial = {'success': True, 'content': [{'page': 1, 'text': 'Lisinopril 10 mg'}],
+                   'total_chars': 16, 'truncated': True, 'pages_total': 40, 'deadline_seconds': 30}
+        monkeypatch.setattr(processor, '_run_method', lambda m, data, cancel=None, deadline=None: partial)
+        
+        result = processor.extract_document_data(b'%PDF', 'scan.pdf', 'pypdf2', dp.Deadline(30))
+        
+        assert result['truncated'] is True
+        assert result['extraction_attempts'][0]['truncated'] is True
+        assert cache.stats()['memory_entries'] == 0
@@ -0,0 +1,110 @@
+import pytest
+from services.drug_dictionary import DrugDictionary, ReloadingDrugDictionary, bounded_levenshtein
+from services.medication_scanner import MedicationScanner
+
+ROWS = [
+    {'name': 'Lisinopril', 'generic_name': 'lisinopril', 'drug_class': 'ACE Inhibitor', 'caretend_code': 'ACE001'},
+    {'name': 'Lipitor', 'generic_name': 'atorvastatin', 'drug_class': 'Statin', 'caretend_code': 'STA001'},
+    {'name': 'Insulin Glargine', 'generic_name': 'insulin glargine', 'drug_class': 'Insulin', 'caretend_code': 'INS001'},
+    {'name': 'Insulin', 'generic_name': 'insulin', 'drug_class': 'Insulin', 'caretend_code': 'INS000'},
+]
+
+
+class TestDrugDictionary:
+    """Test cases for the drug-name trie"""
+    
+    def test_scan_matches_brand_and_generic_names(self):
+        """Test generic names report the row's name and codes"""
+        hits = DrugDictionary(ROWS).scan("Continue ATORVASTATIN nightly and lisinopril.")
+        
+        assert [(hit['name'], hit['matched'], hit['caretend_code']) for hit in hits] == [
+            ('Lipitor', 'ATORVASTATIN', 'STA001'),
+            ('Lisinopril', 'lisinopril', 'ACE001'),
+        ]
+    
+    def test_scan_prefers_longest_name(self):
+        """Test multi-word names win over their prefixes"""
+        hits = DrugDictionary(ROWS).scan("Insulin glargine 10 units, insulin lispro sliding scale")
+        
+        assert [hit['name'] for hit in hits] == ['Insulin Glargine', 'Insulin']
+        assert hits[0]['start'] == 0 and hits[0]['end'] == len('Insulin glargine')
+    
+    def test_reloads_when_fingerprint_changes(self):
+        """Test the trie is rebuilt only when the table fingerprint moves"""
+        rows = list(ROWS[:1])
+        version = [1]
+        loads = []
+        
+        def load_rows():
+            loads.append(1)
+            return rows
+        
+        dictionary = ReloadingDrugDictionary(load_rows, fingerprint=lambda: version[0], refresh_interval=0)
+        assert dictionary.lookup('lipitor') is None
+        
+        dictionary.current()
+        assert len(loads) == 1
+        
+        rows.append(ROWS[1])
+        version[0] = 2
+        assert dictionary.lookup('Lipitor')['caretend_code'] == 'STA001'
+        assert len(loads) == 2
+    
+    def test_version_follows_dictionary_content(self):
+        """Test the version digest changes with the rows and not with rebuilds"""
+        rows = [dict(row) for row in ROWS]
+        dictionary = ReloadingDrugDictionary(lambda: rows, refresh_interval=0)
+        first = dictionary.version
+        
+        assert DrugDictionary(ROWS).version == first
+        rows[0]['caretend_code'] = 'NEW001'
+        assert dictionary.version != first
+    
+    def test_match_resolves_ocr_near_misses(self):
+        """Test misspelled names map to the canonical drug with a score"""
+        dictionary = DrugDictionary(ROWS)
+        
+        assert dictionary.match('Lisinoprll')['name'] == 'Lisinopril'
+        assert dictionary.match('Lisinoprll')['match_score'] == 0.9
+        assert dictionary.match('1isinopril')['match_score'] == 0.9
+        assert dictionary.match('lnsulin glargne')['caretend_code'] == 'INS001'
+        assert dictionary.match('LISINOPRIL')['match_score'] == 1.0
+        assert dictionary.match('Lorazepam') is None
+    
+    def test_bounded_levenshtein(self):
+        """Test the distance gives up past the bound"""
+        assert bounded_levenshtein('metformin', 'metformin', 2) == 0
+        assert bounded_levenshtein('metfornim', 'metformin', 2) == 2
+        assert bounded_levenshtein('metoprolol', 'metformin', 2) is None
+
+
+class TestScannerWithDictionary:
+    """Test cases for dictionary-backed medication extraction"""
+    
+    def test_annotates_and_adds_known_drugs(self):
+        """Test pattern hits gain codes and dictionary-only drugs are added"""
+        scanner = MedicationScanner(dictionary=DrugDictionary(ROWS))
+        
+        medications = scanner.extract("1. Lisinopril 10mg - Take 1 tablet daily\nLipitor at bedtime")
+        
+        assert [med['name'] for med in medications] == ['Lisinopril', 'Lipitor']
+        assert medications[0]['caretend_code'] == 'ACE001'
+        assert medications[0]['source'] == 'text_extraction'
+        assert 'dictionary' in medications[0]['sources']
+        assert medications[1]['drug_class'] == 'Statin'
+        assert medications[1]['dosage'] == '10 mg'
+        assert medications[1]['sources'] == ['dictionary']
+    
+    def test_canonicalizes_ocr_names(self):
+        """Test OCR misspellings become the dictionary drug with a match score"""
+        scanner = MedicationScanner(dictionary=DrugDictionary(ROWS))
+        
+        medications = scanner.extract("Lisinoprll 10mg daily\nAtorvastatin 4O mg at bedtime")
+        
+        assert medications[0]['name'] == 'Lisinopril'
+        assert medications[0]['match_score'] == 0.9
+        assert medications[0]['matched_text'] == 'Lisinoprll'
+        assert medications[0]['caretend_code'] == 'ACE001'
+        lipitor = next(med for med in medications if med['name'] == 'Lipitor')
+        assert lipitor['match_score'] == 1.0
+        assert 'matched_text' not in lipitor
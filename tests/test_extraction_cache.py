@@ -0,0 +1,73 @@
+import os
+import pytest
+from services.extraction_cache import ExtractionCache, make_cache_key
+
+
+class TestCacheKey:
+    """Test cases for content-addressed cache keys"""
+    
+    def test_same_bytes_same_key(self):
+        """Test identical content and method produce the same key"""
+        assert make_cache_key(b'%PDF-1', 'auto', '1') == make_cache_key(b'%PDF-1', 'auto', '1')
+    
+    def test_method_and_version_change_key(self):
+        """Test method and extractor version are part of the key"""
+        key = make_cache_key(b'%PDF-1', 'auto', '1')
+        
+        assert key != make_cache_key(b'%PDF-1', 'ocr', '1')
+        assert key != make_cache_key(b'%PDF-1', 'auto', '2')
+    
+    def test_dictionary_version_changes_key(self):
+        """Test results from a reloaded drug dictionary get their own key"""
+        key = make_cache_key(b'%PDF-1', 'auto', '1', 'a1b2')
+        
+        assert key != make_cache_key(b'%PDF-1', 'auto', '1', 'c3d4')
+        assert key != make_cache_key(b'%PDF-1', 'auto', '1')
+
+
+class TestExtractionCache:
+    """Test cases for the two-tier extraction cache"""
+    
+    def test_miss_then_hit(self):
+        """Test hit/miss counters"""
+        cache = ExtractionCache(max_entries=4)
+        
+        assert cache.get('a') is None
+        cache.put('a', {'success': True})
+        assert cache.get('a') == {'success': True}
+        
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+    
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted first"""
+        cache = ExtractionCache(max_entries=2)
+        cache.put('a', {'v': 1})
+        cache.put('b', {'v': 2})
+        cache.get('a')
+        cache.put('c', {'v': 3})
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == {'v': 1}
+        assert cache.stats()['evictions'] == 1
+    
+    def test_disk_tier_survives_memory_clear(self, tmp_path):
+        """Test entries are reloaded from the disk tier"""
+        cache = ExtractionCache(max_entries=2, disk_dir=str(tmp_path))
+        cache.put('a', {'v': 1})
+        cache.clear()
+        
+        assert cache.get('a') == {'v': 1}
+        assert cache.stats()['disk_hits'] == 1
+    
+    def test_disk_size_eviction(self, tmp_path):
+        """Test disk tier stays under its byte budget"""
+        cache = ExtractionCache(max_entries=1, disk_dir=str(tmp_path), disk_max_bytes=150)
+        for i in range(5):
+            cache.put(f'k{i}', {'text': 'x' * 50})
+        
+        total = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+        assert total <= 150
+        assert cache.stats()['disk_evictions'] > 0
@@ -0,0 +1,83 @@
+import time
+import pytest
+from services.extraction_planner import ExtractionPlanner
+from services.document_processor import DocumentProcessor
+from services.extraction_cache import ExtractionCache
+
+ALL_METHODS = ['pdfplumber', 'pypdf2', 'ocr']
+
+
+def features(chars_per_page, image_coverage=0.0, fonts=2, table_hints=False, pages=10):
+    return {'pages': pages, 'sampled': 5, 'chars_per_page': chars_per_page, 'fonts': fonts,
+            'image_coverage': image_coverage, 'table_hints': table_hints}
+
+
+class TestExtractionPlanner:
+    """Test cases for the cost-based method planner"""
+    
+    def test_dense_text_uses_cheapest_text_method(self):
+        """Test typed documents skip pdfplumber unless tables are likely"""
+        planner = ExtractionPlanner()
+        
+        plain = planner.plan(b'', ALL_METHODS, features(1500))
+        tabular = planner.plan(b'', ALL_METHODS, features(1500, table_hints=True))
+        
+        assert (plain['strategy'], plain['methods']) == ('single', ['pypdf2'])
+        assert tabular['methods'] == ['pdfplumber']
+    
+    def test_scanned_document_goes_straight_to_ocr(self):
+        """Test an image-only document plans OCR and reports the passes it avoids"""
+        plan = ExtractionPlanner().plan(b'', ALL_METHODS, features(0, image_coverage=0.98, fonts=0))
+        
+        assert (plan['strategy'], plan['methods']) == ('single', ['ocr'])
+        assert plan['estimated_time_saved_seconds'] == pytest.approx(plan['legacy_estimated_seconds']
+                                                                     - plan['estimated_seconds'])
+        assert plan['estimated_time_saved_seconds'] > 0
+    
+    def test_sparse_text_races_text_against_ocr(self):
+        """Test a stray text layer on a scan races instead of trusting either method"""
+        plan = ExtractionPlanner().plan(b'', ALL_METHODS, features(12, image_coverage=0.9))
+        
+        assert (plan['strategy'], plan['methods']) == ('race', ['pypdf2', 'ocr'])
+    
+    def test_failed_profile_tries_methods_in_order(self):
+        """Test documents that cannot be profiled fall back to the usual sequence"""
+        plan = ExtractionPlanner().plan(b'', ALL_METHODS, dict(features(0), error='bad xref'))
+        
+        assert (plan['strategy'], plan['methods']) == ('sequential', ALL_METHODS)
+
+
+class TestMethodRace:
+    """Test cases for racing a text method against OCR"""
+    
+    def test_dense_text_cancels_ocr(self, monkeypatch):
+        """Test OCR is cancelled once the text layer proves dense enough"""
+        processor = DocumentProcessor(cache=ExtractionCache())
+        
+        def fake_run(extract_method, file_data, cancel=None, deadline=None):
+            if extract_method == 'pypdf2':
+                return {'success': True, 'total_chars': 4000, 'metadata': {'num_pages': 2}}
+            deadline = time.monotonic() + 5
+            while not cancel.is_set() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return {'success': False, 'cancelled': cancel.is_set(), 'error': 'OCR cancelled'}
+        
+        monkeypatch.setattr(processor, '_run_method', fake_run)
+        attempts = []
+        
+        result, method = processor._race_methods(b'', ['pypdf2', 'ocr'], attempts)
+        
+        assert method == 'pypdf2'
+        assert result['total_chars'] == 4000
+        assert attempts[1] == {'method': 'ocr', 'success': False, 'error': 'OCR cancelled', 'cancelled': True}
+    
+    def test_sparse_text_waits_for_ocr(self, monkeypatch):
+        """Test OCR wins when the text layer is only a stray header"""
+        processor = DocumentProcessor(cache=ExtractionCache())
+        results = {'pypdf2': {'success': True, 'total_chars': 8, 'metadata': {'num_pages': 2}},
+                   'ocr': {'success': True, 'total_chars': 3100}}
+        monkeypatch.setattr(processor, '_run_method', lambda m, data, cancel=None, deadline=None: results[m])
+        
+        result, method = processor._race_methods(b'', ['pypdf2', 'ocr'], [])
+        
+        assert method == 'ocr'
@@ -0,0 +1,127 @@
+import datetime
+from services.history_partitions import (HistoryPartitions, partition_name, partition_bounds,
+                                         add_months)
+
+
+class RecordingCursor:
+    """Cursor stand-in that records statements and answers the catalog lookups"""
+    
+    def __init__(self, relkind=None, months=(), default_rows=False):
+        self.relkind = relkind
+        self.months = list(months)
+        self.default_rows = default_rows
+        self.statements = []
+        self._result = []
+    
+    def execute(self, sql, params=None):
+        self.statements.append(' '.join(sql.split()))
+        if 'FROM pg_class' in sql:
+            self._result = [(self.relkind,)] if self.relkind else []
+        elif 'IS NOT NULL' in sql:
+            self._result = [(False,)]
+        elif 'SELECT EXISTS' in sql:
+            self._result = [(self.default_rows,)]
+        elif 'date_trunc' in sql:
+            self._result = [(month,) for month in self.months]
+        else:
+            self._result = []
+    
+    def fetchone(self):
+        return self._result[0] if self._result else None
+    
+    def fetchall(self):
+        return self._result
+    
+    def partitions(self):
+        return [s.split()[5] for s in self.statements if 'PARTITION OF' in s]
+    
+    def sql(self):
+        return '\n'.join(self.statements)
+
+
+class TestHistoryPartitions:
+    """Test cases for the monthly processing_history partitions"""
+    
+    def test_month_bounds_and_names(self):
+        """Test partitions cover whole months, across year ends"""
+        assert partition_bounds(datetime.datetime(2026, 12, 31, 23, 59)) == \
+            (datetime.date(2026, 12, 1), datetime.date(2027, 1, 1))
+        assert add_months(datetime.date(2026, 11, 1), 3) == datetime.date(2027, 2, 1)
+        assert partition_name(datetime.date(2027, 2, 1)) == 'processing_history_y2027m02'
+    
+    def test_ensure_creates_missing_months_once(self):
+        """Test inserts create their month and the months ahead only the first time"""
+        partitions = HistoryPartitions(ahead=1)
+        partitions.partitioned = True
+        cursor = RecordingCursor()
+        
+        created = partitions.ensure(cursor, [datetime.datetime(2026, 10, 18), datetime.datetime(2026, 10, 2)])
+        assert created == [datetime.date(2026, 10, 1), datetime.date(2026, 11, 1)]
+        assert cursor.partitions() == ['processing_history_y2026m10', 'processing_history_y2026m11']
+        
+        cursor.statements = []
+        assert partitions.ensure(cursor, [datetime.datetime(2026, 11, 30)]) == [datetime.date(2026, 12, 1)]
+        assert partitions.ensure(cursor, [datetime.datetime(2026, 10, 20)]) == []
+        assert cursor.statements[0] == 'BEGIN' and cursor.statements[-1] == 'COMMIT'
+    
+    def test_ensure_moves_rows_out_of_default_partition(self):
+        """Test a month the default partition already holds rows for is split out of it"""
+        partitions = HistoryPartitions(ahead=0)
+        partitions.partitioned = True
+        cursor = RecordingCursor(default_rows=True)
+        
+        partitions.ensure(cursor, [datetime.datetime(2026, 11, 1)])
+        
+        sql = cursor.sql()
+        assert sql.index('DETACH PARTITION processing_history_default') < \
+            sql.index('PARTITION OF processing_history FOR VALUES FROM (\'2026-11-01\') TO (\'2026-12-01\')') < \
+            sql.index('INSERT INTO processing_history_y2026m11') < \
+            sql.index('DELETE FROM processing_history_default') < \
+            sql.index('ATTACH PARTITION processing_history_default DEFAULT')
+    
+    def test_migrate_creates_partitioned_table_and_indexes(self):
+        """Test a new database gets the partitioned table, its indexes and partitions"""
+        partitions = HistoryPartitions(ahead=0)
+        cursor = RecordingCursor()
+        
+        partitions.migrate(cursor, now=datetime.datetime(2026, 10, 18))
+        
+        sql = cursor.sql()
+        assert 'PRIMARY KEY (id, created_at) ) PARTITION BY RANGE (created_at)' in sql
+        assert 'ON processing_history (session_id, created_at DESC)' in sql
+        assert 'ON processing_history (created_at DESC)' in sql
+        assert 'ON processing_history (job_id) WHERE job_id IS NOT NULL' in sql
+        assert cursor.partitions() == ['processing_history_default', 'processing_history_y2026m10']
+        assert partitions.partitioned
+    
+    def test_migrate_leaves_unpartitioned_table_for_explicit_conversion(self):
+        """Test startup does not convert a legacy table, and ensure() leaves it alone"""
+        partitions = HistoryPartitions(ahead=0)
+        cursor = RecordingCursor(relkind='r')
+        
+        partitions.migrate(cursor, now=datetime.datetime(2026, 10, 18))
+        
+        assert 'RENAME' not in cursor.sql() and cursor.partitions() == []
+        assert 'ADD COLUMN IF NOT EXISTS text_blob' in cursor.sql()
+        assert 'CREATE INDEX IF NOT EXISTS processing_history_job_idx ON processing_history (job_id)' in cursor.sql()
+        assert not partitions.partitioned
+        assert partitions.ensure(cursor, [datetime.datetime(2026, 10, 18)]) == []
+    
+    def test_convert_moves_unpartitioned_table(self):
+        """Test the explicit conversion copies rows into partitions for each month they cover"""
+        partitions = HistoryPartitions(ahead=0)
+        cursor = RecordingCursor(relkind='r', months=[datetime.date(2025, 3, 1), datetime.date(2026, 10, 1)])
+        
+        assert partitions.convert(cursor, now=datetime.datetime(2026, 10, 18))
+        
+        sql = cursor.sql()
+        assert 'ALTER TABLE processing_history RENAME TO processing_history_legacy' in sql
+        assert 'INSERT INTO processing_history (id, job_id' in sql
+        assert sql.index('DROP INDEX IF EXISTS processing_history_job_idx') < \
+            sql.index('CREATE INDEX IF NOT EXISTS processing_history_job_idx')
+        assert 'DROP TABLE processing_history_legacy' in sql
+        assert set(cursor.partitions()) == {'processing_history_y2025m03', 'processing_history_y2026m10',
+                                            'processing_history_default'}
+        assert cursor.statements[-1] == 'COMMIT'
+        assert partitions.partitioned
+        assert not partitions.convert(RecordingCursor(relkind='p'))
@@ -0,0 +1,82 @@
+import threading
+import time
+from services.history_writer import HistoryWriter
+
+
+class RecordingSink:
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+    
+    def __call__(self, rows):
+        if self.fail_on and self.fail_on in rows[0]:
+            raise RuntimeError('column does not exist')
+        self.batches.append(list(rows))
+
+
+class TestHistoryWriter:
+    """Test cases for the write-behind processing_history buffer"""
+    
+    def test_batches_rows_by_size(self):
+        """Test rows are written in batches of batch_size, in order"""
+        sink = RecordingSink()
+        writer = HistoryWriter(sink, batch_size=3, flush_interval=60)
+        
+        for n in range(7):
+            writer.log({'status': n})
+        writer.flush(timeout=5)
+        
+        assert [[row['status'] for row in batch] for batch in sink.batches] == [[0, 1, 2], [3, 4, 5], [6]]
+        assert writer.stats()['written'] == 7
+        writer.close()
+    
+    def test_flushes_after_interval(self):
+        """Test a partial batch is written once its oldest row has waited flush_interval"""
+        sink = RecordingSink()
+        writer = HistoryWriter(sink, batch_size=100, flush_interval=0.05)
+        
+        writer.log({'status': 'success'})
+        deadline = time.monotonic() + 5
+        while not sink.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        assert sink.batches == [[{'status': 'success'}]]
+        writer.close()
+    
+    def test_groups_rows_by_columns(self):
+        """Test rows with different columns go to separate batches and a failing group is isolated"""
+        sink = RecordingSink(fail_on='result_data')
+        writer = HistoryWriter(sink, batch_size=10, flush_interval=60)
+        
+        writer.log({'status': 'a', 'extracted_text': 'x'})
+        writer.log({'status': 'b', 'result_data': '{}'})
+        writer.log({'status': 'c', 'extracted_text': 'y'})
+        writer.close()
+        
+        assert [[row['status'] for row in batch] for batch in sink.batches] == [['a', 'c']]
+        assert (writer.stats()['written'], writer.stats()['failed']) == (2, 1)
+    
+    def test_full_buffer_drops_rows(self):
+        """Test the drop policy refuses rows instead of blocking the request"""
+        release = threading.Event()
+        writer = HistoryWriter(lambda rows: release.wait(5), batch_size=1, flush_interval=60,
+                               max_queue=1, policy='drop')
+        
+        results = [writer.log({'status': n}) for n in range(5)]
+        release.set()
+        
+        assert results[0] is True
+        assert results.count(False) >= 1
+        assert writer.stats()['dropped'] == results.count(False)
+        writer.close()
+    
+    def test_close_flushes_and_refuses_new_rows(self):
+        """Test the shutdown hook writes pending rows and later rows are dropped"""
+        sink = RecordingSink()
+        writer = HistoryWriter(sink, batch_size=100, flush_interval=60)
+        writer.log({'status': 'pending'})
+        
+        writer.close()
+        
+        assert sink.batches == [[{'status': 'pending'}]]
+        assert writer.log({'status': 'late'}) is False
@@ -0,0 +1,77 @@
+import time
+import pytest
+from services.job_queue import JobQueue, JobBackend, InMemoryJobBackend, QueueFullError, DONE, FAILED
+
+
+def _wait_for(job_queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobQueue:
+    """Test cases for the background job queue"""
+    
+    def test_job_reports_progress_and_result(self):
+        """Test a job runs in the background and exposes its result"""
+        def handler(payload, report_progress):
+            for page in range(1, 4):
+                report_progress(page, 3)
+            return {'pages_processed': 3, 'name': payload['filename']}
+        
+        finished = []
+        job_queue = JobQueue(handler, workers=1, on_finish=finished.append)
+        job_queue.start()
+        try:
+            job = job_queue.submit({'filename': 'a.pdf', 'file_content': b'%PDF'}, owner='s1')
+            assert job['status'] == 'queued'
+            assert 'payload' not in job
+            
+            job = _wait_for(job_queue, job['id'])
+            assert job['status'] == DONE
+            assert job['pages_done'] == 3
+            assert job['progress'] == 1.0
+            assert job['result'] == {'pages_processed': 3, 'name': 'a.pdf'}
+            assert finished[0]['id'] == job['id']
+        finally:
+            job_queue.stop()
+    
+    def test_failed_job_records_error(self):
+        """Test handler exceptions mark the job failed"""
+        def handler(payload, report_progress):
+            raise ValueError('corrupt PDF')
+        
+        job_queue = JobQueue(handler, workers=1)
+        job_queue.start()
+        try:
+            job = _wait_for(job_queue, job_queue.submit({'filename': 'b.pdf'})['id'])
+            assert job['status'] == FAILED
+            assert job['error'] == 'corrupt PDF'
+        finally:
+            job_queue.stop()
+    
+    def test_bounded_queue_rejects_when_full(self):
+        """Test submissions beyond the pending limit are rejected"""
+        job_queue = JobQueue(lambda payload, report_progress: {},
+                             backend=InMemoryJobBackend(max_pending=1))
+        job_queue.submit({'filename': 'a.pdf'})
+        
+        with pytest.raises(QueueFullError):
+            job_queue.submit({'filename': 'b.pdf'})
+    
+    def test_unknown_job(self):
+        """Test polling an unknown job id"""
+        assert JobQueue(lambda payload, report_progress: {}).get('missing') is None
+    
+    def test_incomplete_backend_fails_on_construction(self):
+        """Test a backend missing part of the interface cannot be instantiated"""
+        class EnqueueOnlyBackend(JobBackend):
+            def enqueue(self, job_id):
+                pass
+        
+        with pytest.raises(TypeError):
+            EnqueueOnlyBackend()
@@ -0,0 +1,118 @@
+import pytest
+from services.medication_scanner import MedicationIndex, MedicationScanner, extract_medications
+
+
+class TestMedicationScanner:
+    """Test cases for the compiled medication scanner"""
+    
+    def test_numbered_medication_list(self):
+        """Test a typical numbered prescription list"""
+        text = ("MEDICATIONS:\n1. Lisinopril 10mg - Take 1 tablet daily\n"
+                "2. Metformin 500mg - Take 2 tablets twice daily\n"
+                "3. Atorvastatin 20mg - Take 1 tablet at bedtime")
+        
+        medications = extract_medications(text)
+        
+        assert [med['name'] for med in medications] == ['Lisinopril', 'Metformin', 'Atorvastatin']
+        assert medications[0] == {
+            'name': 'Lisinopril',
+            'dosage': '10 mg',
+            'strength': '10',
+            'unit': 'mg',
+            'source': 'text_extraction',
+            'sources': ['text_extraction', 'pattern_recognition']
+        }
+    
+    def test_units_and_decimal_doses(self):
+        """Test non-mg units and decimal strengths"""
+        medications = extract_medications(
+            "Aspirin 81 mg daily; Insulin glargine 10 units at bedtime; Levothyroxine (0.5 mcg)")
+        
+        assert medications[0]['dosage'] == '81 mg'
+        assert medications[1] == {
+            'name': 'Insulin Glargine',
+            'dosage': '10 units',
+            'strength': '10',
+            'unit': 'units',
+            'source': 'text_extraction',
+            'sources': ['text_extraction']
+        }
+        assert medications[2]['dosage'] == '0.5 mcg'
+    
+    def test_drug_endings_without_dose(self):
+        """Test suffix recognition keeps pattern priority and finds nearby doses"""
+        medications = extract_medications(
+            "Atenolol, valsartan 160mg; no dose for enalapril here. Carvedilol 6.25 mg bid")
+        
+        assert [(med['name'], med['dosage'], med['source']) for med in medications] == [
+            ('Valsartan', '160 mg', 'text_extraction'),
+            ('Carvedilol', '6.25 mg', 'text_extraction'),
+            ('Enalapril', '160 mg', 'pattern_recognition'),
+            ('Atenolol', '160 mg', 'pattern_recognition'),
+        ]
+    
+    def test_text_without_doses(self):
+        """Test prose with no dosages yields only suffix hits"""
+        medications = MedicationScanner().extract("Patient reports taking simvastatin in the past.")
+        
+        assert medications == [{
+            'name': 'Simvastatin',
+            'dosage': 'Dosage not specified',
+            'strength': '',
+            'unit': '',
+            'source': 'pattern_recognition',
+            'sources': ['pattern_recognition']
+        }]
+
+
+    def test_page_numbers_from_offsets(self):
+        """Test hits carry the pages they were found on despite whitespace normalization"""
+        text = "Lisinopril   10 mg.\n\n\n\nNotes:\t\t\nMetformin 500 mg.\n    Lisinopril 10 mg."
+        second = text.index('Metformin')
+        
+        medications = extract_medications(text, lambda offset: 1 if offset < second else 2)
+        
+        assert [(med['name'], med['page'], med['pages']) for med in medications] == [
+            ('Lisinopril', 1, [1, 2]), ('Metformin', 2, [2])]
+    
+    def test_no_page_fields_without_locator(self):
+        """Test records are unchanged when no page lookup is given"""
+        medications = extract_medications("Lisinopril 10 mg")
+        
+        assert 'page' not in medications[0] and 'pages' not in medications[0]
+
+
+class TestMedicationIndex:
+    """Test cases for normalized-name medication de-duplication"""
+    
+    def test_merges_sources_and_fills_dosage(self):
+        """Test a table row and a text hit for the same drug become one record"""
+        index = MedicationIndex([{'name': 'Metformin ', 'dosage': '', 'source': 'table_extraction'}])
+        
+        added = index.extend([
+            {'name': 'METFORMIN', 'dosage': '500 mg', 'strength': '500', 'unit': 'mg',
+             'source': 'text_extraction'},
+            {'name': 'Lisinopril', 'dosage': '10 mg', 'source': 'text_extraction'}
+        ])
+        
+        assert [med['name'] for med in added] == ['Lisinopril']
+        assert len(index) == 2
+        assert 'metformin' in index
+        metformin = index.medications()[0]
+        assert metformin['name'] == 'Metformin '
+        assert metformin['dosage'] == '500 mg'
+        assert metformin['source'] == 'table_extraction'
+        assert metformin['sources'] == ['table_extraction', 'text_extraction']
+    
+    def test_keeps_known_dosage(self):
+        """Test a later source does not overwrite a dosage already found"""
+        index = MedicationIndex([{'name': 'Atenolol', 'dosage': '25 mg', 'source': 'table_extraction'}])
+        index.add({'name': 'atenolol', 'dosage': '50 mg', 'source': 'text_extraction'})
+        index.add({'name': 'Atenolol', 'dosage': '50 mg', 'source': 'text_extraction'})
+        
+        assert index.medications() == [{
+            'name': 'Atenolol',
+            'dosage': '25 mg',
+            'source': 'table_extraction',
+            'sources': ['table_extraction', 'text_extraction']
+        }]
@@ -0,0 +1,114 @@
+import pytest
+from services import ocr_pool
+from services.extraction_cache import ExtractionCache
+from services.ocr_pool import OcrWorkerPool, OcrWorkerError, OcrTimeoutError, tsv_to_data
+
+
+class FakeImage:
+    """Minimal image exposing what the pool sends to workers"""
+    
+    mode = 'L'
+    size = (2, 2)
+    
+    def __init__(self, pixels=b'\0' * 4):
+        self.pixels = pixels
+    
+    def tobytes(self):
+        return self.pixels
+
+
+class CountingPool:
+    """Stand-in pool that records how often OCR actually runs"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def image_to_string(self, image, config='', timeout=None):
+        self.calls += 1
+        return f"page {image.tobytes().hex()}"
+
+
+class TestOcrPool:
+    """Test cases for the persistent OCR worker pool"""
+    
+    def test_tsv_to_data(self):
+        """Test Tesseract TSV is parsed into image_to_data's DICT layout"""
+        tsv = ('level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n'
+               '4\t1\t1\t1\t1\t0\t10\t5\t90\t12\t-1\t\n'
+               '5\t1\t1\t1\t1\t1\t10\t5\t60\t12\t96.5\tLisinopril\n')
+        
+        data = tsv_to_data(tsv)
+        
+        assert data['text'] == ['', 'Lisinopril']
+        assert data['conf'] == ['-1', '96.5']
+        assert data['left'] == [10, 10]
+        assert data['word_num'] == [0, 1]
+    
+    def test_replaces_crashed_worker(self):
+        """Test a dead worker raises for its page and is replaced for the next"""
+        pool = OcrWorkerPool(workers=1, timeout=10)
+        try:
+            pool.start()
+            crashed = pool._all[0]
+            crashed.process.kill()
+            crashed.process.join()
+            
+            with pytest.raises(OcrWorkerError):
+                pool.image_to_string(FakeImage())
+            
+            assert pool.stats()['restarts'] == 1
+            assert pool._all[0] is not crashed
+            assert pool._all[0].process.is_alive()
+        finally:
+            pool.stop()
+    
+    def test_waiting_for_a_worker_times_out(self):
+        """Test a page queued behind busy workers gives up at its timeout"""
+        pool = OcrWorkerPool(workers=1, timeout=10)
+        pool._all = [object()]  # Started, with its only worker checked out
+        
+        with pytest.raises(OcrTimeoutError):
+            pool.image_to_string(FakeImage(), timeout=0.05)
+        
+        assert pool.stats()['queue_timeouts'] == 1
+
+
+class TestOcrPageCache:
+    """Test cases for the raster-keyed OCR cache"""
+    
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        pool = CountingPool()
+        monkeypatch.setattr(ocr_pool, 'get_ocr_pool', lambda: pool)
+        monkeypatch.setattr(ocr_pool, '_ocr_cache', ExtractionCache(max_entries=2))
+        monkeypatch.setattr(ocr_pool, 'OCR_CACHE_SIZE', 2)
+        return pool
+    
+    def test_repeated_page_skips_ocr(self, pool):
+        """Test an identical raster is served from the cache"""
+        cover = FakeImage(b'\1\2\3\4')
+        
+        first = ocr_pool.image_to_string(cover, config='--psm 6')
+        second = ocr_pool.image_to_string(FakeImage(b'\1\2\3\4'), config='--psm 6')
+        
+        assert first == second == 'page 01020304'
+        assert pool.calls == 1
+        assert ocr_pool.get_ocr_cache().stats()['hits'] == 1
+    
+    def test_key_covers_pixels_and_config(self, pool):
+        """Test different pixels or OCR settings are not confused"""
+        ocr_pool.image_to_string(FakeImage(b'\1\2\3\4'))
+        ocr_pool.image_to_string(FakeImage(b'\1\2\3\5'))
+        ocr_pool.image_to_string(FakeImage(b'\1\2\3\4'), config='--psm 6')
+        
+        assert pool.calls == 3
+    
+    def test_bounded_with_eviction(self, pool):
+        """Test the oldest page is evicted once the cache is full"""
+        for pixels in (b'\1' * 4, b'\2' * 4, b'\3' * 4, b'\1' * 4):
+            ocr_pool.image_to_string(FakeImage(pixels))
+        
+        stats = ocr_pool.get_ocr_cache().stats()
+        assert pool.calls == 4
+        assert stats['evictions'] == 2
+        assert stats['memory_entries'] == 2
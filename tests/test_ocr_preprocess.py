@@ -0,0 +1,67 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from services import ocr_preprocess
+
+
+def make_page(skew_degrees=0.0, height=600, width=500):
+    """Light-gray page with dark text-like lines, optionally rising to the right"""
+    page = np.full((height, width), 235, dtype=np.uint8)
+    xs = np.arange(40, width - 40)
+    for top in range(80, height - 80, 30):
+        ys = (top - xs * np.tan(np.radians(skew_degrees))).astype(int)
+        for thickness in range(3):
+            page[ys + thickness, xs] = 30
+    return page
+
+
+class TestOcrPreprocess:
+    """Test cases for the NumPy OCR preprocessing stage"""
+    
+    def test_grayscale_from_rgb(self):
+        """Test luma conversion of an RGB array"""
+        pixels = np.array([[[255, 0, 0], [255, 255, 255]]], dtype=np.uint8)
+        
+        assert ocr_preprocess.to_grayscale(pixels).tolist() == [[76, 255]]
+    
+    def test_threshold_marks_text_not_background(self):
+        """Test adaptive thresholding separates strokes from paper"""
+        page = make_page()
+        
+        ink = ocr_preprocess.adaptive_threshold(page)
+        
+        assert ink[80:83, 100].all()
+        assert not ink[60, 100]
+        assert not ink[:40].any()
+    
+    def test_despeckle_removes_isolated_pixels(self):
+        """Test lone noise pixels are dropped while strokes survive"""
+        ink = np.zeros((20, 20), dtype=bool)
+        ink[5, 5] = True
+        ink[10:13, 2:18] = True
+        
+        cleaned = ocr_preprocess.despeckle(ink)
+        
+        assert not cleaned[5, 5]
+        assert cleaned[10:13, 2:18].all()
+    
+    def test_estimates_skew(self):
+        """Test the projection profile recovers the text angle"""
+        ink = ocr_preprocess.adaptive_threshold(make_page(skew_degrees=2.0))
+        
+        assert ocr_preprocess.estimate_skew(ink) == pytest.approx(2.0, abs=0.25)
+        assert ocr_preprocess.estimate_skew(ocr_preprocess.adaptive_threshold(make_page())) == 0.0
+    
+    def test_pipeline_trims_borders_and_crops(self):
+        """Test a fax-style black border and blank margins are removed"""
+        page = make_page()
+        page[:, :12] = 0
+        
+        binary, info = ocr_preprocess.preprocess_array(np.stack([page] * 3, axis=-1))
+        
+        assert binary.dtype == np.uint8
+        assert set(np.unique(binary)) == {0, 255}
+        assert info['size'][0] < page.shape[1] - 12
+        assert info['skew'] == 0.0
+        assert (binary[:, :5] == 255).all()
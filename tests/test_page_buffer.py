@@ -0,0 +1,38 @@
+from services.page_buffer import PageBuffer
+
+
+class TestPageBuffer:
+    """Test cases for per-page text assembly"""
+    
+    def test_joins_pages_with_markers(self):
+        """Test the joined text matches page-by-page concatenation"""
+        text = PageBuffer()
+        for page, page_text in ((1, 'first'), (2, ''), (3, 'third')):
+            text.add_page(page, page_text, f"\n--- Page {page} ---\n", "\n")
+        
+        assert text.text() == "\n--- Page 1 ---\nfirst\n\n--- Page 2 ---\n\n\n--- Page 3 ---\nthird\n"
+        assert len(text) == len(text.text())
+    
+    def test_offsets_map_to_pages(self):
+        """Test page spans and offset lookups, including marker characters"""
+        text = PageBuffer()
+        text.add_page(1, 'alpha', "\n--- Page 1 ---\n", "\n")
+        start = text.add_page(2, 'beta', "\n--- Page 2 ---\n", "\n")
+        joined = text.text()
+        
+        assert joined[start:start + 4] == 'beta'
+        assert text.pages()[1] == {'page': 2, 'start': start, 'end': start + 4}
+        assert text.page_at(joined.index('alpha')) == 1
+        assert text.page_at(joined.index('Page 2')) == 2
+        assert text.page_at(len(joined)) is None
+    
+    def test_add_after_text_rejoins(self):
+        """Test pages added after text() are included in the next join"""
+        text = PageBuffer()
+        text.add_page(1, 'one')
+        assert text.text() == 'one'
+        
+        text.add_page(2, 'two', ' ')
+        
+        assert text.text() == 'one two'
+        assert text.page_at(4) == 2
@@ -0,0 +1,318 @@
+import pytest
+import pdf_processing
+from pdf_processing import PDFProcessor, ParsedDocument, _shard_pages
+from services.deadline import Deadline
+from services.ocr_pool import OcrTimeoutError
+
+
+def _fake_page_range(file_content, method, start, end, expires_at=None):
+    """Stand-in extractor so page routing can be tested without PDF libraries"""
+    return [{'page': n + 1, 'text': f'text {n + 1}', 'tables': []} for n in range(start, end)]
+
+
+class TestPageSharding:
+    """Test cases for page-range sharding"""
+    
+    def test_shards_cover_all_pages_in_order(self):
+        """Test shards are contiguous and cover every page once"""
+        shards = _shard_pages(10, 4)
+        
+        assert shards[0][0] == 0
+        assert shards[-1][1] == 10
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            assert end == start
+    
+    def test_more_shards_than_pages(self):
+        """Test shard count is capped by page count"""
+        assert _shard_pages(2, 8) == [(0, 1), (1, 2)]
+    
+    def test_empty_document(self):
+        """Test empty document produces no shards"""
+        assert _shard_pages(0, 4) == []
+
+
+class TestPageParallelExtraction:
+    """Test cases for page-parallel extraction"""
+    
+    @pytest.fixture(autouse=True)
+    def fake_extractor(self, monkeypatch):
+        monkeypatch.setattr(ParsedDocument, 'count_pages', lambda self, method: 9)
+        monkeypatch.setattr(ParsedDocument, 'extract_pages',
+                            lambda self, method, start, end, deadline=None: _fake_page_range(self.file_content, method, start, end))
+        monkeypatch.setattr(pdf_processing, '_extract_page_range', _fake_page_range)
+    
+    def test_sequential_extraction(self):
+        """Test single worker extracts every page in order"""
+        processor = PDFProcessor(workers=1)
+        pages = processor._extract_pages(ParsedDocument(b'%PDF'), 'pypdf2')
+        
+        assert [page['page'] for page in pages] == list(range(1, 10))
+    
+    def test_parallel_extraction_preserves_page_order(self):
+        """Test pages merged from pool workers come back in page order"""
+        processor = PDFProcessor(workers=3, parallel_min_pages=2)
+        pages = processor._extract_pages(ParsedDocument(b'%PDF'), 'pypdf2')
+        
+        assert [page['page'] for page in pages] == list(range(1, 10))
+        assert pages[4]['text'] == 'text 5'
+
+
+class _FakePage:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+    
+    def extract_text(self):
+        self.calls += 1
+        return self.text
+
+
+class _FakeReader:
+    def __init__(self, texts):
+        self.pages = [_FakePage(text) for text in texts]
+
+
+class TestParsedDocument:
+    """Test cases for the shared parsed-document handle"""
+    
+    def test_detection_text_is_reused_by_extraction(self, monkeypatch):
+        """Test page text pulled during detection is not extracted again"""
+        monkeypatch.setattr(pdf_processing, 'PYPDF2_AVAILABLE', True)
+        document = ParsedDocument(b'%PDF')
+        document._reader = _FakeReader(['A' * 60, 'second page'])
+        
+        method = PDFProcessor(workers=1)._detect_best_method(document)
+        assert method == 'pypdf2'
+        pages = document.extract_pages('pypdf2', 0, document.count_pages(method))
+        
+        assert [page['text'] for page in pages] == ['A' * 60, 'second page']
+        assert document._reader.pages[0].calls == 1
+    
+    def test_extracted_pages_are_released(self, monkeypatch):
+        """Test no page text or pdfplumber page cache outlives its page's extraction"""
+        monkeypatch.setattr(pdf_processing, 'extract_page_tables', lambda page: ([], {'checked': False}))
+        flushed = []
+        document = ParsedDocument(b'%PDF')
+        document._plumber = _FakeReader(['first', 'second'])
+        for page_num, page in enumerate(document._plumber.pages):
+            page.flush_cache = lambda page_num=page_num: flushed.append(page_num)
+        
+        document.page_text(0, 'pdfplumber')
+        pages = document.extract_pages('pdfplumber', 0, 2)
+        
+        assert [page['text'] for page in pages] == ['first', 'second']
+        assert document._plumber.pages[0].calls == 1
+        assert document._page_text == {}
+        assert flushed == [0, 1]
+    
+    def test_page_count_uses_open_parser(self):
+        """Test counting pages does not open another parser"""
+        document = ParsedDocument(b'%PDF')
+        document._reader = _FakeReader(['one', 'two', 'three'])
+        
+        assert document.count_pages('ocr') == 3
+        assert document._fitz_doc is None
+
+
+class TestHybridRouting:
+    """Test cases for per-page text layer / OCR routing"""
+    
+    @pytest.fixture
+    def document(self, monkeypatch):
+        monkeypatch.setattr(pdf_processing, 'PYPDF2_AVAILABLE', True)
+        monkeypatch.setattr(pdf_processing, 'OCR_AVAILABLE', True)
+        document = ParsedDocument(b'%PDF')
+        document._reader = _FakeReader(['Typed cover sheet ' * 5, '', 'Fax header'])
+        coverage = {0: 0.0, 1: 0.95, 2: 0.9}
+        monkeypatch.setattr(ParsedDocument, 'image_coverage', lambda self, page_num: coverage[page_num])
+        monkeypatch.setattr(ParsedDocument, 'ocr_page_result', lambda self, page_num, deadline=None: {
+            'text': f'ocr text {page_num + 1}', 'scale': 1.5, 'confidence': 90.0, 'word_count': 30, 'attempts': 1})
+        return document
+    
+    def test_dense_text_layer_skips_ocr(self, document):
+        """Test pages with a text layer use it"""
+        assert document.classify_page(0)['method'] == 'text'
+    
+    def test_scanned_pages_are_ocrd(self, document):
+        """Test image-only and sparse-text scanned pages go to OCR"""
+        assert document.classify_page(1)['method'] == 'ocr'
+        assert document.classify_page(2)['method'] == 'ocr'
+    
+    def test_hybrid_reports_method_per_page(self, document):
+        """Test hybrid extraction records which method handled each page"""
+        pages = document.extract_pages('hybrid', 0, 3)
+        
+        assert [page['routing']['method'] for page in pages] == ['text', 'ocr', 'ocr']
+        assert pages[1]['text'] == 'ocr text 2'
+        assert pages[1]['routing']['ocr_scale'] == 1.5
+        assert 'ocr_scale' not in pages[0]['routing']
+
+
+class TestAdaptiveOcr:
+    """Test cases for adaptive OCR resolution"""
+    
+    @pytest.fixture
+    def document(self, monkeypatch):
+        monkeypatch.setattr(pdf_processing, 'OCR_ADAPTIVE', True)
+        monkeypatch.setattr(pdf_processing, 'OCR_SCALES', [1.5, 2.0, 3.0])
+        monkeypatch.setattr(pdf_processing, 'OCR_MIN_CONFIDENCE', 75)
+        monkeypatch.setattr(pdf_processing, 'OCR_ESCALATE_MIN_WORDS', 2)
+        monkeypatch.setattr(ParsedDocument, '_render_for_ocr', lambda self, page_num, scale: (page_num, scale))
+        return ParsedDocument(b'%PDF')
+    
+    @staticmethod
+    def _ocr_data(confidence):
+        return {'text': ['Lisinopril', '10mg'], 'conf': [confidence, confidence], 'block_num': [1, 1],
+                'par_num': [1, 1], 'line_num': [1, 1], 'left': [0, 50], 'top': [0, 0],
+                'width': [40, 20], 'height': [10, 10]}
+    
+    def test_clean_page_stops_at_lowest_scale(self, document, monkeypatch):
+        """Test a confident first pass is not re-rendered"""
+        rendered = []
+        monkeypatch.setattr(pdf_processing.ocr_pool, 'image_to_data',
+                            lambda image, config='', timeout=None: rendered.append(image) or self._ocr_data(92))
+        
+        result = document.ocr_page_result(0)
+        
+        assert rendered == [(0, 1.5)]
+        assert result['scale'] == 1.5
+        assert result['attempts'] == 1
+        assert result['text'] == 'Lisinopril 10mg'
+    
+    def test_low_confidence_page_escalates(self, document, monkeypatch):
+        """Test pages below threshold are re-rendered at higher scales"""
+        confidence = {1.5: 40, 2.0: 80, 3.0: 95}
+        monkeypatch.setattr(pdf_processing.ocr_pool, 'image_to_data',
+                            lambda image, config='', timeout=None: self._ocr_data(confidence[image[1]]))
+        
+        result = document.ocr_page_result(0)
+        
+        assert result['scale'] == 2.0
+        assert result['confidence'] == 80
+        assert result['attempts'] == 2
+    
+    def test_keeps_most_confident_attempt(self, document, monkeypatch):
+        """Test the best attempt is kept when no scale meets the threshold"""
+        confidence = {1.5: 40, 2.0: 60, 3.0: 50}
+        monkeypatch.setattr(pdf_processing.ocr_pool, 'image_to_data',
+                            lambda image, config='', timeout=None: self._ocr_data(confidence[image[1]]))
+        
+        result = document.ocr_page_result(0)
+        
+        assert result['scale'] == 2.0
+        assert result['attempts'] == 3
+    
+    def test_blank_page_is_not_re_rendered(self, document, monkeypatch):
+        """Test a page that reads almost no words keeps its first pass"""
+        rendered = []
+        monkeypatch.setattr(pdf_processing.ocr_pool, 'image_to_data', lambda image, config='', timeout=None:
+                            rendered.append(image) or {**self._ocr_data(30), 'text': ['', ''], 'conf': [-1, -1]})
+        
+        result = document.ocr_page_result(0)
+        
+        assert rendered == [(0, 1.5)]
+        assert result['word_count'] == 0
+    
+    def test_unusable_scales_fall_back_to_fixed_scale(self):
+        """Test an empty or malformed OCR_SCALES still gives one scale to render at"""
+        assert pdf_processing._parse_scales('') == [pdf_processing.OCR_FIXED_SCALE]
+        assert pdf_processing._parse_scales('x, -1') == [pdf_processing.OCR_FIXED_SCALE]
+        assert pdf_processing._parse_scales('1.5, 3') == [1.5, 3.0]
+
+
+class TestStreamingExtraction:
+    """Test cases for page-by-page streaming"""
+    
+    def test_iter_pages_yields_pages_then_summary(self, monkeypatch):
+        """Test one record per page, medications so far, and a final summary"""
+        texts = {0: 'Lisinopril 10 mg daily', 1: 'Metformin 500 mg twice', 2: 'Lisinopril 10 mg daily'}
+        monkeypatch.setattr(ParsedDocument, 'count_pages', lambda self, method: 3)
+        monkeypatch.setattr(ParsedDocument, 'extract_pages', lambda self, method, start, end, deadline=None: [
+            {'page': n + 1, 'text': texts[n], 'tables': []} for n in range(start, end)])
+        
+        processor = PDFProcessor(workers=1)
+        processor.supported_methods['pypdf2'] = True
+        records = list(processor.iter_pages(b'%PDF', 'pypdf2', 'list.pdf'))
+        
+        assert [record['type'] for record in records] == ['page', 'page', 'page', 'summary']
+        assert [record['medications_so_far'] for record in records[:3]] == [1, 2, 2]
+        assert records[2]['medications'] == []
+        assert records[-1]['medications_count'] == 2
+        assert records[-1]['pages_processed'] == 3
+
+    
+    def test_extracted_text_records_medication_pages(self):
+        """Test the assembled text keeps its page markers and medications carry their pages"""
+        document = ParsedDocument(b'%PDF')
+        document._reader = _FakeReader(['Lisinopril 10 mg daily', 'Metformin 500 mg twice'])
+        
+        result = PDFProcessor(workers=1)._process_with_pypdf2(document, 'list.pdf')
+        
+        assert result['extracted_text'] == ("\n--- Page 1 ---\nLisinopril 10 mg daily\n"
+                                            "\n--- Page 2 ---\nMetformin 500 mg twice\n")
+        assert [(med['name'], med['page']) for med in result['medications_found']] == [
+            ('Lisinopril', 1), ('Metformin', 2)]
+
+class _ManualDeadline(Deadline):
+    """Deadline that expires when a test says so"""
+    
+    def __init__(self):
+        super().__init__(30)
+        self.passed = False
+    
+    def expired(self):
+        return self.passed
+
+
+class TestExtractionDeadline:
+    """Test cases for deadline-bounded extraction"""
+    
+    def test_deadline_returns_pages_finished_so_far(self, monkeypatch):
+        """Test extraction stops between pages and reports a truncated partial result"""
+        deadline = _ManualDeadline()
+        document = ParsedDocument(b'%PDF')
+        document._reader = _FakeReader(['Lisinopril 10 mg daily', 'Metformin 500 mg twice', 'Atorvastatin 20 mg'])
+        # The deadline passes while the second page is being extracted
+        second = document._reader.pages[1]
+        monkeypatch.setattr(second, 'extract_text', lambda: setattr(deadline, 'passed', True) or second.text)
+        
+        result = PDFProcessor(workers=1)._process_with_pypdf2(document, 'list.pdf', deadline)
+        
+        assert result['truncated'] is True
+        assert (result['pages_processed'], result['pages_total']) == (2, 3)
+        assert [med['name'] for med in result['medications_found']] == ['Lisinopril', 'Metformin']
+    
+    def test_complete_extraction_is_not_truncated(self):
+        """Test a document finished within the deadline is not flagged"""
+        document = ParsedDocument(b'%PDF')
+        document._reader = _FakeReader(['Lisinopril 10 mg daily'])
+        
+        result = PDFProcessor(workers=1)._process_with_pypdf2(document, 'list.pdf', Deadline(30))
+        
+        assert result['truncated'] is False
+        assert 'deadline_seconds' not in result
+    
+    def test_deadline_drops_ocr_page_in_flight(self, monkeypatch):
+        """Test an OCR call cut off by the deadline ends extraction with the earlier pages"""
+        deadline = _ManualDeadline()
+        
+        def fake_ocr(self, page_num, deadline=None):
+            if page_num == 1:
+                deadline.passed = True
+                raise OcrTimeoutError("OCR exceeded 0.5s for one page")
+            return {'text': 'page one', 'scale': 1.5, 'confidence': 90.0, 'word_count': 30, 'attempts': 1}
+        
+        monkeypatch.setattr(ParsedDocument, 'ocr_page_result', fake_ocr)
+        pages = ParsedDocument(b'%PDF').extract_pages('ocr', 0, 3, deadline)
+        
+        assert [page['page'] for page in pages] == [1]
+    
+    def test_page_timeout_without_deadline_still_fails(self, monkeypatch):
+        """Test a per-page OCR timeout is not mistaken for the deadline"""
+        def fake_ocr(self, page_num, deadline=None):
+            raise OcrTimeoutError("OCR exceeded 60s for one page")
+        
+        monkeypatch.setattr(ParsedDocument, 'ocr_page_result', fake_ocr)
+        
+        with pytest.raises(OcrTimeoutError):
+            ParsedDocument(b'%PDF').extract_pages('ocr', 0, 2, Deadline(30))
@@ -0,0 +1,105 @@
+import pytest
+from services import table_detection
+from services.table_detection import aligned_columns, extract_page_tables, summarize_table_checks, table_hints
+
+
+def hline(y, x0=50, x1=500):
+    return {'x0': x0, 'x1': x1, 'top': y, 'bottom': y}
+
+
+def vline(x, top=100, bottom=300):
+    return {'x0': x, 'x1': x, 'top': top, 'bottom': bottom}
+
+
+def row(y, cells):
+    """Characters for one line of text, each (x, text) cell written at 5pt per character"""
+    chars = []
+    for x, text in cells:
+        for i, char in enumerate(text):
+            chars.append({'text': char, 'x0': x + i * 5, 'x1': x + i * 5 + 5, 'top': y, 'size': 10})
+    return chars
+
+
+class FakePage:
+    """Stand-in pdfplumber page with layout objects and a counted extract_tables()"""
+    
+    def __init__(self, lines=(), rects=(), curves=(), chars=()):
+        self.lines = list(lines)
+        self.rects = list(rects)
+        self.curves = list(curves)
+        self.chars = list(chars)
+        self.extract_calls = 0
+    
+    def extract_tables(self):
+        self.extract_calls += 1
+        return [[['Drug', 'Dose'], ['Lisinopril', '10mg']]]
+
+
+class TestTablePrecheck:
+    """Test cases for the per-page table pre-check"""
+    
+    def test_ruled_grid_is_likely(self):
+        """Test a grid of ruling lines marks the page for extraction"""
+        page = FakePage(lines=[hline(100), hline(150), hline(200), vline(50), vline(500)])
+        
+        assert table_hints(page)['likely'] is True
+    
+    def test_plain_text_page_is_skipped(self):
+        """Test a page of prose with a single underline does not run extraction"""
+        page = FakePage(lines=[hline(90)], chars=row(100, [(50, 'Take one tablet daily with food')]))
+        
+        tables, check = extract_page_tables(page, 'auto')
+        
+        assert tables == []
+        assert check['extracted'] is False
+        assert page.extract_calls == 0
+    
+    def test_curves_alone_are_skipped(self):
+        """Test a logo or signature drawn with curves does not run extraction"""
+        signature = [{'x0': 60, 'x1': 200, 'top': 700, 'bottom': 730}] * 4
+        page = FakePage(curves=signature, chars=row(100, [(50, 'Take one tablet daily with food')]))
+        
+        assert table_hints(page)['curves'] == 4
+        assert table_hints(page)['likely'] is False
+    
+    def test_boxed_columns_are_likely(self):
+        """Test one ruled box is extracted only when the text inside lines up in columns"""
+        box = {'x0': 40, 'x1': 520, 'top': 90, 'bottom': 260}
+        columns = [row(y, [(50, 'Lisinopril'), (200, '10mg'), (350, 'daily')]) for y in (100, 120, 140)]
+        prose = row(100, [(50, 'Take one tablet daily with food')])
+        
+        assert aligned_columns(sum(columns, [])) == 2
+        assert table_hints(FakePage(rects=[box], chars=sum(columns, [])))['likely'] is True
+        assert table_hints(FakePage(rects=[box], chars=prose))['likely'] is False
+    
+    def test_modes_force_extraction_on_or_off(self):
+        """Test 'always' skips the pre-check and 'never' skips extraction"""
+        always_page, never_page = FakePage(), FakePage(lines=[hline(100), hline(150), hline(200), vline(50), vline(500)])
+        
+        tables, check = extract_page_tables(always_page, 'always')
+        assert len(tables) == 1 and 'hints' not in check
+        
+        tables, check = extract_page_tables(never_page, 'never')
+        assert tables == [] and never_page.extract_calls == 0
+
+
+class TestTableCheckSummary:
+    """Test cases for reporting skipped pages and time saved"""
+    
+    def test_summary_estimates_time_saved_from_measured_pages(self):
+        """Test skipped pages are costed at the measured per-page extraction time"""
+        checks = [{'mode': 'auto', 'extracted': True, 'precheck_seconds': 0.001, 'extract_seconds': 0.2},
+                  {'mode': 'auto', 'extracted': False, 'precheck_seconds': 0.001, 'extract_seconds': 0.0},
+                  {'mode': 'auto', 'extracted': False, 'precheck_seconds': 0.001, 'extract_seconds': 0.0}]
+        
+        summary = summarize_table_checks(checks)
+        
+        assert (summary['pages_checked'], summary['pages_extracted'], summary['pages_skipped']) == (3, 1, 2)
+        assert summary['estimated_seconds_saved'] == pytest.approx(0.4 - 0.003)
+    
+    def test_summary_falls_back_to_configured_estimate(self, monkeypatch):
+        """Test the configured per-page cost is used when no page was extracted"""
+        monkeypatch.setattr(table_detection, 'TABLE_EXTRACT_ESTIMATE', 0.5)
+        checks = [{'mode': 'never', 'extracted': False, 'precheck_seconds': 0.0, 'extract_seconds': 0.0}] * 4
+        
+        assert summarize_table_checks(checks)['estimated_seconds_saved'] == 2.0
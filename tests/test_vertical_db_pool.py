@@ -0,0 +1,99 @@
+import os
+import re
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_POOL_BLOCK = re.compile(r'class PooledConnection:.*?def _disconnect\(self, conn\):\n(?:        [^\n]*\n)+', re.S)
+
+
+def pool_source(filename, template=False):
+    with open(os.path.join(ROOT, filename)) as f:
+        source = f.read()
+    block = _POOL_BLOCK.search(source).group(0)
+    if template:
+        # industry_cloner.py holds the generated app as an f-string
+        block = block.replace('{{', '{').replace('}}', '}').replace('\\"', '"').replace('\\\\', '\\')
+    return block
+
+
+class FakeConnection:
+    """psycopg2 connection stand-in that can be dropped by the 'server'"""
+    
+    def __init__(self):
+        self.closed = 0
+        self.dropped = False
+        self.rollbacks = 0
+    
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+    
+    def rollback(self):
+        self.rollbacks += 1
+    
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def execute(self, sql, params=None):
+        if self.connection.dropped:
+            import psycopg2
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+    
+    def close(self):
+        pass
+
+
+class TestVerticalDatabasePool:
+    """Test cases for the connection pool inlined in the single-file vertical apps"""
+    
+    def test_copies_are_identical(self):
+        """Test every vertical app and the cloner template carry the same pool"""
+        reference = pool_source('tattoo_app.py')
+        
+        assert pool_source('inktelliassist_app.py') == reference
+        assert pool_source('industry_cloner.py', template=True) == reference
+    
+    def test_reuses_and_replaces_dropped_connections(self, monkeypatch):
+        """Test a connection the server dropped while idle is replaced on checkout"""
+        tattoo_app = pytest.importorskip('tattoo_app')
+        opened = []
+        
+        def connect(**config):
+            opened.append(FakeConnection())
+            return opened[-1]
+        
+        monkeypatch.setattr(tattoo_app.psycopg2, 'connect', connect)
+        monkeypatch.setattr(tattoo_app, 'DATABASE_POOL_PING_AFTER', 0)
+        manager = tattoo_app.DatabaseManager()
+        
+        with manager.get_connection() as conn:
+            first = conn._conn
+        with manager.get_connection() as conn:
+            assert conn._conn is first
+        
+        first.dropped = True
+        with manager.get_connection() as conn:
+            assert conn._conn is not first
+        assert first.closed and len(opened) == 2
+    
+    def test_with_block_returns_connection(self, monkeypatch):
+        """Test leaving the with-block frees the pool slot without relying on garbage collection"""
+        tattoo_app = pytest.importorskip('tattoo_app')
+        monkeypatch.setattr(tattoo_app.psycopg2, 'connect', lambda **config: FakeConnection())
+        monkeypatch.setattr(tattoo_app, 'DATABASE_POOL_SIZE', 1)
+        monkeypatch.setattr(tattoo_app, 'DATABASE_POOL_TIMEOUT', 0.05)
+        manager = tattoo_app.DatabaseManager()
+        
+        held = manager.get_connection()
+        assert manager.get_connection() is None
+        held.close()
+        
+        with manager.get_connection() as conn:
+            assert conn is not None
+        assert manager.get_connection() is not None
@@ -61,29 +61,29 @@ class UserManager:
                 }
         
         # Check database users if database is available
-        if self.db and self.db.connection:
+        if self.db and self.db.pool:
             try:
-                cursor = self.db.connection.cursor()
-                cursor.execute("""
-                    SELECT username, password_hash, role, full_name, email, permissions, active
-                    FROM users 
-                    WHERE (username = %s OR email = %s) AND active = true
-                """, (username, username))
+                with self.db.pool.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT username, password_hash, role, full_name, email, permissions, active
+                        FROM users 
+                        WHERE (username = %s OR email = %s) AND active = true
+                    """, (username, username))
                 
-                user_record = cursor.fetchone()
-                if user_record:
-                    stored_hash = user_record[1]
-                    if stored_hash == self._hash_password(password):
-                        return {
-                            'success': True,
-                            'user': {
-                                'username': user_record[0],
-                                'role': user_record[2],
-                                'full_name': user_record[3],
-                                'email': user_record[4],
-                                'permissions': user_record[5] if user_record[5] else [],
+                    user_record = cursor.fetchone()
+                    if user_record:
+                        stored_hash = user_record[1]
+                        if stored_hash == self._hash_password(password):
+                            return {
+                                'success': True,
+                                'user': {
+                                    'username': user_record[0],
+                                    'role': user_record[2],
+                                    'full_name': user_record[3],
+                                    'email': user_record[4],
+                                    'permissions': user_record[5] if user_record[5] else [],
+                                }
                             }
-                        }
             except Exception as e:
                 print(f"Database authentication error: {e}")
         
@@ -97,18 +97,18 @@ class UserManager:
         session['session_token'] = secrets.token_hex(16)
         
         # Log login if database is available
-        if self.db and self.db.connection:
+        if self.db and self.db.pool:
             try:
-                cursor = self.db.connection.cursor()
-                cursor.execute("""
-                    INSERT INTO user_sessions (username, session_token, login_time, ip_address)
-                    VALUES (%s, %s, %s, %s)
-                """, (
-                    user_data['username'],
-                    session['session_token'],
-                    datetime.datetime.now(),
-                    request.remote_addr
-                ))
+                with self.db.pool.cursor() as cursor:
+                    cursor.execute("""
+                        INSERT INTO user_sessions (username, session_token, login_time, ip_address)
+                        VALUES (%s, %s, %s, %s)
+                    """, (
+                        user_data['username'],
+                        session['session_token'],
+                        datetime.datetime.now(),
+                        request.remote_addr
+                    ))
             except Exception as e:
                 print(f"Session logging error: {e}")
     
@@ -118,14 +118,14 @@ class UserManager:
         session_token = session.get('session_token')
         
         # Log logout if database is available
-        if self.db and self.db.connection and session_token:
+        if self.db and self.db.pool and session_token:
             try:
-                cursor = self.db.connection.cursor()
-                cursor.execute("""
-                    UPDATE user_sessions 
-                    SET logout_time = %s 
-                    WHERE session_token = %s
-                """, (datetime.datetime.now(), session_token))
+                with self.db.pool.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE user_sessions 
+                        SET logout_time = %s 
+                        WHERE session_token = %s
+                    """, (datetime.datetime.now(), session_token))
             except Exception as e:
                 print(f"Logout logging error: {e}")
         
@@ -152,62 +152,61 @@ class UserManager:
     
     def setup_database_tables(self):
         """Set up user-related database tables"""
-        if not self.db or not self.db.connection:
+        if not self.db or not self.db.pool:
             return
         
         try:
-            cursor = self.db.connection.cursor()
-            
-            # Users table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(50) UNIQUE NOT NULL,
-                    password_hash VARCHAR(128) NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    full_name VARCHAR(100) NOT NULL,
-                    role VARCHAR(50) NOT NULL DEFAULT 'pharmacy_tech',
-                    permissions TEXT[] DEFAULT ARRAY['pdf_process', 'view_history'],
-                    active BOOLEAN DEFAULT true,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP,
-                    created_by VARCHAR(50)
-                )
-            """)
+            with self.db.pool.cursor() as cursor:
+                # Users table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS users (
+                        id SERIAL PRIMARY KEY,
+                        username VARCHAR(50) UNIQUE NOT NULL,
+                        password_hash VARCHAR(128) NOT NULL,
+                        email VARCHAR(100) UNIQUE NOT NULL,
+                        full_name VARCHAR(100) NOT NULL,
+                        role VARCHAR(50) NOT NULL DEFAULT 'pharmacy_tech',
+                        permissions TEXT[] DEFAULT ARRAY['pdf_process', 'view_history'],
+                        active BOOLEAN DEFAULT true,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_login TIMESTAMP,
+                        created_by VARCHAR(50)
+                    )
+                """)
             
-            # User sessions table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(50) NOT NULL,
-                    session_token VARCHAR(32) NOT NULL,
-                    login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    logout_time TIMESTAMP,
-                    ip_address INET,
-                    user_agent TEXT
-                )
-            """)
+                # User sessions table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS user_sessions (
+                        id SERIAL PRIMARY KEY,
+                        username VARCHAR(50) NOT NULL,
+                        session_token VARCHAR(32) NOT NULL,
+                        login_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        logout_time TIMESTAMP,
+                        ip_address INET,
+                        user_agent TEXT
+                    )
+                """)
             
-            # Create default admin user if none exists
-            cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
-            admin_count = cursor.fetchone()[0]
+                # Create default admin user if none exists
+                cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
+                admin_count = cursor.fetchone()[0]
             
-            if admin_count == 0:
-                admin_password_hash = self._hash_password('PharmAdmin2025!')
-                cursor.execute("""
-                    INSERT INTO users (username, password_hash, email, full_name, role, permissions)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    'admin',
-                    admin_password_hash,
-                    'admin@pharmassist.local',
-                    'System Administrator',
-                    'admin',
-                    ['pdf_process', 'view_history', 'download', 'analytics', 'user_management', 'admin_all']
-                ))
-                print("✓ Default admin user created (username: admin, password: PharmAdmin2025!)")
+                if admin_count == 0:
+                    admin_password_hash = self._hash_password('PharmAdmin2025!')
+                    cursor.execute("""
+                        INSERT INTO users (username, password_hash, email, full_name, role, permissions)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """, (
+                        'admin',
+                        admin_password_hash,
+                        'admin@pharmassist.local',
+                        'System Administrator',
+                        'admin',
+                        ['pdf_process', 'view_history', 'download', 'analytics', 'user_management', 'admin_all']
+                    ))
+                    print("✓ Default admin user created (username: admin, password: PharmAdmin2025!)")
             
-            print("✓ User authentication tables created successfully")
+                print("✓ User authentication tables created successfully")
             
         except Exception as e:
             print(f"Error creating user tables: {e}")